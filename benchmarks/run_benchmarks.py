@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# Hot-path benchmark suite: bundled/synthetic fixtures, JSON results, regression check against a pinned baseline
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("sound_detection", "cv_detection", "rf_detection", "ultrasonic_detection"):
+    sys.path.insert(0, os.path.join(REPO_DIR, folder))
+
+# Suite settings
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BASELINE_FILE = os.path.join(RESULTS_DIR, "baseline.json")   # Only written by --accept (or the first run)
+FIXTURE_WAV = os.path.join(REPO_DIR, "sound_detection", "sounds_and_pics", "test_drone.wav")
+REPEATS = 7               # Timed runs per benchmark; the fastest is compared (least disturbed by other load)
+THRESHOLD = 0.15          # Slowdown (fraction) beyond which a benchmark counts as a regression
+RATE = 44100
+CHUNK = 1024
+
+
+class Skip(Exception):
+    """Raised by a benchmark whose dependency isn't installed"""
+
+
+def measure(fn, repeats=REPEATS):
+    """Call fn once to warm up, then `repeats` times; returns timing stats in seconds"""
+    fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {'median_s': statistics.median(times), 'min_s': min(times), 'max_s': max(times)}
+
+
+def bench_wav_load_fft():
+    """test_sound_plot.py: open the WAV and take the FFT of the first channel"""
+    from scipy.fftpack import fft
+    from wavmap import WavMap
+
+    def run():
+        with WavMap(FIXTURE_WAV) as wav:
+            signal = wav.channel(0)
+            np.abs(fft(signal))
+            np.fft.fftfreq(len(signal), 1 / wav.rate)
+    result = measure(run)
+    result['fixture'] = os.path.relpath(FIXTURE_WAV, REPO_DIR)
+    return result
+
+
+def bench_audio_chunk():
+    """sound.py update(): split interleaved bytes and decimate one CHUNK to 11025 Hz"""
+    from decimate import PolyphaseResampler
+    from mic_array import split_channels
+    from wavmap import WavMap
+
+    with WavMap(FIXTURE_WAV) as wav:
+        blocks = [wav.channel(0)[i:i + CHUNK].astype(np.int16).tobytes()
+                  for i in range(0, wav.frames - CHUNK, CHUNK)][:200]
+    resampler = PolyphaseResampler(RATE, 11025)
+
+    def run():
+        for data in blocks:
+            resampler.process(split_channels(data, 1)[0])
+    result = measure(run)
+    result['per_chunk_us'] = result['median_s'] / len(blocks) * 1e6
+    result['realtime_load'] = result['median_s'] / (len(blocks) * CHUNK / RATE)
+    return result
+
+
+def bench_mic_array_block():
+    """mic_array.ArrayProcessor on a synthetic 4-channel block with a source at 60 deg"""
+    from mic_array import CHUNK as ARRAY_CHUNK, MIC_POSITIONS, ArrayProcessor, SPEED_OF_SOUND
+
+    rng = np.random.default_rng(0)
+    source = rng.standard_normal(ARRAY_CHUNK + 64)
+    direction = np.array([np.cos(np.radians(60)), np.sin(np.radians(60))])
+    delays = -(MIC_POSITIONS @ direction) / SPEED_OF_SOUND * RATE
+    block = np.stack([np.interp(np.arange(ARRAY_CHUNK) + 32 - d, np.arange(len(source)), source)
+                      for d in delays]) * 3000
+    processor = ArrayProcessor()
+    processor.floor_db = -100.0   # Force the detected path so GCC-PHAT runs every block
+    blocks = 50
+
+    def run():
+        for _ in range(blocks):
+            processor.floor_db = -100.0
+            processor.process(block)
+    result = measure(run)
+    result['per_block_us'] = result['median_s'] / blocks * 1e6
+    return result
+
+
+def bench_yolo_inference():
+    """drone_v2.detect_drones on a synthetic 640x480 frame"""
+    from drone_v2 import RESOLUTION, detect_drones, load_model
+    try:
+        model = load_model()   # ultralytics is imported lazily here
+    except ImportError as e:
+        raise Skip(f"needs ultralytics ({e.name} missing)")
+    frame = np.random.default_rng(0).integers(0, 255, (RESOLUTION[1], RESOLUTION[0], 3), dtype=np.uint8)
+    result = measure(lambda: detect_drones(model, frame), repeats=5)
+    result['fps'] = 1 / result['median_s']
+    return result
+
+
+def _airodump_lines(n, seed=0):
+    rng = np.random.default_rng(seed)
+    csv_lines, log_lines = [], []
+    for i in range(n):
+        mac = ':'.join(f"{b:02X}" for b in rng.integers(0, 256, 6))
+        essid = f"Mavic-{i}" if i % 50 == 0 else f"HomeNet{i}"
+        power = -int(rng.integers(30, 90))
+        csv_lines.append(f"{mac}, 2025-04-19 10:00:00, 2025-04-19 10:00:05,  6,  54, WPA2, CCMP, PSK, "
+                         f"{power},       12,        0,   0.  0.  0.  0,   {len(essid)}, {essid}, ")
+        log_lines.append(f"2025-04-19 10:00:05,1970-01-01 00:00:00,{essid},{mac},{power},WPA2,"
+                         f"0.000000,0.000000,0.000000,0.000000,AP")
+    return csv_lines, log_lines
+
+
+def bench_airodump_parse():
+    """airodump .csv and .log.csv row parsing plus drone matching for 5000 networks"""
+    from airodump_csv import parse_logcsv_row, parse_network_row
+    from drone_match import DroneMatcher
+
+    csv_lines, log_lines = _airodump_lines(5000)
+    matcher = DroneMatcher()
+
+    def run():
+        rows = [parse_network_row(line) for line in csv_lines]
+        rows += [parse_logcsv_row(line) for line in log_lines]
+        matcher.classify(r for r in rows if r)
+    result = measure(run)
+    result['per_row_us'] = result['median_s'] / (2 * len(csv_lines)) * 1e6
+    return result
+
+
+def bench_ultrasonic_timing():
+    """ultrasonic_timing echo polling against a simulated ECHO pin (1000 low + 1000 high reads)"""
+    from ultrasonic_timing import HALF_SPEED_CM, echo_duration
+
+    levels = [0] * 1000 + [1] * 1000 + [0]
+    pulses = 20
+
+    def run():
+        for _ in range(pulses):
+            echo_duration(iter(levels).__next__)
+    result = measure(run)
+    poll_s = result['median_s'] / pulses / len(levels)
+    # Each poll is one clock sample, so the poll period bounds the distance resolution
+    result['poll_ns'] = poll_s * 1e9
+    result['resolution_cm'] = poll_s * HALF_SPEED_CM
+    return result
+
+
+BENCHMARKS = {
+    'wav_load_fft': bench_wav_load_fft,
+    'audio_chunk': bench_audio_chunk,
+    'mic_array_block': bench_mic_array_block,
+    'yolo_inference': bench_yolo_inference,
+    'airodump_parse': bench_airodump_parse,
+    'ultrasonic_timing': bench_ultrasonic_timing,
+}
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+            'processor': platform.processor(), 'cpus': os.cpu_count(), 'node': platform.node()}
+
+
+def pin_baseline(results, path=BASELINE_FILE):
+    """Make these timings the baseline; benchmarks not in this run keep their pinned values"""
+    baseline = {'benchmarks': {}}
+    if os.path.exists(path):
+        with open(path) as f:
+            baseline = json.load(f)
+    baseline['time'], baseline['environment'] = results['time'], results['environment']
+    baseline['benchmarks'].update({name: r for name, r in results['benchmarks'].items() if 'min_s' in r})
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """Per-benchmark ratio of best times; returns the names that regressed"""
+    regressions = []
+    for name, result in current['benchmarks'].items():
+        old = baseline['benchmarks'].get(name)
+        if 'min_s' not in result or not old or 'min_s' not in old:
+            continue
+        ratio = result['min_s'] / old['min_s']
+        status = "REGRESSION" if ratio > 1 + threshold else ("faster" if ratio < 1 - threshold else "ok")
+        if status == "REGRESSION":
+            regressions.append(name)
+        print(f"  {name:<18} {old['min_s'] * 1000:9.3f} -> {result['min_s'] * 1000:9.3f} ms "
+              f"({ratio:5.2f}x) {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the hot-path benchmarks and compare with the pinned baseline")
+    parser.add_argument("names", nargs='*', help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--baseline", help="Result JSON to compare against (default: results/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"Allowed slowdown before failing, as a fraction (default: {THRESHOLD})")
+    parser.add_argument("--no-save", action="store_true", help="Don't write a result file")
+    parser.add_argument("--accept", action="store_true",
+                        help="Pin this run as the new baseline (e.g. after an intended slowdown or a speedup)")
+    args = parser.parse_args()
+
+    unknown = [n for n in args.names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = {'time': time.strftime("%Y-%m-%dT%H:%M:%S"), 'environment': environment(), 'benchmarks': {}}
+    for name in args.names or BENCHMARKS:
+        try:
+            result = BENCHMARKS[name]()
+        except Skip as e:
+            result = {'skipped': str(e)}
+            print(f"{name:<18} skipped: {e}")
+        else:
+            extras = ', '.join(f"{k} {v:.3g}" for k, v in result.items()
+                               if k not in ('median_s', 'min_s', 'max_s') and isinstance(v, float))
+            print(f"{name:<18} {result['min_s'] * 1000:9.3f} ms best, {result['median_s'] * 1000:9.3f} ms median"
+                  + (f"  ({extras})" if extras else ""))
+        results['benchmarks'][name] = result
+
+    # Every run is compared with the same pinned baseline, not with the run before it: one lucky
+    # fast run can't fail everything after it, and small slowdowns can't add up unnoticed
+    regressions = []
+    baseline_path = args.baseline or (BASELINE_FILE if os.path.exists(BASELINE_FILE) else None)
+    if not baseline_path:
+        print("No baseline to compare against")
+    else:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print(f"Compared with {os.path.relpath(baseline_path)} (threshold {args.threshold:.0%}):")
+        if baseline.get('environment', {}).get('node') != results['environment']['node']:
+            print("  note: baseline was recorded on a different machine")
+        regressions = compare(results, baseline, args.threshold)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved {os.path.relpath(path)}")
+        if args.accept or not os.path.exists(BASELINE_FILE):
+            pin_baseline(results, BASELINE_FILE)
+            print(f"Pinned as the baseline in {os.path.relpath(BASELINE_FILE)}")
+    if regressions and not args.accept:
+        print(f"Regressed: {', '.join(regressions)} (rerun with --accept to pin this run if the slowdown is intended)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
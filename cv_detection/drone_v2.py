@@ -1,49 +1,173 @@
-import cv2
-from ultralytics import YOLO
-from picamezro import camera  # Assuming this is correct for your setup
+import os
+import sys
 import time
 
-# Initialize the Raspberry Pi Camera
-cam = camera.Camera()  # Replace with correct initialization if needed
-cam.resolution = (640, 480)
-cam.framerate = 30
-
-# Load YOLO model (Use a small, efficient model for Raspberry Pi)
-model = YOLO('yolo11n.pt')  # Ensure the model is optimized for edge devices
-
-while True:
-    # Capture frame from Raspberry Pi Camera
-    frame = cam.capture()  # Assuming `capture()` gives a NumPy array
-    
-    if frame is None:
-        continue  # Skip frame if capture fails
-
-    # Perform YOLO drone detection
-    results = model.predict(frame)
-
-    for result in results:
-        boxes = result.boxes
-        for box in boxes:
-            x1, y1, x2, y2 = box.xyxy[0]
-            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-
-            # Draw bounding box around detected drone
-            color = (0, 255, 0)  # Green bounding box
-            thickness = 2
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
-
-            # Add label text
-            label = "Drone Detected"
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.6
-            text_thickness = 2
-            cv2.putText(frame, label, (x1, y1 - 10), font, font_scale, color, text_thickness)
-
-    # Display the output
-    cv2.imshow("Drone Detection", frame)
-    
-    if cv2.waitKey(1) & 0xFF == ord('q'):  # Press 'q' to exit
-        break
-
-cv2.destroyAllWindows()
-cam.close()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fusion"))
+import metrics
+
+# Camera and model settings
+RESOLUTION = (640, 480)
+FRAMERATE = 30
+MODEL_FILE = 'yolo11n.pt'  # Small, efficient model for Raspberry Pi
+MIN_CONFIDENCE = 0.25      # Boxes below this score are ignored
+CAMERA_HFOV = 62.2         # Horizontal field of view in degrees (Pi Camera v2)
+METRICS_PORT = None        # e.g. 9102 to serve FPS and stage timings on http://127.0.0.1:PORT/metrics
+FPS_WINDOW = 30            # Frames averaged for the FPS gauge
+GOVERNOR = False           # True to adapt frame rate/YOLO size to temperature and load (fusion/governor.py)
+ROI_CAMERA = None          # e.g. 'cam0' to crop/mask frames with its entry in roi_masks.json (roi_mask.py)
+
+# Drawing settings
+BOX_COLOR = (0, 255, 0)    # Green bounding box
+BOX_THICKNESS = 2
+LABEL = "Drone Detected"
+
+
+def open_camera(resolution=RESOLUTION, framerate=FRAMERATE):
+    """Initialize the Raspberry Pi Camera"""
+    # Imported here so detection can be used (and benchmarked) without a camera
+    from picamezro import camera  # Assuming this is correct for your setup
+    cam = camera.Camera()  # Replace with correct initialization if needed
+    cam.resolution = resolution
+    cam.framerate = framerate
+    return cam
+
+
+def load_model(path=MODEL_FILE):
+    """Load YOLO model (use a model optimized for edge devices)"""
+    # ultralytics pulls in torch; import it only when a model is actually wanted
+    from ultralytics import YOLO
+    return YOLO(path)
+
+
+def detect_drones(model, frame, min_confidence=MIN_CONFIDENCE, imgsz=None):
+    """Run YOLO on one frame; returns [(x1, y1, x2, y2, confidence), ...]
+
+    `imgsz` (optional) is the YOLO input size; smaller is faster and cooler.
+    """
+    return detect_batch(model, [frame], min_confidence, imgsz)[0]
+
+
+def detect_batch(model, frames, min_confidence=MIN_CONFIDENCE, imgsz=None):
+    """Run YOLO once on several frames; returns one box list per frame"""
+    options = {'imgsz': imgsz} if imgsz else {}
+    out = []
+    for result in model.predict(frames, verbose=False, **options):
+        boxes = []
+        for box in result.boxes:
+            confidence = float(box.conf[0]) if box.conf is not None else 1.0
+            if confidence < min_confidence:
+                continue
+            x1, y1, x2, y2 = (int(v) for v in box.xyxy[0])
+            boxes.append((x1, y1, x2, y2, confidence))
+        out.append(boxes)
+    return out
+
+
+def box_bearing(box, frame_width, hfov=CAMERA_HFOV):
+    """Bearing of a box centre relative to the camera axis in degrees (left is positive)"""
+    centre = (box[0] + box[2]) / 2
+    return (0.5 - centre / frame_width) * hfov
+
+
+def draw_detections(frame, boxes):
+    import cv2
+    for x1, y1, x2, y2, _ in boxes:
+        # Draw bounding box around detected drone
+        cv2.rectangle(frame, (x1, y1), (x2, y2), BOX_COLOR, BOX_THICKNESS)
+        # Add label text
+        cv2.putText(frame, LABEL, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, BOX_COLOR, 2)
+
+
+def detect_in_roi(model, frame, roi=None, imgsz=None):
+    """detect_drones on the camera's allowed region only; boxes come back in full-frame coordinates"""
+    if roi is None:
+        return detect_drones(model, frame, imgsz=imgsz)
+    size = roi.scaled_imgsz(imgsz / RESOLUTION[0]) if imgsz else roi.imgsz
+    return roi.filter(detect_drones(model, roi.crop(frame), imgsz=size))
+
+
+def run(cam, model, show=True, should_run=None, on_detections=None, governor=None, roi=None):
+    """Capture/detect loop.
+
+    `should_run()` (optional) gates YOLO per frame, e.g. on a fusion cue, so
+    frames are only captured and analysed while cheaper sensors ask for it.
+    `on_detections(boxes, frame)` is called for every analysed frame.
+    `governor` (optional) sets frame rate, YOLO size and stride, and is
+    boosted whenever a drone is found. `roi` (optional, a roi_mask.RoiMask)
+    limits inference to the sky region.
+    """
+    frame_times = []
+    frame_count = 0
+    settings = None
+    metrics.gauge("cv_fps", lambda: (len(frame_times) - 1) / (frame_times[-1] - frame_times[0])
+                  if len(frame_times) > 1 and frame_times[-1] > frame_times[0] else 0.0)
+    while True:
+        if should_run is not None and not should_run():
+            time.sleep(1 / FRAMERATE)
+            continue
+
+        if governor is not None and governor.settings is not settings:
+            settings = governor.settings
+            cam.framerate = settings['fps']
+
+        # Capture frame from Raspberry Pi Camera
+        captured = time.monotonic()
+        with metrics.timer("cv_capture"):
+            frame = cam.capture()  # Assuming `capture()` gives a NumPy array
+        if frame is None:
+            metrics.count("cv_capture_failures")
+            continue  # Skip frame if capture fails
+
+        frame_count += 1
+        if settings and frame_count % settings['stride']:
+            continue  # Governor: only every Nth frame is analysed
+
+        # Perform YOLO drone detection
+        with metrics.timer("cv_detect"):
+            boxes = detect_in_roi(model, frame, roi, settings and settings['imgsz'])
+        if governor is not None:
+            governor.observe_latency(time.monotonic() - captured)
+            if boxes:
+                governor.boost()
+        metrics.count("cv_frames")
+        metrics.count("cv_boxes", len(boxes))
+        frame_times.append(time.monotonic())
+        del frame_times[:-FPS_WINDOW]
+        if on_detections is not None:
+            on_detections(boxes, frame)
+
+        if show:
+            import cv2
+            with metrics.timer("cv_display"):
+                draw_detections(frame, boxes)
+                # Display the output
+                cv2.imshow("Drone Detection", frame)
+                key = cv2.waitKey(1)
+            if key & 0xFF == ord('q'):  # Press 'q' to exit
+                break
+
+
+def main():
+    if METRICS_PORT:
+        metrics.REGISTRY.start_http(METRICS_PORT)
+    cam = open_camera()
+    model = load_model()
+    governor = None
+    if GOVERNOR:
+        from governor import Governor
+        governor = Governor()
+        governor.start_thread()
+    roi = None
+    if ROI_CAMERA:
+        from roi_mask import load_roi
+        roi = load_roi(ROI_CAMERA)
+    try:
+        run(cam, model, governor=governor, roi=roi)
+    finally:
+        import cv2
+        cv2.destroyAllWindows()
+        cam.close()
+
+
+if __name__ == "__main__":
+    main()
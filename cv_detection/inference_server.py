@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# One YOLO instance for many cameras: frames in shared memory, fair round-robin batching, per-camera stats
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fusion"))
+import metrics
+
+# Server settings
+SOCKET_PATH = "/tmp/drone_inference.sock"
+SLOTS = 3                 # Frame buffers per camera: one being analysed, one pending, one being filled
+MAX_BATCH = 4             # Frames (from different cameras) per YOLO call at most
+BATCH_WAIT = 0.005        # Seconds to wait for more cameras before running a partial batch
+STATS_WINDOW = 30         # Results per camera averaged for FPS/latency
+REPORT_SECONDS = 5.0
+
+# Wire format (control only; pixels never go through the socket). Every message is HEADER + payload.
+#   REGISTER camera -> server  JSON {camera, shm, shape, slots}
+#   FRAME    camera -> server  slot, seq, capture time (time.monotonic, shared by all local processes)
+#   RESULT   server -> camera  slot, seq, status, n boxes, then n x (x1, y1, x2, y2, confidence) float32
+HEADER = struct.Struct("<cI")
+FRAME_MSG = struct.Struct("<IQd")
+RESULT_MSG = struct.Struct("<IQBH")
+REGISTER, FRAME, RESULT = b'R', b'F', b'D'
+DONE, SKIPPED = 0, 1      # SKIPPED: a newer frame from the same camera arrived first
+
+
+def _attach(name):
+    """Open an existing segment without letting this process's resource tracker unlink it at exit"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")   # bpo-39959: only the creator should
+    except Exception:
+        pass
+    return shm
+
+
+class Camera:
+    """Server-side state of one registered camera"""
+
+    def __init__(self, name, shm_name, shape, slots, writer):
+        self.name = name
+        self.shm = _attach(shm_name)
+        self.frames = np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=self.shm.buf)
+        self.writer = writer
+        self.pending = None       # (slot, seq, capture time) of the newest unanalysed frame
+        self.in_flight = 0        # Frames of this camera in the batch being run
+        self.disconnected = False
+        self.received = self.done = self.skipped = 0
+        self.done_times = deque(maxlen=STATS_WINDOW)
+        self.latencies = deque(maxlen=STATS_WINDOW)
+
+    def fps(self):
+        t = self.done_times
+        return (len(t) - 1) / (t[-1] - t[0]) if len(t) > 1 and t[-1] > t[0] else 0.0
+
+    def send(self, slot, seq, status, boxes=()):
+        boxes = np.asarray(boxes, dtype='<f4').reshape(-1, 5)
+        payload = RESULT_MSG.pack(slot, seq, status, len(boxes)) + boxes.tobytes()
+        self.writer.write(HEADER.pack(RESULT, len(payload)) + payload)
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+
+
+class InferenceServer:
+    """Holds the one model and serves every camera process.
+
+    Cameras write frames into their own shared-memory slots and send only
+    (slot, seq, time) over the socket; the server runs YOLO directly on
+    views of those slots. Each camera has at most one pending frame (a newer
+    one supersedes it), and batches are filled round-robin starting after
+    the camera served last, so a fast camera cannot starve a slow one.
+    """
+
+    def __init__(self, model, detect_batch, max_batch=MAX_BATCH):
+        self.model = model
+        self.detect_batch = detect_batch
+        self.max_batch = max_batch
+        self.cameras = {}
+        self.order = []           # Round-robin order of camera names
+        self.next_index = 0
+        self.wakeup = asyncio.Event()
+        self.pool = ThreadPoolExecutor(1, thread_name_prefix="yolo")
+        self.batches = deque(maxlen=200)
+
+    async def handle(self, reader, writer):
+        camera = None
+        try:
+            kind, payload = await self._read(reader)
+            if kind != REGISTER:
+                return
+            info = json.loads(payload)
+            if info['camera'] in self.cameras:
+                # Names key the round-robin order and the stats; a second one would corrupt both
+                print(f"camera {info['camera']} is already registered; rejecting the new connection")
+                return
+            camera = Camera(info['camera'], info['shm'], info['shape'], info['slots'], writer)
+            self.cameras[camera.name] = camera
+            self.order.append(camera.name)
+            print(f"camera {camera.name} registered ({'x'.join(map(str, info['shape']))}, {info['slots']} slots)")
+            while True:
+                kind, payload = await self._read(reader)
+                if kind != FRAME:
+                    continue
+                slot, seq, t = FRAME_MSG.unpack(payload)
+                camera.received += 1
+                if camera.pending is not None:
+                    # Freshest frame wins; hand the older slot straight back
+                    camera.send(camera.pending[0], camera.pending[1], SKIPPED)
+                    camera.skipped += 1
+                camera.pending = (slot, seq, t)
+                self.wakeup.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if camera is not None:
+                self.cameras.pop(camera.name, None)
+                self.order.remove(camera.name)
+                print(f"camera {camera.name} disconnected")
+                camera.disconnected = True
+                if not camera.in_flight:
+                    camera.close()   # Otherwise the scheduler closes it once the batch holding its views is done
+            writer.close()
+
+    @staticmethod
+    async def _read(reader):
+        kind, size = HEADER.unpack(await reader.readexactly(HEADER.size))
+        return kind, (await reader.readexactly(size) if size else b'')
+
+    def _take_batch(self):
+        """Up to max_batch pending frames, one per camera, in round-robin order"""
+        batch = []
+        n = len(self.order)
+        last = None
+        for i in range(n):
+            index = (self.next_index + i) % n
+            camera = self.cameras[self.order[index]]
+            if camera.pending is not None:
+                batch.append((camera,) + camera.pending)
+                camera.pending = None
+                last = index
+                if len(batch) == self.max_batch:
+                    break
+        if last is not None:
+            self.next_index = (last + 1) % n
+        return batch
+
+    async def schedule(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            waiting = sum(c.pending is not None for c in self.cameras.values())
+            if waiting < min(self.max_batch, len(self.cameras)):
+                await asyncio.sleep(BATCH_WAIT)   # Give the other cameras a moment to join the batch
+            batch = self._take_batch()
+            if not batch:
+                continue
+            frames = [camera.frames[slot] for camera, slot, _, _ in batch]   # Views, no copies
+            for camera, _, _, _ in batch:
+                camera.in_flight += 1
+            try:
+                with metrics.timer("infer_batch"):
+                    results = await loop.run_in_executor(self.pool, self.detect_batch, self.model, frames)
+            finally:
+                del frames
+                for camera, _, _, _ in batch:
+                    camera.in_flight -= 1
+                    if camera.disconnected and not camera.in_flight:
+                        camera.close()
+            done = time.monotonic()
+            self.batches.append(len(batch))
+            metrics.count("infer_frames", len(batch))
+            for (camera, slot, seq, t), boxes in zip(batch, results):
+                camera.done += 1
+                camera.done_times.append(done)
+                camera.latencies.append(done - t)
+                metrics.observe(f"infer_latency_{camera.name}", done - t)
+                if not camera.disconnected:
+                    camera.send(slot, seq, DONE, [list(b) for b in boxes])
+            if any(c.pending is not None for c in self.cameras.values()):
+                self.wakeup.set()
+
+    def report(self):
+        sizes = list(self.batches)
+        mean_batch = sum(sizes) / len(sizes) if sizes else 0.0
+        print(f"[server] {len(self.cameras)} cameras | mean batch {mean_batch:.2f}")
+        for name in sorted(self.cameras):
+            c = self.cameras[name]
+            latencies = sorted(c.latencies)
+            p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+            p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+            print(f"  {name:<10} {c.fps():5.1f} fps | latency p50 {p50:6.1f} ms p95 {p95:6.1f} ms | "
+                  f"{c.done} done, {c.skipped} superseded of {c.received}")
+
+    async def run(self, path=SOCKET_PATH, report=REPORT_SECONDS):
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.handle, path)
+        print(f"Inference server on {path}")
+        scheduler = asyncio.create_task(self.schedule())
+        try:
+            async with server:
+                while True:
+                    await asyncio.sleep(report)
+                    self.report()
+        finally:
+            scheduler.cancel()
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class CameraClient:
+    """Camera-process side: owns the shared-memory slots and talks to the server.
+
+    `buffer()` hands out a free slot to capture into (or None when the
+    server still holds every slot), `submit()` announces it. Results arrive
+    on a background thread, which frees the slot and calls `on_result`.
+    """
+
+    def __init__(self, name, shape, path=SOCKET_PATH, slots=SLOTS, on_result=None, timeout=30.0):
+        self.name = name
+        self.shape = tuple(shape)
+        size = int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(create=True, size=size * slots)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.free = set(range(slots))
+        self.lock = threading.Lock()
+        self.on_result = on_result
+        self.seq = 0
+        self.sent = self.dropped = self.results = 0
+        self.sock = self._connect(path, timeout)
+        info = json.dumps({'camera': name, 'shm': self.shm.name, 'shape': self.shape, 'slots': slots}).encode()
+        self.sock.sendall(HEADER.pack(REGISTER, len(info)) + info)
+        self.reader = threading.Thread(target=self._read_results, name=f"results-{name}", daemon=True)
+        self.reader.start()
+
+    @staticmethod
+    def _connect(path, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(path)
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def buffer(self):
+        """(slot, writable frame view) or None if the server holds every slot"""
+        with self.lock:
+            if not self.free:
+                self.dropped += 1
+                return None
+            slot = self.free.pop()
+        return slot, self.frames[slot]
+
+    def submit(self, slot, t=None):
+        self.seq += 1
+        self.sent += 1
+        payload = FRAME_MSG.pack(slot, self.seq, time.monotonic() if t is None else t)
+        try:
+            self.sock.sendall(HEADER.pack(FRAME, len(payload)) + payload)
+        except OSError:
+            raise ConnectionError(f"inference server closed the connection "
+                                  f"(is another camera named '{self.name}' registered?)") from None
+
+    def send(self, frame, t=None):
+        """Copy a captured frame into a free slot and submit it; False if it had to be dropped"""
+        got = self.buffer()
+        if got is None:
+            return False
+        slot, view = got
+        view[...] = frame
+        self.submit(slot, t)
+        return True
+
+    def _recv(self, n):
+        data = bytearray()
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("inference server closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _read_results(self):
+        try:
+            while True:
+                kind, size = HEADER.unpack(self._recv(HEADER.size))
+                payload = self._recv(size)
+                if kind != RESULT:
+                    continue
+                slot, seq, status, n = RESULT_MSG.unpack_from(payload)
+                boxes = np.frombuffer(payload, dtype='<f4', count=n * 5, offset=RESULT_MSG.size).reshape(n, 5)
+                with self.lock:
+                    self.free.add(slot)
+                if status == DONE:
+                    self.results += 1
+                    if self.on_result:
+                        self.on_result(seq, boxes)
+        except (ConnectionError, OSError):
+            pass
+
+    def close(self):
+        self.sock.close()
+        self.frames = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SimulatedModel:
+    """Stand-in for YOLO in benchmarks: a fixed cost per call plus a smaller cost per frame"""
+
+    def __init__(self, call_ms=40.0, frame_ms=12.0):
+        self.call_s, self.frame_s = call_ms / 1000, frame_ms / 1000
+
+    def detect_batch(self, frames):
+        for frame in frames:
+            frame[::32, ::32].sum()   # Touch the shared memory like a real model would
+        time.sleep(self.call_s + self.frame_s * len(frames))
+        return [[] for _ in frames]
+
+
+def serve(path, simulate=False, max_batch=MAX_BATCH, imgsz=None, report=REPORT_SECONDS):
+    if simulate:
+        model = SimulatedModel()
+        detect = lambda m, frames: m.detect_batch(frames)
+    else:
+        from drone_v2 import detect_batch, load_model
+        model = load_model()
+        detect = lambda m, frames: detect_batch(m, frames, imgsz=imgsz)
+    server = InferenceServer(model, detect, max_batch)
+    try:
+        asyncio.run(server.run(path, report))
+    except KeyboardInterrupt:
+        print("Stopped by User")
+
+
+def camera_main(name, path, synthetic_fps=None, seconds=None):
+    """A camera process: Pi camera (or synthetic frames at `synthetic_fps`) -> server"""
+    from drone_v2 import RESOLUTION
+    shape = (RESOLUTION[1], RESOLUTION[0], 3)
+    detections = []
+
+    def on_result(seq, boxes):
+        if len(boxes):
+            detections.append(seq)
+            print(f"[{name}] frame {seq}: {len(boxes)} drone(s), best {boxes[:, 4].max():.2f}")
+
+    client = CameraClient(name, shape, path, on_result=on_result)
+    cam = None
+    if synthetic_fps is None:
+        from drone_v2 import open_camera
+        cam = open_camera()
+    rng = np.random.default_rng(abs(hash(name)) % 2 ** 32)
+    start = time.monotonic()
+    n = 0
+    try:
+        while seconds is None or time.monotonic() - start < seconds:
+            if cam is not None:
+                frame = cam.capture()
+                if frame is not None:
+                    client.send(frame)
+                continue
+            n += 1
+            got = client.buffer()
+            if got is not None:
+                slot, view = got
+                view[::32, ::32] = rng.integers(0, 255, view[::32, ::32].shape, dtype=np.uint8)  # "Capture"
+                client.submit(slot)
+            time.sleep(max(0.0, start + n / synthetic_fps - time.monotonic()))
+        time.sleep(0.5)   # Let the last results arrive
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps({'camera': name, 'sent': client.sent, 'dropped': client.dropped,
+                          'results': client.results}))
+        client.close()
+        if cam is not None:
+            cam.close()
+
+
+def benchmark(cameras=4, fps=15, seconds=10.0, max_batch=MAX_BATCH):
+    """Server plus `cameras` synthetic camera processes on a simulated model"""
+    path = f"/tmp/drone_inference_bench_{os.getpid()}.sock"
+    server = multiprocessing.Process(target=serve, args=(path, True, max_batch, None, seconds / 2), daemon=True)
+    server.start()
+    rates = [fps * (2 if i == 0 else 1) for i in range(cameras)]   # Camera 0 is twice as fast: fairness check
+    procs = [multiprocessing.Process(target=camera_main, args=(f"cam{i}", path, rate, seconds))
+             for i, rate in enumerate(rates)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    server.terminate()
+    server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-memory YOLO server for several cameras")
+    parser.add_argument("--socket", default=SOCKET_PATH, help=f"Control socket (default: {SOCKET_PATH})")
+    parser.add_argument("--camera", metavar="NAME", help="Run as a camera process with this name")
+    parser.add_argument("--synthetic", type=float, metavar="FPS", help="Camera: send synthetic frames at FPS")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help=f"Frames per YOLO call (default: {MAX_BATCH})")
+    parser.add_argument("--imgsz", type=int, help="YOLO input size")
+    parser.add_argument("--simulate", action="store_true", help="Server: simulated model instead of YOLO")
+    parser.add_argument("--bench", type=int, metavar="CAMERAS", help="Run a server and CAMERAS synthetic cameras")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Benchmark/synthetic camera duration")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.bench, seconds=args.seconds, max_batch=args.max_batch)
+    elif args.camera:
+        camera_main(args.camera, args.socket, args.synthetic, args.seconds if args.synthetic else None)
+    else:
+        serve(args.socket, args.simulate, args.max_batch, args.imgsz)
+
+
+if __name__ == "__main__":
+    main()
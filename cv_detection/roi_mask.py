@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# Per-camera sky/horizon mask: crop frames to where drones can be, drop detections outside it
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+# Mask settings
+ROI_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "roi_masks.json")
+RESOLUTION = (640, 480)   # Width, height the masks are defined for (as in drone_v2.py)
+ALIGN = 32                # Crops are aligned to the YOLO stride
+FILL = 114                # Masked pixels are painted YOLO's letterbox grey
+HORIZON_MARGIN = 24       # Pixels below the horizon still allowed (drones low over the skyline)
+HORIZON_STEP = 16         # Spacing of the stored horizon points (pixels)
+CALIBRATION_FRAMES = 150  # ~5 s at 30 fps
+DOWNSAMPLE = 4            # Texture is learned at 1/4 resolution
+CLUTTER_CELL = 32         # Grid for recurring-detection statistics (pixels)
+CLUTTER_RATE = 0.2        # A cell with a detection in this share of calibration frames is static clutter
+GROUND_CONTRAST = 3.0     # A column gets a horizon only if its bottom is this many times more textured than its top
+GROUND_GAP = 8.0          # ...and by at least this much (mean gradient, grey levels)
+MIN_ALLOWED = 0.15        # A learned mask allowing less of the frame than this is rejected, not saved
+
+
+class RoiMask:
+    """Allowed region of one camera's frame.
+
+    The region is everything above a horizon polyline (plus a margin),
+    minus excluded boxes such as trees or masts that keep triggering YOLO.
+    `crop` returns the 32-aligned bounding box of the region with the
+    disallowed pixels painted grey, so inference only spends time where a
+    drone can appear; `filter` maps boxes back to the full frame and drops
+    any whose centre falls outside the region.
+    """
+
+    def __init__(self, horizon=None, exclude=(), resolution=RESOLUTION, margin=HORIZON_MARGIN):
+        width, height = resolution
+        self.resolution = (width, height)
+        self.margin = margin
+        self.exclude = [tuple(int(v) for v in box) for box in exclude]
+        # horizon: [(x, y), ...] polyline; None allows the whole frame
+        self.horizon = [tuple(int(v) for v in p) for p in horizon] if horizon else None
+
+        self.mask = np.ones((height, width), dtype=bool)
+        if self.horizon:
+            xs, ys = zip(*sorted(self.horizon))
+            rows = np.interp(np.arange(width), xs, ys) + margin
+            self.mask &= np.arange(height)[:, None] < rows[None, :]
+        for x1, y1, x2, y2 in self.exclude:
+            self.mask[max(0, y1):y2, max(0, x1):x2] = False
+
+        ys, xs = np.nonzero(self.mask)
+        if len(ys):
+            x0, y0 = (int(xs.min()) // ALIGN) * ALIGN, (int(ys.min()) // ALIGN) * ALIGN
+            x1 = min(width, -(-(int(xs.max()) + 1) // ALIGN) * ALIGN)
+            y1 = min(height, -(-(int(ys.max()) + 1) // ALIGN) * ALIGN)
+        else:
+            x0 = y0 = x1 = y1 = 0
+        self.box = (x0, y0, x1, y1)
+        self.crop_mask = self.mask[y0:y1, x0:x1]
+        self.blocked = ~self.crop_mask[:, :, None]
+        self.any_blocked = bool(self.blocked.any())
+
+    @property
+    def imgsz(self):
+        """(height, width) YOLO input for the crop, so inference cost follows the crop area"""
+        x0, y0, x1, y1 = self.box
+        return (y1 - y0, x1 - x0)
+
+    def scaled_imgsz(self, scale):
+        """Crop input size scaled down (e.g. by the governor), still stride aligned"""
+        return tuple(max(ALIGN, int(v * scale) // ALIGN * ALIGN) for v in self.imgsz)
+
+    def coverage(self):
+        """Fraction of the frame that is allowed, and fraction that is inferred on"""
+        x0, y0, x1, y1 = self.box
+        area = self.mask.size
+        return self.mask.sum() / area, (x1 - x0) * (y1 - y0) / area
+
+    def crop(self, frame):
+        """View of the crop with disallowed pixels painted in place (the frame is modified)"""
+        x0, y0, x1, y1 = self.box
+        view = frame[y0:y1, x0:x1]
+        if self.any_blocked:
+            np.copyto(view, FILL, where=self.blocked)
+        return view
+
+    def filter(self, boxes):
+        """Crop-relative boxes -> full-frame boxes whose centre is in the allowed region"""
+        x0, y0 = self.box[:2]
+        height, width = self.mask.shape
+        kept = []
+        for bx1, by1, bx2, by2, confidence in boxes:
+            box = (bx1 + x0, by1 + y0, bx2 + x0, by2 + y0, confidence)
+            cx = min(width - 1, max(0, int((box[0] + box[2]) / 2)))
+            cy = min(height - 1, max(0, int((box[1] + box[3]) / 2)))
+            if self.mask[cy, cx]:
+                kept.append(box)
+        return kept
+
+    def to_config(self):
+        return {'resolution': list(self.resolution), 'margin': self.margin,
+                'horizon': [list(p) for p in self.horizon] if self.horizon else None,
+                'exclude': [list(b) for b in self.exclude]}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get('horizon'), config.get('exclude', ()), tuple(config.get('resolution', RESOLUTION)),
+                   config.get('margin', HORIZON_MARGIN))
+
+
+def load_roi(camera, path=ROI_FILE):
+    """RoiMask for `camera` from the shared config file, or None if it has no entry"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        config = json.load(f).get(camera)
+    return RoiMask.from_config(config) if config else None
+
+
+def save_roi(camera, roi, path=ROI_FILE):
+    configs = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            configs = json.load(f)
+    configs[camera] = roi.to_config()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(configs, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+class HorizonLearner:
+    """Learns the horizon and static clutter from a calibration period.
+
+    Sky is smooth and ground/buildings/trees are textured, so the mean
+    gradient magnitude over the calibration frames is low above the
+    horizon and high below it; each column's horizon is where the texture
+    first crosses halfway between the sky and ground levels. A column whose
+    bottom is not clearly more textured than its top (all sky, or all
+    ground) gets no horizon and stays fully allowed. Detections
+    that recur in the same grid cell during calibration (there is no drone
+    in the air while calibrating) are recorded as clutter to exclude.
+    """
+
+    def __init__(self, resolution=RESOLUTION, downsample=DOWNSAMPLE):
+        self.resolution = resolution
+        self.downsample = downsample
+        width, height = resolution
+        self.texture = np.zeros((height // downsample, width // downsample), dtype=np.float64)
+        self.clutter = np.zeros((-(-height // CLUTTER_CELL), -(-width // CLUTTER_CELL)), dtype=np.int32)
+        self.frames = 0
+
+    def add(self, frame, boxes=()):
+        small = frame[::self.downsample, ::self.downsample].astype(np.float32)
+        gray = small.mean(axis=2) if small.ndim == 3 else small
+        texture = np.zeros_like(gray)
+        texture[:, 1:] += np.abs(np.diff(gray, axis=1))
+        texture[1:, :] += np.abs(np.diff(gray, axis=0))
+        self.texture += texture[:self.texture.shape[0], :self.texture.shape[1]]
+        seen = set()
+        for x1, y1, x2, y2, _ in boxes:
+            seen.add((int((y1 + y2) / 2) // CLUTTER_CELL, int((x1 + x2) / 2) // CLUTTER_CELL))
+        for cell in seen:
+            self.clutter[cell] += 1
+        self.frames += 1
+
+    def horizon(self):
+        """[(x, y), ...] every HORIZON_STEP pixels, in full-resolution coordinates"""
+        texture = self.texture / max(self.frames, 1)
+        # Smooth down each column so single edges (wires, cloud rims) don't end the sky
+        kernel = np.ones(5) / 5
+        texture = np.apply_along_axis(lambda c: np.convolve(c, kernel, mode='same'), 0, texture)
+        rows = texture.shape[0]
+        sky = np.median(texture[:max(1, rows // 10)], axis=0)
+        ground = np.median(texture[-max(1, rows // 10):], axis=0)
+        threshold = (sky + ground) / 2
+        above = texture > threshold[None, :]
+        # Without clear ground below clear sky the threshold sits in noise; leave such columns open
+        skyline = (ground > GROUND_CONTRAST * sky) & (ground - sky > GROUND_GAP)
+        # First textured row per column; columns that never cross (all sky) get the bottom
+        first = np.where(skyline & above.any(axis=0), above.argmax(axis=0), rows)
+        # Median across neighbouring columns removes single-column spikes (poles)
+        padded = np.pad(first, 4, mode='edge')
+        first = np.median(np.lib.stride_tricks.sliding_window_view(padded, 9), axis=1)
+        width, height = self.resolution
+        xs = np.arange(0, width, HORIZON_STEP)
+        ys = np.interp(xs / self.downsample, np.arange(len(first)), first) * self.downsample
+        return [(int(x), int(min(height, y))) for x, y in zip(xs, ys)] + [(width - 1, int(min(height, ys[-1])))]
+
+    def clutter_boxes(self):
+        boxes = []
+        for row, col in zip(*np.nonzero(self.clutter >= max(2, CLUTTER_RATE * self.frames))):
+            boxes.append((col * CLUTTER_CELL, row * CLUTTER_CELL, (col + 1) * CLUTTER_CELL, (row + 1) * CLUTTER_CELL))
+        return boxes
+
+    def result(self, margin=HORIZON_MARGIN):
+        return RoiMask(self.horizon(), self.clutter_boxes(), self.resolution, margin)
+
+
+def calibrate(camera, frames=CALIBRATION_FRAMES, use_model=True):
+    """Learn a mask from the live camera (keep the sky clear of drones meanwhile)"""
+    from drone_v2 import detect_drones, load_model, open_camera
+    cam = open_camera()
+    model = load_model() if use_model else None
+    learner = HorizonLearner()
+    try:
+        while learner.frames < frames:
+            frame = cam.capture()
+            if frame is None:
+                continue
+            learner.add(frame, detect_drones(model, frame) if model is not None else ())
+    finally:
+        cam.close()
+    return learner.result()
+
+
+def synthetic_scene(rng, resolution=RESOLUTION):
+    """Sky gradient over a textured skyline with a 'tree' that the detector keeps firing on"""
+    width, height = resolution
+    x = np.arange(width)
+    skyline = (height * 0.45 + 40 * np.sin(x / 90) + np.where((x > 400) & (x < 460), -90, 0)).astype(int)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    sky = np.linspace(235, 180, height)[:, None, None] + rng.normal(0, 1.5, (height, width, 1))
+    ground = rng.integers(30, 140, (height, width, 1))
+    below = np.arange(height)[:, None] >= skyline[None, :]
+    frame[:] = np.where(below[:, :, None], ground, sky).clip(0, 255).astype(np.uint8)
+    tree_box = (410, int(skyline[430]) - 10, 450, int(skyline[430]) + 40, 0.4)
+    return frame, skyline, [tree_box]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Learn or inspect per-camera sky/horizon masks")
+    parser.add_argument("--camera", default="cam0", help="Camera name in the mask file (default: cam0)")
+    parser.add_argument("--file", default=ROI_FILE, help="Mask file (default: roi_masks.json next to this script)")
+    parser.add_argument("--calibrate", type=int, metavar="FRAMES", help="Learn a mask from FRAMES live frames")
+    parser.add_argument("--no-model", action="store_true", help="Calibrate without YOLO (no clutter learning)")
+    parser.add_argument("--demo", action="store_true", help="Learn from a synthetic scene and time the crop")
+    args = parser.parse_args()
+
+    if args.demo:
+        rng = np.random.default_rng(0)
+        learner = HorizonLearner()
+        for _ in range(30):
+            frame, skyline, clutter = synthetic_scene(rng)
+            learner.add(frame, clutter)
+        roi = learner.result()
+        learned = np.interp(np.arange(RESOLUTION[0]), *zip(*roi.horizon))
+        error = np.abs(learned - skyline)
+        allowed, inferred = roi.coverage()
+        print(f"Horizon error: median {np.median(error):.1f} px, 95th pct {np.percentile(error, 95):.1f} px")
+        print(f"Clutter boxes: {roi.exclude}")
+        print(f"Allowed {allowed:.0%} of the frame; YOLO input {roi.imgsz[1]}x{roi.imgsz[0]} "
+              f"({inferred:.0%} of the pixels)")
+        frame, _, clutter = synthetic_scene(rng)
+        start = time.perf_counter()
+        for _ in range(100):
+            roi.crop(frame)
+        print(f"crop + paint: {(time.perf_counter() - start) * 10:.3f} ms per frame")
+        x0, y0 = roi.box[:2]
+        fake = [(50 - x0, 40 - y0, 80 - x0, 60 - y0, 0.8),                  # In the sky: kept
+                (200 - x0, 400 - y0, 240 - x0, 430 - y0, 0.6)]              # On the ground: dropped
+        fake += [(b[0] - x0, b[1] - y0, b[2] - x0, b[3] - y0, b[4]) for b in clutter]
+        print(f"Boxes kept by filter: {roi.filter(fake)}")
+        return
+
+    if args.calibrate:
+        roi = calibrate(args.camera, args.calibrate, not args.no_model)
+        allowed, _ = roi.coverage()
+        if allowed < MIN_ALLOWED:
+            print(f"Learned mask allows only {allowed:.0%} of the frame; not saved "
+                  f"(check the view, or add a mask by hand)")
+            return
+        save_roi(args.camera, roi, args.file)
+        print(f"Saved mask for {args.camera} to {args.file}")
+    else:
+        roi = load_roi(args.camera, args.file)
+        if roi is None:
+            print(f"No mask for {args.camera} in {args.file}; use --calibrate or add one by hand")
+            return
+    allowed, inferred = roi.coverage()
+    print(f"{args.camera}: allowed {allowed:.0%} of the frame, crop {roi.box} "
+          f"(YOLO input {roi.imgsz[1]}x{roi.imgsz[0]}, {inferred:.0%} of the pixels), "
+          f"{len(roi.exclude)} excluded boxes")
+
+
+if __name__ == "__main__":
+    main()
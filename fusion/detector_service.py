@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# Long-lived detector service: YOLO and the audio classifier loaded and warmed once, served over a Unix socket
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+import metrics
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("sound_detection", "cv_detection"):
+    sys.path.insert(0, os.path.join(REPO_DIR, folder))
+
+# Service settings
+SOCKET_PATH = "/tmp/drone_detector.sock"
+AUDIO_MODEL = os.path.join(REPO_DIR, "sound_detection", "drone_classifier.npz")
+CONNECT_TIMEOUT = 60.0    # Seconds a client keeps retrying while the service starts
+WARMUP_SHAPE = (480, 640, 3)  # Dummy frame pushed through YOLO once at startup
+
+# Wire format. Request: header + payload. Response: 4-byte length + UTF-8 JSON.
+#   kind b'F' frame: a=height, b=width, c=channels, payload uint8 pixels (row-major)
+#   kind b'A' audio: a=rate,   b=channels, c=0,      payload int16 interleaved samples
+#   kind b'P' ping:  no payload, returns readiness and startup timings
+HEADER = struct.Struct("<cIIII")  # kind, a, b, c, payload bytes
+LENGTH = struct.Struct("<I")
+FRAME, AUDIO, PING = b'F', b'A', b'P'
+
+
+class DetectorService:
+    """Holds the models for the life of the process.
+
+    Loading YOLO (torch) and the classifier costs seconds; a sensor script
+    that talks to a running service only pays a socket round trip. Each
+    connection gets its own streaming audio state, while inference runs on
+    one thread per model so requests never block the event loop.
+    """
+
+    def __init__(self, cv=True, audio=True, audio_model=AUDIO_MODEL):
+        self.timings = {}
+        self.cv_model = None
+        self.audio_ready = False
+        self.audio_runtime = None
+        self.labels = None
+        self.errors = {}
+        self.first_detection = None
+        self.cv_pool = ThreadPoolExecutor(1, thread_name_prefix="cv")
+        self.audio_pool = ThreadPoolExecutor(1, thread_name_prefix="audio")
+        if cv:
+            self._load_cv()
+        if audio:
+            self._load_audio(audio_model)
+
+    @contextmanager
+    def timed(self, name):
+        """Record how long the block took under `name` in the startup timings"""
+        start = time.perf_counter()
+        yield
+        self.timings[name] = time.perf_counter() - start
+
+    def _load_cv(self):
+        try:
+            with self.timed('cv_import'):
+                import drone_v2
+            with self.timed('cv_load'):
+                self.cv_model = drone_v2.load_model()
+            with self.timed('cv_warmup'):
+                # The first predict() builds the graph and allocates buffers; pay for it now
+                drone_v2.detect_drones(self.cv_model, np.zeros(WARMUP_SHAPE, dtype=np.uint8))
+        except ImportError as e:
+            self.errors['cv'] = f"{e.name} not installed"
+            self.cv_model = None
+
+    def _load_audio(self, model_path):
+        with self.timed('audio_import'):
+            import classifier
+            import mic_array
+        self._classifier, self._mic_array = classifier, mic_array
+        self.audio_ready = True
+        if os.path.exists(model_path):
+            with self.timed('audio_load'):
+                self.audio_runtime, self.labels = classifier.load_runtime(model_path)
+        else:
+            # No trained model: fall back to the band-energy detector from mic_array
+            self.errors['audio'] = f"{os.path.basename(model_path)} not found, using band energy"
+        with self.timed('audio_warmup'):
+            # One second of silence through the whole path builds the filters and FFT plans
+            state = self.audio_state(44100, 1, 2048)
+            for _ in range(22):
+                self.detect_audio(state, np.zeros((1, 2048), dtype=np.int16))
+
+    def status(self):
+        audio = ('classifier' if self.audio_runtime else 'band_energy') if self.audio_ready else None
+        return {'ready': True, 'cv': self.cv_model is not None, 'audio': audio,
+                'errors': self.errors, 'timings': dict(self.timings), 'uptime': metrics.process_uptime()}
+
+    def detect_frame(self, frame):
+        import drone_v2
+        with metrics.timer("service_cv"):
+            boxes = drone_v2.detect_drones(self.cv_model, frame)
+        return {'boxes': [list(box) for box in boxes]}
+
+    def audio_state(self, rate, channels, frames):
+        """Per-connection streaming detector for this stream format"""
+        if self.audio_runtime:
+            return self._classifier.StreamClassifier(self.audio_runtime, self.labels, rate)
+        positions = self._mic_array.MIC_POSITIONS
+        if channels != len(positions):
+            positions = np.column_stack((np.arange(channels) * 0.04, np.zeros(channels)))
+        return self._mic_array.ArrayProcessor(channels, rate, frames, positions)
+
+    def detect_audio(self, state, block):
+        with metrics.timer("service_audio"):
+            if isinstance(state, self._mic_array.ArrayProcessor):
+                band_db, detected, bearing = state.process(block)
+                return {'band_db': float(band_db), 'detected': bool(detected), 'bearing': bearing}
+            result = state.process(block[0])
+        if not result:
+            return {}
+        return {'label': result[0], 'probability': result[1], 'detected': result[0] != self._classifier.NOISE_LABEL}
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        audio_key, audio_state = None, None
+        try:
+            while True:
+                try:
+                    kind, a, b, c, size = HEADER.unpack(await reader.readexactly(HEADER.size))
+                    payload = await reader.readexactly(size) if size else b''
+                except asyncio.IncompleteReadError:
+                    break
+
+                if kind == PING:
+                    reply = self.status()
+                elif kind == FRAME and self.cv_model is None:
+                    reply = {'error': self.errors.get('cv', "cv disabled")}
+                elif kind == FRAME:
+                    frame = np.frombuffer(payload, dtype=np.uint8).reshape(a, b, c)
+                    reply = await loop.run_in_executor(self.cv_pool, self.detect_frame, frame)
+                elif kind == AUDIO and not self.audio_ready:
+                    reply = {'error': "audio disabled"}
+                elif kind == AUDIO:
+                    block = np.frombuffer(payload, dtype='<i2').reshape(-1, b).T
+                    if audio_key != (a, b, block.shape[1]):
+                        audio_key = (a, b, block.shape[1])
+                        audio_state = self.audio_state(*audio_key)
+                    reply = await loop.run_in_executor(self.audio_pool, self.detect_audio, audio_state, block)
+                else:
+                    reply = {'error': f"unknown request {kind!r}"}
+
+                if self.first_detection is None and kind != PING and 'error' not in reply:
+                    self.first_detection = metrics.process_uptime()
+                    print(f"First detection {self.first_detection:.2f} s after process start")
+                data = json.dumps(reply).encode()
+                writer.write(LENGTH.pack(len(data)) + data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, path=SOCKET_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.handle, path)
+        print(f"Serving on {path} ({metrics.process_uptime():.2f} s after process start)")
+        async with server:
+            await server.serve_forever()
+
+
+class DetectorClient:
+    """Blocking client for sensor scripts; retries while the service is still starting"""
+
+    def __init__(self, path=SOCKET_PATH, timeout=CONNECT_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self.sock.connect(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                self.sock.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def _request(self, kind, a=0, b=0, c=0, payload=b''):
+        self.sock.sendall(HEADER.pack(kind, a, b, c, len(payload)))
+        if payload:
+            self.sock.sendall(payload)
+        size, = LENGTH.unpack(self._recv(LENGTH.size))
+        return json.loads(self._recv(size))
+
+    def _recv(self, n):
+        data = bytearray()
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("detector service closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def ping(self):
+        return self._request(PING)
+
+    def detect_frame(self, frame):
+        """Boxes for one (height, width, channels) uint8 frame"""
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        return self._request(FRAME, *frame.shape, payload=memoryview(frame).cast('B'))
+
+    def detect_audio(self, block, rate, channels=1):
+        """Result for interleaved int16 samples (or a (frames, channels) array)"""
+        block = np.ascontiguousarray(block, dtype='<i2')
+        return self._request(AUDIO, rate, channels, 0, payload=memoryview(block).cast('B'))
+
+    def close(self):
+        self.sock.close()
+
+
+def _test_audio(rate=44100, frames=2048):
+    t = np.arange(frames) / rate
+    return (3000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+
+
+def cold_start(args):
+    """What a one-shot script pays: imports, model load and the first detection in a fresh process"""
+    start = time.perf_counter()
+    service = DetectorService(cv=not args.no_cv, audio=not args.no_audio)
+    if service.cv_model is not None:
+        service.detect_frame(np.zeros(WARMUP_SHAPE, dtype=np.uint8))
+    if not args.no_audio:
+        state = service.audio_state(44100, 1, 2048)
+        service.detect_audio(state, _test_audio()[None, :])
+    print(json.dumps({'first_detection_s': time.perf_counter() - start, 'timings': dict(service.timings)}))
+
+
+def startup_bench(args, requests=200):
+    """Compare a cold one-shot detection with the service: spawn-to-first-result and warm per-request cost"""
+    script = os.path.abspath(__file__)
+    flags = (["--no-cv"] if args.no_cv else []) + (["--no-audio"] if args.no_audio else [])
+
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, script, "--cold"] + flags, capture_output=True, text=True, check=True)
+    cold_total = time.perf_counter() - start
+    cold = json.loads(out.stdout.strip().splitlines()[-1])
+
+    path = f"/tmp/drone_detector_bench_{os.getpid()}.sock"
+    start = time.perf_counter()
+    service = subprocess.Popen([sys.executable, script, "--socket", path] + flags, stdout=subprocess.DEVNULL)
+    try:
+        client = DetectorClient(path)
+        status = client.ping()
+        audio = _test_audio()
+        frame = np.zeros(WARMUP_SHAPE, dtype=np.uint8)
+        if status['cv']:
+            client.detect_frame(frame)
+        else:
+            client.detect_audio(audio, 44100)
+        first = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            client.detect_audio(audio, 44100)
+            latencies.append(time.perf_counter() - t0)
+        frame_ms = None
+        if status['cv']:
+            t0 = time.perf_counter()
+            for _ in range(10):
+                client.detect_frame(frame)
+            frame_ms = (time.perf_counter() - t0) / 10 * 1000
+        client.close()
+    finally:
+        service.terminate()
+        service.wait()
+
+    latencies.sort()
+    print(f"Cold one-shot (new process, import + load + detect): {cold_total:.2f} s "
+          f"(first detection {cold['first_detection_s']:.2f} s after imports began)")
+    print("  " + ', '.join(f"{k} {v * 1000:.0f} ms" for k, v in cold['timings'].items()))
+    print(f"Service spawn to first result: {first:.2f} s (paid once per boot)")
+    print(f"Warm audio request: median {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms")
+    if frame_ms is not None:
+        print(f"Warm frame request: {frame_ms:.1f} ms")
+    print(f"Models: cv {'loaded' if status['cv'] else 'off'}, audio {status['audio']}"
+          + (f" | {status['errors']}" if status['errors'] else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve warm drone detectors over a local socket")
+    parser.add_argument("--socket", default=SOCKET_PATH, help=f"Unix socket path (default: {SOCKET_PATH})")
+    parser.add_argument("--no-cv", action="store_true", help="Don't load YOLO")
+    parser.add_argument("--no-audio", action="store_true", help="Don't load the audio detector")
+    parser.add_argument("--metrics-port", type=int, help="Serve metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--startup-bench", action="store_true",
+                        help="Compare cold one-shot startup with the warm service")
+    parser.add_argument("--cold", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold:
+        cold_start(args)
+        return
+    if args.startup_bench:
+        startup_bench(args)
+        return
+
+    if args.metrics_port:
+        metrics.REGISTRY.start_http(args.metrics_port)
+    service = DetectorService(cv=not args.no_cv, audio=not args.no_audio)
+    print("Startup: " + ', '.join(f"{k} {v * 1000:.0f} ms" for k, v in service.timings.items()))
+    for name, error in service.errors.items():
+        print(f"{name}: {error}")
+    try:
+        asyncio.run(service.serve(args.socket))
+    except KeyboardInterrupt:
+        print("Stopped by User")
+    finally:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# Durable detection log: SQLite in WAL mode, batched background writes, time/sensor indexes, retention
+
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import metrics
+from events import detection, wall_time
+
+# Store settings
+DB_FILE = "events.db"
+BATCH_SIZE = 500          # Rows per transaction at most
+FLUSH_SECONDS = 0.5       # A partial batch is written after this long
+QUEUE_EVENTS = 100000     # Events buffered for the writer before new ones are dropped
+RETENTION_DAYS = 30       # Older events are pruned (None keeps everything)
+PRUNE_SECONDS = 3600      # How often the writer prunes
+WRITE_ATTEMPTS = 3        # Tries per batch on a SQLite error (locked, disk full) before it is dropped
+RETRY_SECONDS = 0.5       # Pause between tries
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,          -- Unix time
+    sensor TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    bearing REAL,
+    info TEXT                    -- JSON
+);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE INDEX IF NOT EXISTS events_sensor_time ON events (sensor, time);
+"""
+
+
+def _connect(path, read_only=False):
+    if read_only:
+        # Never creates the file, and can't take a write lock away from a running writer
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL survives application crashes; only a power cut can lose the last commits
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def parse_time(text, today=None):
+    """'14:02', '14:02:30', '2025-04-19 14:02' or a Unix time -> Unix time"""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            t = datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+        return datetime.combine(today or datetime.now().date(), t).timestamp()
+    raise ValueError(f"Unrecognised time '{text}' (use HH:MM[:SS], 'YYYY-MM-DD HH:MM' or Unix time)")
+
+
+class EventStore:
+    """Detection log that never blocks the sensor loops.
+
+    `add` only appends to an in-memory queue (dropping and counting when it
+    is full). One writer thread drains the queue in batches of up to
+    BATCH_SIZE rows per transaction, so a burst of hundreds of events per
+    second costs a handful of commits. Reads use their own connection;
+    with WAL they run concurrently with the writer. A batch that keeps
+    failing (database locked, disk full) is dropped and counted, and the
+    writer carries on. With `read_only` there is no writer at all.
+    """
+
+    def __init__(self, path=DB_FILE, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS,
+                 retention_days=RETENTION_DAYS, queue_events=QUEUE_EVENTS, read_only=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.retention_days = retention_days
+        self.queue = queue.Queue(maxsize=queue_events)
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+
+        if read_only:
+            self.reader = _connect(path, read_only=True)
+            self.reader_lock = threading.Lock()
+            self.thread = None
+            return
+        writer = _connect(path)
+        writer.executescript(SCHEMA)
+        writer.commit()
+        self.reader = _connect(path)
+        self.reader_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, args=(writer,), name="event-store", daemon=True)
+        self.thread.start()
+
+    def add(self, event):
+        """Queue one Detection for writing; never blocks"""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is committed"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+        self.reader.close()
+
+    @staticmethod
+    def _row(event):
+        return (wall_time(event.time), event.sensor, event.kind, event.confidence, event.bearing,
+                json.dumps(event.info, default=str) if event.info else None)
+
+    def _run(self, conn):
+        last_prune = 0.0
+        stop = False
+        while not stop:
+            batch, waiters = [], []
+            try:
+                item = self.queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                item = False
+            deadline = time.monotonic() + self.flush_seconds
+            while item is not False:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(self._row(item))
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = False
+
+            if batch:
+                self._write(conn, batch)
+            for waiter in waiters:
+                waiter.set()
+
+            if self.retention_days and time.monotonic() - last_prune > PRUNE_SECONDS:
+                self._prune(conn)
+                last_prune = time.monotonic()
+        conn.close()
+
+    def _write(self, conn, batch):
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO events (time, sensor, kind, confidence, bearing, info) "
+                                     "VALUES (?, ?, ?, ?, ?, ?)", batch)
+            except sqlite3.Error as e:
+                self.errors += 1
+                metrics.count("store_errors")
+                if attempt < WRITE_ATTEMPTS:
+                    time.sleep(RETRY_SECONDS)
+                    continue
+                # Keep the thread (and every later batch) alive rather than wedge the store
+                self.dropped += len(batch)
+                print(f"event store: dropped {len(batch)} events after {attempt} failed writes ({e})")
+                return
+            self.written += len(batch)
+            self.batches += 1
+            return
+
+    def _prune(self, conn):
+        cutoff = time.time() - self.retention_days * 86400
+        try:
+            with conn:
+                conn.execute("DELETE FROM events WHERE time < ?", (cutoff,))
+        except sqlite3.Error as e:
+            self.errors += 1
+            metrics.count("store_errors")
+            print(f"event store: prune failed ({e})")
+
+    def query(self, start, end, sensors=None, kinds=None, min_confidence=None, limit=None):
+        """Events with start <= time < end (Unix times) as dicts, oldest first"""
+        sql = "SELECT time, sensor, kind, confidence, bearing, info FROM events WHERE time >= ? AND time < ?"
+        params = [start, end]
+        if sensors:
+            sql += f" AND sensor IN ({','.join('?' * len(sensors))})"
+            params += list(sensors)
+        if kinds:
+            sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params += list(kinds)
+        if min_confidence is not None:
+            sql += " AND confidence >= ?"
+            params.append(min_confidence)
+        sql += " ORDER BY time"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.reader_lock:
+            rows = self.reader.execute(sql, params).fetchall()
+        return [{'time': t, 'sensor': s, 'kind': k, 'confidence': c, 'bearing': b,
+                 'info': json.loads(i) if i else {}} for t, s, k, c, b, i in rows]
+
+    def summary(self, start, end):
+        """{(sensor, kind): count} for the interval"""
+        with self.reader_lock:
+            rows = self.reader.execute("SELECT sensor, kind, COUNT(*) FROM events WHERE time >= ? AND time < ? "
+                                       "GROUP BY sensor, kind", (start, end)).fetchall()
+        return {(s, k): n for s, k, n in rows}
+
+
+def benchmark(store, rate=500, seconds=4.0, history=200000):
+    """Burst writes at `rate` events/s while timing add(), then time an interval query"""
+    # Pre-fill a day of history so the query runs against a realistic table
+    base = time.time() - 86400
+    with store.reader_lock, store.reader:
+        store.reader.executemany(
+            "INSERT INTO events (time, sensor, kind, confidence, bearing, info) VALUES (?, ?, ?, ?, ?, ?)",
+            ((base + i * 86400 / history, ('audio', 'rf', 'cv')[i % 3], 'drone', 0.5, None, None)
+             for i in range(history)))
+
+    add_times = []
+    start = time.monotonic()
+    n = 0
+    while time.monotonic() - start < seconds:
+        t0 = time.perf_counter()
+        store.add(detection('audio', 0.7, bearing=42.0, band_db=-20.5, n=n))
+        add_times.append(time.perf_counter() - t0)
+        n += 1
+        time.sleep(max(0.0, start + n / rate - time.monotonic()))
+    store.flush()
+    add_times.sort()
+
+    t0 = time.perf_counter()
+    rows = store.query(base + 14 * 3600, base + 14 * 3600 + 180)
+    query_ms = (time.perf_counter() - t0) * 1000
+    print(f"{n} events at {rate}/s: add() median {add_times[len(add_times) // 2] * 1e6:.1f} us, "
+          f"max {add_times[-1] * 1e6:.1f} us | {store.batches} batches, {store.dropped} dropped")
+    print(f"3-minute window query over {history + n} rows: {len(rows)} events in {query_ms:.2f} ms")
+
+
+def print_rows(rows):
+    for row in rows:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row['time']))
+        bearing = f" {row['bearing']:.0f} deg" if row['bearing'] is not None else ""
+        info = ' '.join(f"{k}={v}" for k, v in row['info'].items())
+        print(f"[{stamp}] {row['sensor']:<10} {row['kind']:<6} {row['confidence']:.2f}{bearing} {info}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or benchmark the detection event store")
+    parser.add_argument("--db", default=DB_FILE, help=f"SQLite file (default: {DB_FILE})")
+    parser.add_argument("--from", dest="start", help="Start time, e.g. 14:02 or '2025-04-19 14:02'")
+    parser.add_argument("--to", dest="end", help="End time (default: now)")
+    parser.add_argument("-s", "--sensor", nargs='+', help="Only these sensors")
+    parser.add_argument("--min-confidence", type=float, help="Only events at or above this confidence")
+    parser.add_argument("--bench", action="store_true", help="Benchmark on a temporary database")
+    args = parser.parse_args()
+
+    if args.bench:
+        path = f"/tmp/event_store_bench_{os.getpid()}.db"
+        store = EventStore(path)
+        try:
+            benchmark(store)
+        finally:
+            store.close()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        return
+
+    if not args.start:
+        parser.error("give --from (and optionally --to), or --bench")
+    try:
+        store = EventStore(args.db, read_only=True)
+    except sqlite3.OperationalError as e:
+        print(f"Cannot open {args.db}: {e}")
+        return
+    start = parse_time(args.start)
+    end = parse_time(args.end) if args.end else time.time()
+    t0 = time.perf_counter()
+    rows = store.query(start, end, args.sensor, min_confidence=args.min_confidence)
+    elapsed = (time.perf_counter() - t0) * 1000
+    print_rows(rows)
+    print(f"{len(rows)} events in {elapsed:.2f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import time
+from collections import namedtuple
+
+# Detection event schema shared by every sensor.
+#   time:       time.monotonic() seconds when the evidence was observed
+#   sensor:     'audio' | 'rf' | 'remote_id' | 'cv' | 'ultrasonic' | 'fusion'
+#   kind:       what the event is, e.g. 'drone', 'track', 'cue', 'lost'
+#   confidence: 0..1
+#   bearing:    degrees (0 = array/camera axis, counter-clockwise) or None
+#   info:       sensor specific extras (bssid, rpm, box, track id, ...)
+Detection = namedtuple("Detection", "time sensor kind confidence bearing info")
+
+SENSORS = ('audio', 'rf', 'remote_id', 'cv', 'ultrasonic')
+QUEUE_SIZE = 256          # Events buffered per subscriber before new ones are dropped
+# Wall clock minus monotonic clock, fixed at import so all events share one conversion
+WALL_OFFSET = time.time() - time.monotonic()
+
+
+def now():
+    """The bus clock (monotonic, immune to NTP steps)"""
+    return time.monotonic()
+
+
+def detection(sensor, confidence, kind='drone', bearing=None, t=None, **info):
+    """Build a Detection stamped with the bus clock"""
+    return Detection(now() if t is None else t, sensor, kind, float(confidence), bearing, info)
+
+
+def wall_time(t):
+    """Monotonic event time -> Unix time"""
+    return t + WALL_OFFSET
+
+
+def to_json(event):
+    """One JSON line per event (wall clock added for logs and other hosts)"""
+    out = event._asdict()
+    out['wall_time'] = wall_time(event.time)
+    return json.dumps(out, default=str)
+
+
+def from_json(line):
+    """Inverse of to_json, re-stamping the wall time onto this process's monotonic clock"""
+    data = json.loads(line)
+    t = data['wall_time'] - WALL_OFFSET if 'wall_time' in data else data['time']
+    return Detection(t, data['sensor'], data['kind'], data['confidence'], data['bearing'], data.get('info') or {})
+
+
+class EventBus:
+    """In-process asyncio publish/subscribe for Detection events.
+
+    Every subscriber gets its own bounded queue, so one slow consumer cannot
+    stall producers or other consumers; when a queue is full the new event is
+    dropped and counted in `dropped`. `publish` never blocks and must be
+    called from the loop thread; sensor threads use `publish_threadsafe`.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.subscribers = []     # (queue, sensors filter or None, kinds filter or None)
+        self.dropped = 0
+        self.published = 0
+
+    def subscribe(self, sensors=None, kinds=None, maxsize=QUEUE_SIZE):
+        """New queue receiving events from the given sensors/kinds (None = all)"""
+        queue = asyncio.Queue(maxsize=maxsize)
+        if self.loop is None:
+            try:
+                self.loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+        self.subscribers.append((queue, set(sensors) if sensors else None, set(kinds) if kinds else None))
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers = [s for s in self.subscribers if s[0] is not queue]
+
+    def publish(self, event):
+        self.published += 1
+        for queue, sensors, kinds in self.subscribers:
+            if (sensors and event.sensor not in sensors) or (kinds and event.kind not in kinds):
+                continue
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def publish_threadsafe(self, event):
+        """Publish from a non-loop thread (capture callbacks, executors)"""
+        if self.loop is None:
+            raise RuntimeError("EventBus has no loop yet: subscribe from the loop or pass loop=")
+        self.loop.call_soon_threadsafe(self.publish, event)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# Multi-sensor fusion: detections from all sensors -> confidence-scored drone tracks
+
+import argparse
+import asyncio
+import sys
+from collections import deque
+from events import SENSORS, Detection, from_json, now, to_json
+
+# Fusion settings
+WINDOW_SECONDS = 10.0     # Evidence older than this no longer counts
+BEARING_GATE = 30.0       # Degrees within which a detection joins an existing track
+# How far a single fully confident detection from each sensor is trusted
+SENSOR_WEIGHTS = {'audio': 0.6, 'rf': 0.85, 'remote_id': 0.98, 'cv': 0.9, 'ultrasonic': 0.4}
+REPORT_CHANGE = 0.05      # Publish a track update when its confidence moves this much
+CUE_CONFIDENCE = 0.5      # Track confidence that switches the camera detector on
+CUE_SECONDS = 5.0         # Camera stays on this long after the last cueing track update
+IDENTITY_KEYS = ('uas_id', 'bssid', 'source')  # Info fields that identify one drone across events
+SUPPORT_KINDS = ('pulse',)  # Evidence that can reinforce a track but never starts one (e.g. ultrasonic echoes)
+
+
+def bearing_difference(a, b):
+    """Smallest absolute angle between two bearings in degrees"""
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+class Track:
+    """One suspected drone and the recent evidence for it"""
+
+    def __init__(self, track_id, t):
+        self.id = track_id
+        self.first_seen = t
+        self.last_seen = t
+        self.evidence = {}        # sensor -> deque of (time, confidence)
+        self.bearing = None
+        self.identities = set()
+        self.info = {}            # Latest info dict per sensor
+        self.reported = None      # Confidence at the last published update
+
+    def add(self, event):
+        self.evidence.setdefault(event.sensor, deque(maxlen=64)).append((event.time, event.confidence))
+        self.last_seen = max(self.last_seen, event.time)
+        if event.bearing is not None:
+            self.bearing = event.bearing
+        self.identities.update(str(event.info[k]) for k in IDENTITY_KEYS if event.info.get(k))
+        self.info[event.sensor] = event.info
+
+    def scores(self, t, window=WINDOW_SECONDS):
+        """Per-sensor evidence in 0..1: the best recent confidence, fading linearly with age"""
+        out = {}
+        for sensor, history in self.evidence.items():
+            best = 0.0
+            for seen, confidence in history:
+                age = max(t - seen, 0.0)
+                if age < window:
+                    best = max(best, confidence * (1.0 - age / window))
+            if best > 0:
+                out[sensor] = best
+        return out
+
+    def confidence(self, t, window=WINDOW_SECONDS, weights=SENSOR_WEIGHTS):
+        """Noisy-OR of the weighted sensor scores: independent sensors reinforce each other"""
+        miss = 1.0
+        for sensor, score in self.scores(t, window).items():
+            miss *= 1.0 - weights.get(sensor, 0.5) * score
+        return 1.0 - miss
+
+
+class FusionEngine:
+    """Associates sensor detections into tracks and decides when to run the camera.
+
+    `update` takes one Detection and returns the fusion events it causes:
+    'track' updates (when a track appears or its confidence moves by
+    REPORT_CHANGE) and a 'cue' when the camera detector should be switched on.
+    `expire` returns 'lost' events for tracks without evidence in the window.
+    All times are on the bus clock, so replayed or remote events fuse the
+    same way as live ones.
+    """
+
+    def __init__(self, window=WINDOW_SECONDS, weights=SENSOR_WEIGHTS, bearing_gate=BEARING_GATE,
+                 cue_confidence=CUE_CONFIDENCE, cue_seconds=CUE_SECONDS):
+        self.window = window
+        self.weights = weights
+        self.bearing_gate = bearing_gate
+        self.cue_confidence = cue_confidence
+        self.cue_seconds = cue_seconds
+        self.tracks = {}
+        self.next_id = 1
+        self.cue_until = float('-inf')
+
+    def _associate(self, event, create=True):
+        ids = {str(event.info[k]) for k in IDENTITY_KEYS if event.info.get(k)}
+        if ids:
+            for track in self.tracks.values():
+                if track.identities & ids:
+                    return track
+        candidates = [tr for tr in self.tracks.values() if event.time - tr.last_seen < self.window]
+        if event.bearing is not None:
+            gated = [(bearing_difference(tr.bearing, event.bearing), tr) for tr in candidates
+                     if tr.bearing is not None and bearing_difference(tr.bearing, event.bearing) <= self.bearing_gate]
+            if gated:
+                return min(gated, key=lambda g: g[0])[1]
+            candidates = [tr for tr in candidates if tr.bearing is None]
+        if ids:
+            # An identified drone only merges into an anonymous track
+            candidates = [tr for tr in candidates if not tr.identities]
+        if candidates:
+            return max(candidates, key=lambda tr: tr.last_seen)
+        if not create:
+            return None
+
+        track = Track(self.next_id, event.time)
+        self.next_id += 1
+        self.tracks[track.id] = track
+        return track
+
+    def _track_event(self, track, t, confidence):
+        scores = {s: round(v, 3) for s, v in track.scores(t, self.window).items()}
+        return Detection(t, 'fusion', 'track', confidence, track.bearing,
+                         {'track': track.id, 'sensors': scores, 'ids': sorted(track.identities),
+                          'age': t - track.first_seen})
+
+    def update(self, event):
+        """Fuse one detection; returns the list of fusion events it produced"""
+        if event.sensor == 'fusion' or event.confidence <= 0:
+            return []
+        track = self._associate(event, create=event.kind not in SUPPORT_KINDS)
+        if track is None:
+            return []
+        new_sensor = event.sensor not in track.evidence
+        track.add(event)
+        t = event.time
+        confidence = track.confidence(t, self.window, self.weights)
+
+        out = []
+        if track.reported is None or new_sensor or abs(confidence - track.reported) >= REPORT_CHANGE:
+            track.reported = confidence
+            out.append(self._track_event(track, t, confidence))
+        if confidence >= self.cue_confidence:
+            was_on = self.cv_wanted(t)
+            self.cue_until = t + self.cue_seconds
+            if not was_on:
+                out.append(Detection(t, 'fusion', 'cue', confidence, track.bearing,
+                                     {'track': track.id, 'until': self.cue_until}))
+        return out
+
+    def expire(self, t=None):
+        """Drop tracks with no evidence inside the window; returns their 'lost' events"""
+        t = now() if t is None else t
+        out = []
+        for track_id in [i for i, tr in self.tracks.items() if t - tr.last_seen >= self.window]:
+            track = self.tracks.pop(track_id)
+            out.append(Detection(t, 'fusion', 'lost', 0.0, track.bearing,
+                                 {'track': track.id, 'ids': sorted(track.identities),
+                                  'duration': track.last_seen - track.first_seen}))
+        return out
+
+    def cv_wanted(self, t=None):
+        """True while some track is confident enough to be worth the camera detector"""
+        return (now() if t is None else t) < self.cue_until
+
+    async def run(self, bus, tick=1.0):
+        """Consume sensor events from the bus and publish fusion events back onto it"""
+        queue = bus.subscribe(sensors=SENSORS)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=tick)
+            except asyncio.TimeoutError:
+                event = None
+            if event is not None:
+                for out in self.update(event):
+                    bus.publish(out)
+            for out in self.expire():
+                bus.publish(out)
+
+
+def print_event(event):
+    info = event.info
+    if event.kind == 'track':
+        sensors = ', '.join(f"{s} {v:.2f}" for s, v in info['sensors'].items())
+        bearing = f" bearing {event.bearing:.0f} deg" if event.bearing is not None else ""
+        print(f"[{event.time:9.2f}] track {info['track']}: {event.confidence:.2f}{bearing} ({sensors})")
+    elif event.kind == 'cue':
+        print(f"[{event.time:9.2f}] cue camera for track {info['track']} ({event.confidence:.2f})")
+    elif event.kind == 'lost':
+        print(f"[{event.time:9.2f}] track {info['track']} lost after {info['duration']:.1f} s")
+
+
+def demo_events():
+    """A drone heard first, then seen on Wi-Fi, then confirmed by the camera once cued"""
+    events = [Detection(t, 'audio', 'drone', 0.4 + 0.02 * t, 40.0 + t, {'rpm': 9000})
+              for t in range(0, 12)]
+    events += [Detection(t + 0.5, 'rf', 'drone', 0.9, None, {'bssid': '60:60:1F:11:22:33'})
+               for t in range(4, 14, 2)]
+    events += [Detection(50.0, 'audio', 'drone', 0.3, 200.0, {'rpm': 7000})]
+    return sorted(events, key=lambda e: e.time)
+
+
+def run_events(events, engine):
+    """Feed time-ordered events through the engine, simulating a cued camera"""
+    for event in events:
+        for out in engine.expire(event.time):
+            print_event(out)
+        outputs = engine.update(event)
+        for out in outputs:
+            print_event(out)
+        if event.sensor != 'cv' and engine.cv_wanted(event.time):
+            # What a cued camera would report a moment later
+            for out in engine.update(Detection(event.time + 0.1, 'cv', 'drone', 0.8, event.bearing, {})):
+                print_event(out)
+    for out in engine.expire(events[-1].time + engine.window):
+        print_event(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuse sensor detections into drone tracks")
+    parser.add_argument("--replay", help="JSON-lines detection log (events.to_json format) to fuse")
+    parser.add_argument("--json", action="store_true", help="Print fusion events as JSON lines")
+    args = parser.parse_args()
+
+    engine = FusionEngine()
+    if args.replay:
+        with open(args.replay) as f:
+            events = sorted((from_json(line) for line in f if line.strip()), key=lambda e: e.time)
+        for event in events:
+            for out in engine.expire(event.time) + engine.update(event):
+                if args.json:
+                    print(to_json(out))
+                else:
+                    print_event(out)
+        return
+    run_events(demo_events(), engine)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# Thermal/load-aware quality governor: trades camera rate, YOLO size and analysis rates for stable latency
+
+import argparse
+import glob
+import os
+import threading
+import time
+from collections import deque
+import metrics
+
+# Sources
+THERMAL_ZONE = "/sys/class/thermal/thermal_zone0/temp"     # millidegrees C (the SoC on a Pi)
+CPUFREQ = "/sys/devices/system/cpu/cpu0/cpufreq"
+PROC_STAT = "/proc/stat"
+PROC_LOADAVG = "/proc/loadavg"
+
+# Quality ladder, best first: camera fps, YOLO input size, analyse every Nth frame, audio hop (samples)
+LEVELS = (
+    {'fps': 30, 'imgsz': 640, 'stride': 1, 'audio_hop': 2048},
+    {'fps': 20, 'imgsz': 512, 'stride': 1, 'audio_hop': 2048},
+    {'fps': 15, 'imgsz': 416, 'stride': 2, 'audio_hop': 4096},
+    {'fps': 10, 'imgsz': 320, 'stride': 3, 'audio_hop': 4096},
+    {'fps': 5, 'imgsz': 256, 'stride': 4, 'audio_hop': 8192},
+)
+
+# Governor settings
+INTERVAL = 2.0            # Seconds between samples
+TEMP_SOFT = 70.0          # Step down above this (the Pi starts soft throttling at 80 C)
+TEMP_HARD = 78.0          # Drop two levels at once above this; detections can't boost past one level
+TEMP_COOL = 65.0          # Step up only below this
+BUSY_HIGH = 0.90          # CPU busy fraction (all cores) that counts as overloaded
+BUSY_LOW = 0.60
+FREQ_DROP = 0.90          # Current/max frequency below this while busy means the firmware is throttling
+LATENCY_BUDGET = 0.25     # Seconds; p95 detection latency above this steps down
+LATENCY_WINDOW = 50       # Latencies kept for the p95
+DWELL_SECONDS = 30.0      # Quality only rises this long after the last change (hysteresis)
+STEP_DOWN_SECONDS = 12.0  # At most one soft step down per this long (the SoC heats over minutes, not samples)
+BOOST_SECONDS = 30.0      # How long a detection holds the raised quality
+BOOST_LEVELS = 2          # Levels a detection raises quality by (one when above TEMP_HARD)
+
+
+def _read(path, default=None):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def read_temperature(path=THERMAL_ZONE):
+    """SoC temperature in C, or None when there is no thermal zone"""
+    value = _read(path)
+    return int(value) / 1000 if value and value.lstrip('-').isdigit() else None
+
+
+def read_frequency(cpufreq=CPUFREQ):
+    """(current, max) CPU frequency in MHz, or (None, None)"""
+    cur, top = _read(os.path.join(cpufreq, "scaling_cur_freq")), _read(os.path.join(cpufreq, "cpuinfo_max_freq"))
+    if not (cur and top and cur.isdigit() and top.isdigit()):
+        return None, None
+    return int(cur) / 1000, int(top) / 1000
+
+
+def read_cpu_times(path=PROC_STAT):
+    """(busy, total) jiffies summed over all cores"""
+    fields = [int(v) for v in _read(path, "cpu 0 0 0 0").splitlines()[0].split()[1:]]
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)   # idle + iowait
+    return sum(fields) - idle, sum(fields)
+
+
+def read_loadavg(path=PROC_LOADAVG):
+    value = _read(path)
+    return float(value.split()[0]) if value else None
+
+
+class Governor:
+    """Chooses a quality level from temperature, throttling, CPU load and latency.
+
+    Quality drops when any signal says the Pi is running hot or behind, one
+    level per STEP_DOWN_SECONDS (two at once above TEMP_HARD), and only rises
+    again DWELL_SECONDS after the last change, so the settings don't
+    oscillate around a threshold or run away while a change takes effect.
+    Soft step-downs wait while a detection boost is active. A detection (`boost()`)
+    raises quality by BOOST_LEVELS for BOOST_SECONDS; above TEMP_HARD only
+    by one, so tracking a drone can't push the Pi into a throttling cliff.
+    """
+
+    def __init__(self, levels=LEVELS, thermal_zone=THERMAL_ZONE, cpufreq=CPUFREQ, proc_stat=PROC_STAT,
+                 clock=time.monotonic):
+        self.levels = levels
+        self.thermal_zone, self.cpufreq, self.proc_stat = thermal_zone, cpufreq, proc_stat
+        self.clock = clock
+        self.level = 0
+        self.base_level = 0       # Level chosen from conditions, without the detection boost
+        self.last_change = clock()
+        self.boost_until = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.last_cpu = read_cpu_times(proc_stat)
+        self.sample = {}
+        self.lock = threading.Lock()
+        metrics.gauge("governor_level", lambda: self.level)
+        metrics.gauge("cpu_temp_c", lambda: self.sample.get('temp') or 0.0)
+        metrics.gauge("cpu_freq_mhz", lambda: self.sample.get('freq') or 0.0)
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def observe_latency(self, seconds):
+        """Report one end-to-end detection latency"""
+        self.latencies.append(seconds)
+
+    def boost(self):
+        """A drone was detected: raise quality for BOOST_SECONDS"""
+        self.boost_until = self.clock() + BOOST_SECONDS
+        with self.lock:
+            self._apply()
+
+    def read(self):
+        """One sample of every signal (None where the platform doesn't expose it)"""
+        busy, total = read_cpu_times(self.proc_stat)
+        d_busy, d_total = busy - self.last_cpu[0], total - self.last_cpu[1]
+        self.last_cpu = (busy, total)
+        freq, max_freq = read_frequency(self.cpufreq)
+        latencies = sorted(self.latencies)
+        return {'temp': read_temperature(self.thermal_zone), 'freq': freq, 'max_freq': max_freq,
+                'busy': d_busy / d_total if d_total > 0 else None, 'load': read_loadavg(),
+                'p95': latencies[int(len(latencies) * 0.95)] if latencies else None}
+
+    def step(self, sample=None):
+        """Update the level from a sample (read one if not given); returns the settings in force"""
+        sample = self.read() if sample is None else sample
+        temp, busy, p95 = sample.get('temp'), sample.get('busy'), sample.get('p95')
+        freq, max_freq = sample.get('freq'), sample.get('max_freq')
+        throttled = freq is not None and max_freq and busy is not None and busy > BUSY_HIGH * 0.5 \
+            and freq < max_freq * FREQ_DROP
+        worst = len(self.levels) - 1
+        now = self.clock()
+
+        with self.lock:
+            self.sample = sample
+            if temp is not None and temp >= TEMP_HARD:
+                self.base_level = min(worst, self.base_level + 2)
+                self.last_change = now
+            elif (temp is not None and temp >= TEMP_SOFT) or throttled or \
+                    (busy is not None and busy >= BUSY_HIGH) or (p95 is not None and p95 > LATENCY_BUDGET):
+                # Give the last step time to show in temperature before taking another. While a
+                # detection boost holds quality up, its heat is expected and would otherwise pile
+                # up in base_level and land all at once when the boost ends
+                if now - self.last_change >= STEP_DOWN_SECONDS and self.base_level < worst and \
+                        now >= self.boost_until:
+                    self.base_level += 1
+                    self.last_change = now
+                    self.latencies.clear()   # Judge the new level on its own latencies
+            elif (temp is None or temp < TEMP_COOL) and (busy is None or busy < BUSY_LOW) and \
+                    (p95 is None or p95 < LATENCY_BUDGET / 2) and now - self.last_change >= DWELL_SECONDS:
+                if self.base_level > 0:
+                    self.base_level -= 1
+                    self.latencies.clear()
+                self.last_change = now
+            self._apply()
+            return self.settings
+
+    def _apply(self):
+        level = self.base_level
+        if self.clock() < self.boost_until:
+            hot = self.sample.get('temp') is not None and self.sample['temp'] >= TEMP_HARD
+            level = max(level - (1 if hot else BOOST_LEVELS), 0)
+        if level != self.level:
+            print(f"[governor] level {self.level} -> {level}: {self.levels[level]} ({describe(self.sample)})")
+            self.level = level
+
+    def start_thread(self, interval=INTERVAL):
+        """Sample in a daemon thread, for the standalone (non-asyncio) scripts"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.step()
+        thread = threading.Thread(target=loop, name="governor", daemon=True)
+        thread.start()
+        return thread
+
+
+def describe(sample):
+    parts = []
+    if sample.get('temp') is not None:
+        parts.append(f"{sample['temp']:.1f} C")
+    if sample.get('freq') is not None:
+        parts.append(f"{sample['freq']:.0f}/{sample['max_freq']:.0f} MHz")
+    if sample.get('busy') is not None:
+        parts.append(f"busy {sample['busy'] * 100:.0f}%")
+    if sample.get('p95') is not None:
+        parts.append(f"p95 {sample['p95'] * 1000:.0f} ms")
+    return ', '.join(parts) or "no signals"
+
+
+def simulate(governed, minutes=30, ambient=35.0):
+    """Toy passively cooled Pi running YOLO; returns per-second detection latencies and the final temperature.
+
+    The SoC heads towards ambient + 55 C x (fraction of the four cores busy)
+    with a two-minute time constant. At 80 C the firmware halves the clock,
+    which doubles every inference, and once demand exceeds the cores frames
+    queue and latency climbs: the cliff the governor is meant to avoid.
+    """
+    t = [0.0]
+    governor = Governor(clock=lambda: t[0])
+    temp = ambient
+    latencies = []
+    for second in range(minutes * 60):
+        t[0] = float(second)
+        settings = LEVELS[governor.level if governed else 0]
+        throttled = temp >= 80.0
+        inference = 0.12 * (settings['imgsz'] / 640) ** 2 * (2 if throttled else 1)   # Seconds on one core
+        demand = settings['fps'] / settings['stride'] * inference                     # Core-seconds per second
+        busy = min(1.0, demand / 4)
+        temp += (ambient + 55 * busy - temp) / 120
+        latencies.append(inference * max(1.0, demand / 4))
+        if governed:
+            governor.observe_latency(latencies[-1])
+            if second % INTERVAL == 0:
+                governor.step({'temp': temp, 'busy': busy, 'freq': 750 if throttled else 1500, 'max_freq': 1500,
+                               'p95': sorted(governor.latencies)[int(len(governor.latencies) * 0.95)]})
+            if second % 300 == 150:
+                governor.boost()   # A drone passes every five minutes
+    return latencies, temp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch temperature/frequency/load and pick quality settings")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help=f"Seconds between samples (default: {INTERVAL})")
+    parser.add_argument("--simulate", action="store_true", help="Compare fixed and governed settings on a thermal model")
+    args = parser.parse_args()
+
+    if args.simulate:
+        for governed in (False, True):
+            latencies, temp = simulate(governed)
+            tail = sorted(latencies[300:])   # After the first five minutes of warm-up
+            print(f"{'governed' if governed else 'fixed    '}: p50 {tail[len(tail) // 2] * 1000:6.0f} ms | "
+                  f"p95 {tail[int(len(tail) * 0.95)] * 1000:6.0f} ms | max {tail[-1] * 1000:6.0f} ms | "
+                  f"final {temp:.1f} C")
+        return
+
+    governor = Governor()
+    zones = glob.glob("/sys/class/thermal/thermal_zone*")
+    print(f"Thermal zones: {len(zones)} | cpufreq: {'yes' if os.path.isdir(CPUFREQ) else 'no'}")
+    try:
+        while True:
+            time.sleep(args.interval)
+            settings = governor.step()
+            print(f"[{time.strftime('%H:%M:%S')}] {describe(governor.sample)} -> level {governor.level} {settings}")
+    except KeyboardInterrupt:
+        print("Stopped by User")
+
+
+if __name__ == "__main__":
+    main()
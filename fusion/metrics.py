@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# Low-overhead hot-path metrics: stage timers, histograms, counters, gauges, CPU/RSS export
+
+import argparse
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Metrics settings
+PREFIX = "drone"
+# Stage-duration histogram bucket upper bounds in seconds: 50 us .. ~6.5 s, doubling
+BUCKETS = tuple(50e-6 * 2 ** i for i in range(18))
+TEXTFILE_INTERVAL = 15.0  # Seconds between textfile rewrites (node_exporter textfile collector)
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class Histogram:
+    """Fixed-bucket duration histogram; observe() is a bisect and three adds under a lock"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.total += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Approximate quantile (upper bound of the bucket holding it)"""
+        with self.lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for bound, n in zip(self.bounds + (float('inf'),), counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Registry:
+    """Named stage histograms, counters and gauges with Prometheus text output.
+
+    Gauges may be callables, which are sampled only when metrics are exported,
+    so queue depths and similar values cost nothing on the hot path.
+    """
+
+    def __init__(self, prefix=PREFIX, enabled=True):
+        self.prefix = prefix
+        self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def stage(self, name):
+        """Histogram for a named stage (created on first use)"""
+        hist = self.stages.get(name)
+        if hist is None:
+            with self.lock:
+                hist = self.stages.setdefault(name, Histogram())
+        return hist
+
+    def timer(self, name):
+        """Context manager timing one pass through a stage"""
+        return _Timer(self.stage(name)) if self.enabled else NULL_TIMER
+
+    def observe(self, name, seconds):
+        if self.enabled:
+            self.stage(name).observe(seconds)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        """Set a gauge to a number, or to a zero-argument callable sampled at export"""
+        self.gauges[name] = value
+
+    def snapshot(self):
+        """{'stages': {name: {...}}, 'counters': {...}, 'gauges': {...}} including process stats"""
+        gauges = {}
+        for name, value in list(self.gauges.items()):
+            try:
+                gauges[name] = float(value() if callable(value) else value)
+            except Exception:
+                continue
+        gauges.update(process_stats())
+        stages = {name: {'count': h.count, 'sum': h.total, 'p50': h.quantile(0.5), 'p99': h.quantile(0.99)}
+                  for name, h in list(self.stages.items())}
+        return {'stages': stages, 'counters': dict(self.counters), 'gauges': gauges}
+
+    def prometheus(self):
+        """Prometheus text exposition format"""
+        p = self.prefix
+        lines = [f"# TYPE {p}_stage_seconds histogram"]
+        for name, hist in sorted(self.stages.items()):
+            with hist.lock:
+                counts, total, count = list(hist.counts), hist.total, hist.count
+            cumulative = 0
+            for bound, n in zip(hist.bounds, counts):
+                cumulative += n
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {total:.9f}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {count}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+        for name, value in sorted(self.snapshot()['gauges'].items()):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {value:.10g}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Atomically replace `path` (e.g. for node_exporter's textfile collector)"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def start_textfile(self, path, interval=TEXTFILE_INTERVAL):
+        """Rewrite the textfile every `interval` seconds from a daemon thread"""
+        def loop():
+            while True:
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    print(f"metrics: cannot write {path}: {e}")
+                time.sleep(interval)
+        thread = threading.Thread(target=loop, name="metrics-textfile", daemon=True)
+        thread.start()
+        return thread
+
+    def start_http(self, port, host="127.0.0.1"):
+        """Serve /metrics on a local port from a daemon thread"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.prometheus().encode()
+                self.send_response(200 if self.path in ("/", "/metrics") else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+_cpu_last = [None, None]
+
+
+def process_stats():
+    """CPU (percent of one core since the previous call), RSS bytes and thread count"""
+    t = os.times()
+    cpu, now = t.user + t.system, time.monotonic()
+    stats = {}
+    if _cpu_last[0] is not None and now > _cpu_last[1]:
+        stats['cpu_percent'] = (cpu - _cpu_last[0]) / (now - _cpu_last[1]) * 100
+    _cpu_last[0], _cpu_last[1] = cpu, now
+    stats['cpu_seconds'] = cpu
+    try:
+        with open("/proc/self/statm") as f:
+            stats['rss_bytes'] = int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    stats['threads'] = threading.active_count()
+    return stats
+
+
+def process_uptime():
+    """Seconds since this process was started (from /proc), or None where unavailable"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, clock ticks after boot); split after the ')' closing the command name
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+# Process-wide default registry used by the sensor scripts
+REGISTRY = Registry()
+timer = REGISTRY.timer
+observe = REGISTRY.observe
+count = REGISTRY.count
+gauge = REGISTRY.gauge
+
+
+def benchmark(calls=200000):
+    """Per-call cost of the instrumentation and what it adds up to at sensor rates"""
+    registry = Registry()
+    start = time.perf_counter()
+    for _ in range(calls):
+        with registry.timer("bench"):
+            pass
+    timer_ns = (time.perf_counter() - start) / calls * 1e9
+    start = time.perf_counter()
+    for _ in range(calls):
+        registry.count("bench")
+    count_ns = (time.perf_counter() - start) / calls * 1e9
+    start = time.perf_counter()
+    for _ in range(calls):
+        pass
+    loop_ns = (time.perf_counter() - start) / calls * 1e9
+    timer_ns, count_ns = timer_ns - loop_ns, count_ns - loop_ns
+
+    start = time.perf_counter()
+    for _ in range(100):
+        registry.prometheus()
+    export_ms = (time.perf_counter() - start) / 100 * 1000
+
+    # Audio at 44.1 kHz / 1024 (~43 blocks/s) and camera at 30 fps, ~4 timed stages and 2 counters each
+    per_second = (43 + 30) * 4
+    counts_per_second = (43 + 30) * 2
+    load = (per_second * timer_ns + counts_per_second * count_ns) / 1e9 * 100
+    print(f"timer: {timer_ns:.0f} ns/stage | counter: {count_ns:.0f} ns | export: {export_ms:.2f} ms")
+    print(f"At {per_second} timed stages/s + {counts_per_second} counts/s: {load:.4f}% of one core "
+          f"(+{export_ms / TEXTFILE_INTERVAL / 10:.4f}% for a textfile every {TEXTFILE_INTERVAL:.0f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics layer self-test: overhead benchmark or demo endpoint")
+    parser.add_argument("--port", type=int, help="Serve demo metrics on this local port")
+    args = parser.parse_args()
+
+    benchmark()
+    if args.port:
+        REGISTRY.start_http(args.port)
+        print(f"Serving http://127.0.0.1:{args.port}/metrics (Ctrl+C to stop)")
+        try:
+            while True:
+                with timer("demo"):
+                    time.sleep(0.01)
+                count("demo_loops")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
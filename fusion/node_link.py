@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# Node -> aggregator streaming: batched binary detections and feature summaries, per-node clock offsets
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import time
+from collections import deque
+import numpy as np
+import metrics
+from events import SENSORS, Detection, detection, now, to_json
+
+# Link settings
+PORT = 7600
+BATCH_EVENTS = 256        # Events per EVENTS message at most
+BATCH_SECONDS = 0.2       # A partial batch is sent after this long
+SEND_BUFFER = 20000       # Events kept while disconnected or backpressured; the oldest go first
+RECONNECT_MIN = 0.5       # Reconnect backoff starts here and doubles ...
+RECONNECT_MAX = 10.0      # ... up to this (seconds)
+HIGH_WATER = 256 * 1024   # Socket write buffer (bytes) above which the sender waits for the network
+SYNC_SECONDS = 5.0        # Aggregator clock probe interval per node
+SYNC_SAMPLES = 8          # Offset uses the lowest-RTT probe of the last few
+MERGE_DELAY = 0.5         # Seconds events wait at the aggregator so other nodes' events can sort in
+REPORT_SECONDS = 10.0
+
+# Wire format: every message is HEADER + payload, little endian.
+#   HELLO   node -> agg  u8 session (random per NodeLink), node id (UTF-8)
+#   EVENTS  node -> agg  u8 sequence number of the first event, u16 count, count x EVENT_DTYPE records,
+#                        JSON {index: info} for non-empty infos
+#   SUMMARY node -> agg  f8 time, u1 sensor, u2 n, n x float16 feature values
+#   PING    agg -> node  f8 aggregator clock
+#   PONG    node -> agg  f8 aggregator clock echoed, f8 node clock
+#   ACK     agg -> node  u8 events received so far this session (cumulative)
+HEADER = struct.Struct("<BI")     # message type, payload bytes
+HELLO, EVENTS, SUMMARY, PING, PONG, ACK = range(1, 7)
+EVENT_DTYPE = np.dtype([('time', '<f8'), ('sensor', 'u1'), ('kind', 'u1'),
+                        ('confidence', '<f4'), ('bearing', '<f4')])   # 18 bytes per event
+SENSOR_CODES = SENSORS + ('fusion',)
+KIND_CODES = ('drone', 'track', 'cue', 'lost', 'pulse')
+OTHER_KIND = 255          # Kind not in KIND_CODES: the name travels in info['kind']
+COUNT = struct.Struct("<H")
+SUMMARY_HEAD = struct.Struct("<dBH")
+CLOCKS = struct.Struct("<dd")
+SEQ = struct.Struct("<Q")         # HELLO session, EVENTS first sequence number, ACK count
+
+
+def encode_events(events):
+    """EVENTS payload for a list of Detections"""
+    records = np.empty(len(events), dtype=EVENT_DTYPE)
+    infos = {}
+    for i, e in enumerate(events):
+        kind = KIND_CODES.index(e.kind) if e.kind in KIND_CODES else OTHER_KIND
+        records[i] = (e.time, SENSOR_CODES.index(e.sensor), kind, e.confidence,
+                      np.nan if e.bearing is None else e.bearing)
+        if e.info or kind == OTHER_KIND:
+            infos[i] = dict(e.info, kind=e.kind) if kind == OTHER_KIND else e.info
+    extra = json.dumps(infos, separators=(',', ':'), default=str).encode() if infos else b''
+    return COUNT.pack(len(events)) + records.tobytes() + extra
+
+
+def decode_events(payload, offset=0.0, node=None):
+    """Inverse of encode_events; node times are shifted by -offset onto the aggregator clock"""
+    n, = COUNT.unpack_from(payload)
+    end = COUNT.size + n * EVENT_DTYPE.itemsize
+    records = np.frombuffer(payload, dtype=EVENT_DTYPE, count=n, offset=COUNT.size)
+    infos = json.loads(payload[end:]) if len(payload) > end else {}
+    times = (records['time'] - offset).tolist()
+    bearings = records['bearing'].tolist()
+    events = []
+    for i, (sensor, kind, confidence) in enumerate(zip(records['sensor'].tolist(), records['kind'].tolist(),
+                                                       records['confidence'].tolist())):
+        info = dict(infos.get(str(i), ()))
+        kind = info.pop('kind') if kind == OTHER_KIND else KIND_CODES[kind]
+        if node is not None:
+            info['node'] = node
+        bearing = bearings[i]
+        events.append(Detection(times[i], SENSOR_CODES[sensor], kind, confidence,
+                                None if bearing != bearing else bearing, info))
+    return events
+
+
+def message(kind, payload=b''):
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_message(reader):
+    kind, size = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return kind, (await reader.readexactly(size) if size else b'')
+
+
+class NodeLink:
+    """Streams one node's events to the aggregator.
+
+    `send` and `summary` never block and may be called from any thread:
+    they append to a bounded buffer that a single sender coroutine drains
+    in batches. While the aggregator is slow or unreachable the buffer
+    fills and the oldest events are dropped (and counted); the sender
+    reconnects with exponential backoff and resumes from the buffer.
+    Batches carry sequence numbers and stay in `unacked` until the
+    aggregator's cumulative ACK covers them; after a reconnect they are sent
+    again and the aggregator skips what it already has. `sent` counts
+    acknowledged events only.
+    """
+
+    def __init__(self, host, port=PORT, node_id=None, buffer=SEND_BUFFER, clock_skew=0.0):
+        self.host, self.port = host, port
+        self.node_id = node_id or socket.gethostname()
+        self.buffer = deque()
+        self.buffer_size = buffer
+        self.summaries = deque(maxlen=64)
+        self.clock_skew = clock_skew   # Test hook: pretend this node's clock is off by this much
+        self.session = int.from_bytes(os.urandom(SEQ.size), "little")
+        self.next_seq = 0         # Sequence number of the next event put on the wire
+        self.unacked = deque()    # (first sequence number, events) written but not acknowledged
+        self.dropped = 0
+        self.sent = 0
+        self.bytes = 0
+        self.connects = 0
+        self.connected = False
+
+    def clock(self):
+        return now() + self.clock_skew
+
+    def send(self, event):
+        if len(self.buffer) >= self.buffer_size:
+            self.buffer.popleft()
+            self.dropped += 1
+        if self.clock_skew:
+            event = event._replace(time=event.time + self.clock_skew)
+        self.buffer.append(event)
+
+    def summary(self, sensor, values, t=None):
+        """Queue a compact feature vector (e.g. band levels) instead of raw audio/video"""
+        t = self.clock() if t is None else t + self.clock_skew
+        values = np.asarray(values, dtype='<f2')
+        self.summaries.append(SUMMARY_HEAD.pack(t, SENSOR_CODES.index(sensor), len(values)) + values.tobytes())
+
+    async def run(self):
+        delay = RECONNECT_MIN
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                print(f"link: {self.host}:{self.port} unreachable ({e.strerror or e}); retry in {delay:.1f} s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX)
+                continue
+            delay = RECONNECT_MIN
+            self.connects += 1
+            self.connected = True
+            writer.transport.set_write_buffer_limits(high=HIGH_WATER)
+            pong = asyncio.create_task(self._answer_pings(reader, writer))
+            try:
+                writer.write(message(HELLO, SEQ.pack(self.session) + self.node_id.encode()))
+                # Whatever the last connection didn't get acknowledged goes first, under its old numbers
+                for first, batch in self.unacked:
+                    writer.write(message(EVENTS, SEQ.pack(first) + encode_events(batch)))
+                await self._send_loop(writer, pong)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                self.connected = False
+                pong.cancel()
+                writer.close()
+            print(f"link: disconnected from {self.host}:{self.port}, reconnecting")
+
+    async def _answer_pings(self, reader, writer):
+        while True:
+            kind, payload = await read_message(reader)
+            if kind == PING:
+                writer.write(message(PONG, payload[:8] + struct.pack("<d", self.clock())))
+            elif kind == ACK:
+                received, = SEQ.unpack(payload)
+                while self.unacked and self.unacked[0][0] + len(self.unacked[0][1]) <= received:
+                    self.sent += len(self.unacked.popleft()[1])
+
+    async def _send_loop(self, writer, pong):
+        while not pong.done():
+            deadline = time.monotonic() + BATCH_SECONDS
+            while len(self.buffer) < BATCH_EVENTS and time.monotonic() < deadline and not pong.done():
+                await asyncio.sleep(min(0.02, BATCH_SECONDS))
+            while self.summaries:
+                data = message(SUMMARY, self.summaries.popleft())
+                writer.write(data)
+                self.bytes += len(data)
+            batch = [self.buffer.popleft() for _ in range(min(BATCH_EVENTS, len(self.buffer)))]
+            if batch:
+                data = message(EVENTS, SEQ.pack(self.next_seq) + encode_events(batch))
+                self.unacked.append((self.next_seq, batch))
+                self.next_seq += len(batch)
+                writer.write(data)
+                # Blocks only above HIGH_WATER: the network or the aggregator is behind
+                await writer.drain()
+                self.bytes += len(data)
+            else:
+                await writer.drain()
+        pong.result()   # Re-raise whatever ended the connection
+
+    def start_thread(self):
+        """Run the link on its own event loop, for the standalone (non-asyncio) sensor scripts"""
+        import threading
+        thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="node-link", daemon=True)
+        thread.start()
+        return thread
+
+
+class NodeState:
+    def __init__(self, node_id, session=0):
+        self.node_id = node_id
+        self.session = session
+        self.received = None      # Next expected event sequence number (what ACKs report)
+        self.gaps = 0             # Events the sequence numbers say never arrived
+        self.samples = deque(maxlen=SYNC_SAMPLES)   # (rtt, offset)
+        self.offset = 0.0
+        self.rtt = None
+        self.events = 0
+        self.batches = 0
+        self.bytes = 0
+        self.summaries = {}       # sensor -> (time, values)
+        self.last_seen = now()
+
+    def add_sample(self, sent, node_time, received):
+        """NTP-style probe: node clock minus aggregator clock at the probe's midpoint"""
+        rtt = received - sent
+        self.samples.append((rtt, node_time - (sent + received) / 2))
+        # The fastest round trip has the least queueing asymmetry, so its offset is the most trustworthy
+        self.rtt, self.offset = min(self.samples)
+
+
+class Aggregator:
+    """Accepts node links, maps every node's times onto the local clock and merges them in time order.
+
+    Decoding is vectorized per batch and all nodes share one loop, so the
+    per-event cost is a few attribute copies; merged events are released
+    MERGE_DELAY after they happened, in timestamp order, to `on_event`.
+    Each batch is acknowledged once it is in the merge heap, and batches a
+    reconnecting node sends again are skipped by sequence number.
+    """
+
+    def __init__(self, on_event=None, merge_delay=MERGE_DELAY):
+        self.nodes = {}
+        self.on_event = on_event or (lambda event: None)
+        self.merge_delay = merge_delay
+        self.pending = []         # Heap of (time, seq, event)
+        self.seq = itertools.count()
+        self.released = 0
+        self.late = 0
+        self.last_released = float('-inf')
+        self.handlers = set()
+
+    async def handle(self, reader, writer):
+        node = None
+        probe = None
+        self.handlers.add(asyncio.current_task())
+        try:
+            kind, payload = await read_message(reader)
+            if kind != HELLO:
+                return
+            session, = SEQ.unpack_from(payload)
+            node_id = payload[SEQ.size:].decode(errors='replace')
+            node = self.nodes.get(node_id)
+            if node is None or node.session != session:
+                # New node or restarted process: its sequence numbers start again from zero
+                node = self.nodes[node_id] = NodeState(node_id, session)
+            print(f"aggregator: node {node_id} connected")
+            probe = asyncio.create_task(self._probe(node, writer))
+            while True:
+                kind, payload = await read_message(reader)
+                node.last_seen = now()
+                node.bytes += HEADER.size + len(payload)
+                if kind == EVENTS:
+                    first, = SEQ.unpack_from(payload)
+                    events = decode_events(payload[SEQ.size:], node.offset, node.node_id)
+                    if node.received is None:
+                        node.received = first   # Joined mid-session (e.g. this aggregator restarted)
+                    if first > node.received:
+                        node.gaps += first - node.received
+                    events = events[max(0, node.received - first):]   # Already have these from a resend
+                    node.received = max(node.received, first + len(events))
+                    for event in events:
+                        heapq.heappush(self.pending, (event.time, next(self.seq), event))
+                    writer.write(message(ACK, SEQ.pack(node.received)))
+                    node.events += len(events)
+                    node.batches += 1
+                elif kind == SUMMARY:
+                    t, sensor, n = SUMMARY_HEAD.unpack_from(payload)
+                    values = np.frombuffer(payload, dtype='<f2', count=n, offset=SUMMARY_HEAD.size)
+                    node.summaries[SENSOR_CODES[sensor]] = (t - node.offset, values.astype(float).tolist())
+                elif kind == PONG:
+                    sent, node_time = CLOCKS.unpack(payload)
+                    node.add_sample(sent, node_time, now())
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass   # Cancelled only by run() shutting down; returning keeps asyncio from logging it
+        finally:
+            self.handlers.discard(asyncio.current_task())
+            if probe:
+                probe.cancel()
+            writer.close()
+            if node:
+                print(f"aggregator: node {node.node_id} disconnected")
+
+    async def _probe(self, node, writer):
+        # A quick burst first so offsets are good before the first events are merged
+        for interval in itertools.chain([0.05] * 4, itertools.repeat(SYNC_SECONDS)):
+            writer.write(message(PING, struct.pack("<d", now())))
+            await asyncio.sleep(interval)
+
+    def release(self, until=None):
+        """Hand events older than `until` (default now - merge delay) to on_event in time order"""
+        until = now() - self.merge_delay if until is None else until
+        while self.pending and self.pending[0][0] <= until:
+            t, _, event = heapq.heappop(self.pending)
+            if t < self.last_released:
+                self.late += 1   # Arrived after later events were released; still delivered
+            self.last_released = max(self.last_released, t)
+            self.released += 1
+            self.on_event(event)
+
+    async def run(self, host="0.0.0.0", port=PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"aggregator: listening on {host}:{port}")
+        async with server:
+            try:
+                while True:
+                    await asyncio.sleep(0.05)
+                    self.release()
+            finally:
+                # Connection handlers would otherwise outlive the server and keep it from closing
+                handlers = list(self.handlers)
+                for task in handlers:
+                    task.cancel()
+                await asyncio.gather(*handlers, return_exceptions=True)
+
+    def report(self):
+        for node in sorted(self.nodes.values(), key=lambda n: n.node_id):
+            rtt = f"{node.rtt * 1000:.2f} ms" if node.rtt is not None else "n/a"
+            print(f"  {node.node_id:<12} offset {node.offset * 1000:+9.2f} ms  rtt {rtt}  "
+                  f"{node.events} events in {node.batches} batches, {node.bytes / 1024:.0f} KiB"
+                  + (f", {node.gaps} missing" if node.gaps else ""))
+
+
+def demo_node(host, port, node_id, rate, seconds, skew):
+    """A synthetic node: `rate` detections/s from rotating sensors, plus a summary each second"""
+    link = NodeLink(host, port, node_id, clock_skew=skew)
+
+    async def produce():
+        sender = asyncio.create_task(link.run())
+        start = time.monotonic()
+        n = 0
+        while time.monotonic() - start < seconds:
+            n += 1
+            link.send(detection(SENSORS[n % 3], 0.6, bearing=(n * 7) % 360, seq=n))
+            if n % max(1, rate) == 0:
+                link.summary('audio', [-20.5, -18.0, -31.2, 0.25])
+            await asyncio.sleep(max(0.0, start + n / rate - time.monotonic()))
+        while (link.buffer or link.unacked) and time.monotonic() - start < seconds + 5:
+            await asyncio.sleep(0.05)
+        sender.cancel()
+        unacked = sum(len(batch) for _, batch in link.unacked) + len(link.buffer)
+        print(json.dumps({'node': node_id, 'sent': link.sent, 'dropped': link.dropped, 'unacked': unacked,
+                          'bytes': link.bytes}))
+
+    asyncio.run(produce())
+
+
+def benchmark(nodes=24, rate=200, seconds=8.0, port=PORT + 1):
+    """Spawn `nodes` local node processes (each with its own clock skew) and measure the aggregator"""
+    received = []
+    aggregator = Aggregator(on_event=received.append)
+    skews = {f"node{i:02d}": (i - nodes / 2) * 0.25 for i in range(nodes)}
+
+    async def run():
+        server = asyncio.create_task(aggregator.run("127.0.0.1", port))
+        await asyncio.sleep(0.2)
+        script = os.path.abspath(__file__)
+        procs = [await asyncio.create_subprocess_exec(
+            sys.executable, script, "--node", node_id, "--aggregator", f"127.0.0.1:{port}",
+            "--rate", str(rate), "--seconds", str(seconds), "--clock-skew", str(skew),
+            stdout=subprocess.PIPE) for node_id, skew in skews.items()]
+        cpu0, t0 = time.process_time(), time.monotonic()
+        outputs = [await p.communicate() for p in procs]
+        cpu, elapsed = time.process_time() - cpu0, time.monotonic() - t0
+        await asyncio.sleep(aggregator.merge_delay + 0.1)
+        aggregator.release()
+        server.cancel()
+        return [json.loads(out.decode().strip().splitlines()[-1]) for out, _ in outputs], cpu, elapsed
+
+    stats, cpu, elapsed = asyncio.run(run())
+    sent = sum(s['sent'] for s in stats)
+    wire = sum(s['bytes'] for s in stats)
+    errors = [abs(node.offset - skews[name]) for name, node in aggregator.nodes.items()]
+    ordered = all(a.time <= b.time for a, b in zip(received, received[1:]))
+    print(f"{nodes} nodes x {rate} ev/s for {seconds:.0f} s: {sent} sent, {len(received)} merged, "
+          f"{sum(s['dropped'] for s in stats)} dropped, {sum(s['unacked'] for s in stats)} unacknowledged, "
+          f"{aggregator.late} late, in order: {ordered}")
+    print(f"Wire: {wire / max(sent, 1):.1f} bytes/event | aggregator CPU {cpu / elapsed * 100:.1f}% of one core "
+          f"({cpu / max(len(received), 1) * 1e6:.1f} us/event)")
+    print(f"Clock offsets recovered to within {max(errors) * 1000:.2f} ms (skews up to "
+          f"{max(abs(s) for s in skews.values()):.2f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream detections from nodes to a central aggregator")
+    parser.add_argument("--serve", action="store_true", help="Run the aggregator")
+    parser.add_argument("--port", type=int, default=PORT, help=f"Aggregator port (default: {PORT})")
+    parser.add_argument("--log", help="Aggregator: append merged events to this JSON-lines file")
+    parser.add_argument("--node", help="Run a synthetic node with this id (for testing)")
+    parser.add_argument("--aggregator", default=f"127.0.0.1:{PORT}", help="Node: aggregator HOST:PORT")
+    parser.add_argument("--rate", type=int, help="Synthetic events per second per node (default: 20, bench 200)")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Node: how long to send")
+    parser.add_argument("--clock-skew", type=float, default=0.0, help="Node: offset added to this node's clock")
+    parser.add_argument("--bench", type=int, metavar="NODES", help="Spawn NODES local nodes and measure")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.bench, args.rate or 200)
+    elif args.node:
+        host, port = args.aggregator.rsplit(":", 1)
+        demo_node(host, int(port), args.node, args.rate or 20, args.seconds, args.clock_skew)
+    elif args.serve:
+        log_file = open(args.log, "a") if args.log else None
+
+        def output(event):
+            if log_file:
+                log_file.write(to_json(event) + "\n")
+            else:
+                print(f"[{event.info.get('node')}] {event.sensor:<10} {event.kind:<6} {event.confidence:.2f}")
+
+        aggregator = Aggregator(on_event=output)
+
+        async def serve():
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+            task = asyncio.create_task(aggregator.run(port=args.port))
+            while not task.done() and not stop.is_set():
+                try:
+                    await asyncio.wait_for(stop.wait(), REPORT_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                if stop.is_set():
+                    break
+                stats = metrics.process_stats()
+                print(f"[aggregator] {aggregator.released} merged, {aggregator.late} late, "
+                      f"CPU {stats.get('cpu_percent', 0):.1f}%")
+                aggregator.report()
+                if log_file:
+                    log_file.flush()
+            if task.done():
+                task.result()
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            print("Stopped by User")
+
+        try:
+            asyncio.run(serve())
+        finally:
+            aggregator.release(float('inf'))
+            if log_file:
+                log_file.close()
+    else:
+        parser.error("give --serve, --node ID or --bench NODES")
+
+
+if __name__ == "__main__":
+    main()
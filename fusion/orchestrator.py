@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# One-process host for all sensors: asyncio tasks, offloaded DSP/YOLO, pinned cores, CPU accounting
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import metrics
+from event_store import EventStore
+from events import EventBus, detection, to_json
+from fusion import FusionEngine, print_event
+from governor import INTERVAL as GOVERNOR_INTERVAL, Governor
+from node_link import NodeLink
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("sound_detection", "cv_detection", "rf_detection"):
+    sys.path.insert(0, os.path.join(REPO_DIR, folder))
+
+# Orchestrator settings
+SENSORS = ('audio', 'rf', 'cv', 'ultrasonic')
+DSP_WORKERS = 1           # Threads for FFT/array processing (NumPy releases the GIL)
+REPORT_SECONDS = 10.0     # CPU accounting report interval
+CV_IDLE_SLEEP = 0.1       # Seconds between cue checks while the camera is idle
+CAMERA_AZIMUTH = 0.0      # Camera axis relative to the mic array's 0 deg
+ULTRASONIC_ECHO = 24      # GPIO of the ultrasonic receiver (as in receive_ultrasonic_signal.py)
+ULTRASONIC_CONFIDENCE = 0.5
+SUMMARY_SECONDS = 1.0     # Feature summaries sent to the aggregator this often
+
+
+def core_plan(available=None):
+    """Cores for the event loop, DSP pool and YOLO; None when there are too few to split"""
+    cores = sorted(available if available is not None else os.sched_getaffinity(0))
+    if len(cores) < 3:
+        return None
+    # Loop and capture on the first core, DSP on the second, YOLO gets the rest
+    return {'loop': {cores[0]}, 'dsp': {cores[1]}, 'cv': set(cores[2:])}
+
+
+def pin_current_thread(cores):
+    """Restrict the calling thread (not the whole process) to `cores`"""
+    if not cores:
+        return
+    try:
+        os.sched_setaffinity(threading.get_native_id(), cores)
+    except (AttributeError, OSError):
+        pass
+
+
+class CpuAccount:
+    """CPU seconds spent per named task.
+
+    Work is measured with the calling thread's CPU clock, so time a task
+    spends waiting (on audio, the camera or the pool) is not charged to it,
+    and work done in pool threads is charged to the task that submitted it.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.lock = threading.Lock()
+        self.last = {}
+        self.last_time = time.monotonic()
+        self.last_process = self._process_cpu()
+
+    @staticmethod
+    def _process_cpu():
+        t = os.times()
+        return t.user + t.system
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.seconds[name] += seconds
+
+    @contextmanager
+    def measure(self, name):
+        start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.thread_time() - start)
+
+    def wrap(self, name, fn):
+        def timed(*args):
+            with self.measure(name), metrics.timer(name):
+                return fn(*args)
+        return timed
+
+    def report(self):
+        """Percent of one core per task since the last report, plus the whole process"""
+        now = time.monotonic()
+        elapsed = max(now - self.last_time, 1e-9)
+        with self.lock:
+            current = dict(self.seconds)
+        usage = {name: (sec - self.last.get(name, 0.0)) / elapsed * 100 for name, sec in current.items()}
+        process = self._process_cpu()
+        usage['process'] = (process - self.last_process) / elapsed * 100
+        self.last, self.last_time, self.last_process = current, now, process
+        return usage
+
+
+class Orchestrator:
+    """Hosts the sensors, the fusion engine and reporting as tasks on one event loop.
+
+    Blocking reads (audio, camera) run in an unpinned I/O pool; NumPy DSP
+    and YOLO run in their own pools whose threads are pinned to separate
+    cores, so one busy stage cannot starve the capture loop.
+    """
+
+    def __init__(self, args, plan=None):
+        self.args = args
+        self.plan = plan or {}
+        self.bus = EventBus()
+        self.engine = FusionEngine()
+        self.cpu = CpuAccount()
+        self.link = None
+        self.governor = None if args.no_governor else Governor()
+        # Pool threads start lazily from the (pinned) loop thread and would inherit its core; undo that
+        all_cores = set().union(*self.plan.values()) if self.plan else None
+        self.io_pool = ThreadPoolExecutor(4, thread_name_prefix="io",
+                                          initializer=pin_current_thread, initargs=(all_cores,))
+        self.dsp_pool = ThreadPoolExecutor(args.dsp_workers, thread_name_prefix="dsp",
+                                           initializer=pin_current_thread, initargs=(self.plan.get('dsp'),))
+        self.cv_pool = ThreadPoolExecutor(1, thread_name_prefix="cv",
+                                          initializer=pin_current_thread, initargs=(self.plan.get('cv'),))
+        metrics.gauge("bus_published", lambda: self.bus.published)
+        metrics.gauge("bus_dropped", lambda: self.bus.dropped)
+        metrics.gauge("bus_queue_max", lambda: max((q.qsize() for q, _, _ in self.bus.subscribers), default=0))
+        metrics.gauge("tracks", lambda: len(self.engine.tracks))
+        metrics.gauge("cv_cued", lambda: float(self.engine.cv_wanted()))
+
+    async def offload(self, pool, name, fn, *args):
+        """Run fn(*args) in a pool, charging its CPU time to `name`"""
+        return await asyncio.get_running_loop().run_in_executor(pool, self.cpu.wrap(name, fn), *args)
+
+    async def blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.io_pool, fn, *args)
+
+    async def audio_sensor(self):
+        import numpy as np
+        import pyaudio
+        from mic_array import MIC_POSITIONS, ArrayProcessor, find_usb_microphone, split_channels
+
+        channels, rate, chunk = self.args.channels, self.args.rate, self.args.chunk
+        positions = MIC_POSITIONS
+        if channels != len(MIC_POSITIONS):
+            positions = np.column_stack((np.arange(channels) * 0.04, np.zeros(channels)))
+        processor = ArrayProcessor(channels, rate, chunk, positions)
+        levels, hits, summary_due = [], 0, time.monotonic() + SUMMARY_SECONDS
+        unanalysed = 0
+
+        audio = pyaudio.PyAudio()
+        stream = audio.open(format=pyaudio.paInt16, channels=channels, rate=rate, input=True,
+                            frames_per_buffer=chunk, input_device_index=find_usb_microphone(audio))
+        try:
+            while True:
+                data = await self.blocking(stream.read, chunk, False)
+                # Governor: analyse one block per audio_hop samples (every block at full quality)
+                unanalysed += chunk
+                if self.governor and unanalysed < self.governor.settings['audio_hop']:
+                    continue
+                unanalysed = 0
+                band_db, detected, bearing = await self.offload(
+                    self.dsp_pool, 'audio', processor.process, split_channels(data, channels))
+                if detected:
+                    excess = band_db - processor.floor_db
+                    confidence = min(1.0, excess / (2 * processor.detection_db))
+                    metrics.count("audio_detections")
+                    self.bus.publish(detection('audio', confidence, bearing=bearing, band_db=round(band_db, 1)))
+                if self.link:
+                    # Band level statistics instead of raw audio: mean, max, floor (dB), detected fraction
+                    levels.append(band_db)
+                    hits += detected
+                    if time.monotonic() >= summary_due:
+                        self.link.summary('audio', [sum(levels) / len(levels), max(levels),
+                                                    processor.floor_db, hits / len(levels)])
+                        levels, hits, summary_due = [], 0, summary_due + SUMMARY_SECONDS
+        finally:
+            stream.stop_stream()
+            stream.close()
+            audio.terminate()
+
+    async def rf_sensor(self):
+        from airodump_csv import CsvTail, parse_logcsv_row
+        from drone_match import DroneMatcher
+        from drone_monitor import POLL_INTERVAL, DroneTable, capture_files, start_capture, wait_for_capture_file
+        from wifi_iface import find_monitor_interface
+
+        capture = None
+        csv_path = self.args.rf_csv
+        if not csv_path:
+            interface = self.args.interface or find_monitor_interface()
+            if not interface:
+                print("rf: no monitor-mode interface; RF sensor disabled")
+                return
+            prefix = os.path.join("/tmp/drone_monitor", "orchestrator")
+            os.makedirs(os.path.dirname(prefix), exist_ok=True)
+            existing = capture_files(prefix)
+            capture = start_capture(interface, prefix)
+            csv_path = await self.blocking(wait_for_capture_file, prefix, existing)
+            if not csv_path:
+                print(f"rf: airodump-ng did not start on {interface}; RF sensor disabled")
+                capture.terminate()
+                return
+
+        def publish(event):
+            if event['event'] == 'lost':
+                return
+            match = event['match']
+            confidence = 0.9 if match['via'] == 'oui+essid' else 0.75
+            self.bus.publish(detection('rf', confidence, bssid=event['bssid'], essid=event['essid'],
+                                       power=event['power'], vendor=match['vendor'], model=match['model']))
+
+        table = DroneTable(DroneMatcher())
+        table.listeners.append(publish)
+        tail = CsvTail(csv_path)
+        try:
+            while True:
+                with self.cpu.measure('rf'), metrics.timer('rf'):
+                    for line in tail.read_lines():
+                        row = parse_logcsv_row(line)
+                        if row:
+                            table.update(row)
+                    table.expire()
+                await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            if capture and capture.poll() is None:
+                capture.terminate()
+
+    async def cv_sensor(self):
+        from drone_v2 import box_bearing, detect_in_roi, load_model, open_camera
+        from roi_mask import load_roi
+
+        model = await self.offload(self.cv_pool, 'cv', load_model)
+        cam = open_camera()
+        roi = load_roi(self.args.roi_camera) if self.args.roi_camera else None
+        settings = None
+        frame_count = 0
+        try:
+            while True:
+                # The expensive detector only runs while fusion asks for it
+                if not self.engine.cv_wanted():
+                    await asyncio.sleep(CV_IDLE_SLEEP)
+                    continue
+                if self.governor and self.governor.settings is not settings:
+                    settings = self.governor.settings
+                    cam.framerate = settings['fps']
+                captured = time.monotonic()
+                frame = await self.blocking(cam.capture)
+                if frame is None:
+                    continue
+                frame_count += 1
+                if settings and frame_count % settings['stride']:
+                    continue
+                boxes = await self.offload(self.cv_pool, 'cv', detect_in_roi, model, frame, roi,
+                                           settings and settings['imgsz'])
+                if self.governor:
+                    self.governor.observe_latency(time.monotonic() - captured)
+                for box in boxes:
+                    self.bus.publish(detection('cv', box[4], bearing=CAMERA_AZIMUTH + box_bearing(box, frame.shape[1]),
+                                               box=box[:4]))
+        finally:
+            cam.close()
+
+    async def ultrasonic_sensor(self):
+        """Edge callbacks from lgpio instead of busy-waiting on the ECHO pin"""
+        import lgpio
+
+        chip = lgpio.gpiochip_open(0)
+        lgpio.gpio_claim_alert(chip, ULTRASONIC_ECHO, lgpio.BOTH_EDGES)
+        rise = {}
+
+        def edge(_chip, gpio, level, tick):
+            if level == 1:
+                rise[gpio] = tick
+            elif level == 0 and gpio in rise:
+                duration = (tick - rise.pop(gpio)) / 1e9  # ticks are nanoseconds
+                # Anything in front of the HC-SR04 echoes: a pulse only supports an existing track
+                self.bus.publish_threadsafe(detection('ultrasonic', ULTRASONIC_CONFIDENCE, kind='pulse',
+                                                      duration=duration))
+
+        callback = lgpio.callback(chip, ULTRASONIC_ECHO, lgpio.BOTH_EDGES, edge)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            callback.cancel()
+            lgpio.gpiochip_close(chip)
+
+    async def fusion_task(self):
+        queue = self.bus.subscribe(sensors=SENSORS + ('remote_id',))
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                event = None
+            with self.cpu.measure('fusion'), metrics.timer('fusion'):
+                outputs = self.engine.update(event) if event is not None else []
+                outputs += self.engine.expire()
+            for out in outputs:
+                self.bus.publish(out)
+
+    async def output_task(self, log_file=None):
+        queue = self.bus.subscribe(sensors=('fusion',))
+        raw = self.bus.subscribe() if log_file else None
+        while True:
+            if raw is not None:
+                while not raw.empty():
+                    log_file.write(to_json(raw.get_nowait()) + "\n")
+                log_file.flush()
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            print_event(event)
+
+    async def store_task(self, store):
+        """Every event on the bus goes to the durable store (add() never blocks)"""
+        queue = self.bus.subscribe(maxsize=4096)
+        metrics.gauge("store_queue", store.queue.qsize)
+        metrics.gauge("store_dropped", lambda: store.dropped)
+        metrics.gauge("store_written", lambda: store.written)
+        while True:
+            store.add(await queue.get())
+
+    async def link_task(self):
+        """Every event on the bus also goes to the site aggregator (send() never blocks)"""
+        queue = self.bus.subscribe(maxsize=4096)
+        sender = asyncio.create_task(self.link.run(), name="link-sender")
+        metrics.gauge("link_buffered", lambda: len(self.link.buffer))
+        metrics.gauge("link_dropped", lambda: self.link.dropped)
+        try:
+            while True:
+                self.link.send(await queue.get())
+        finally:
+            sender.cancel()
+
+    async def governor_task(self):
+        """Sample temperature/load every few seconds; any fusion track raises quality for a while"""
+        queue = self.bus.subscribe(sensors=('fusion',), kinds=('track',))
+        due = time.monotonic() + GOVERNOR_INTERVAL
+        while True:
+            try:
+                await asyncio.wait_for(queue.get(), timeout=max(0.0, due - time.monotonic()))
+                self.governor.boost()
+            except asyncio.TimeoutError:
+                self.governor.step()
+                due += GOVERNOR_INTERVAL
+
+    async def report_task(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            usage = self.cpu.report()
+            tasks = ' | '.join(f"{name} {pct:.1f}%" for name, pct in sorted(usage.items()) if name != 'process')
+            print(f"[cpu] {tasks or 'idle'} || process {usage['process']:.1f}% of one core "
+                  f"| bus dropped {self.bus.dropped}")
+
+    async def run(self, sensors):
+        pin_current_thread(self.plan.get('loop'))
+        self.bus.loop = asyncio.get_running_loop()
+        log_file = open(self.args.log, "a") if self.args.log else None
+        store = EventStore(self.args.store) if self.args.store else None
+        tasks = [asyncio.create_task(self.fusion_task(), name="fusion"),
+                 asyncio.create_task(self.output_task(log_file), name="output"),
+                 asyncio.create_task(self.report_task(self.args.report), name="report")]
+        if store:
+            tasks.append(asyncio.create_task(self.store_task(store), name="store"))
+        if self.governor:
+            tasks.append(asyncio.create_task(self.governor_task(), name="governor"))
+        if self.args.aggregator:
+            host, port = self.args.aggregator.rsplit(":", 1)
+            self.link = NodeLink(host, int(port), self.args.node_id)
+            tasks.append(asyncio.create_task(self.link_task(), name="link"))
+        for sensor in sensors:
+            tasks.append(asyncio.create_task(getattr(self, f"{sensor}_sensor")(), name=sensor))
+        try:
+            # Sensors that fail (missing hardware/packages) are reported; the rest keep running
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        print(f"{task.get_name()}: stopped ({task.exception()!r})")
+                if all(t.get_name() in ("fusion", "output", "report", "store", "link", "governor") for t in pending):
+                    print("No sensors left running")
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for pool in (self.io_pool, self.dsp_pool, self.cv_pool):
+                pool.shutdown(wait=False, cancel_futures=True)
+            if log_file:
+                log_file.close()
+            if store:
+                store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all drone sensors and fusion in one process")
+    parser.add_argument("-s", "--sensors", nargs='+', choices=SENSORS, default=['audio', 'rf', 'cv'],
+                        help="Sensors to run (default: audio rf cv)")
+    parser.add_argument("-c", "--channels", type=int, default=1, help="Microphone channels (default: 1)")
+    parser.add_argument("-r", "--rate", type=int, default=44100, help="Sampling rate in Hz (default: 44100)")
+    parser.add_argument("--chunk", type=int, default=2048, help="Audio frames per block (default: 2048)")
+    parser.add_argument("-i", "--interface", help="Monitor-mode Wi-Fi interface (default: first found)")
+    parser.add_argument("--rf-csv", help="Follow an existing airodump-ng .log.csv instead of capturing")
+    parser.add_argument("--dsp-workers", type=int, default=DSP_WORKERS, help="DSP pool threads")
+    parser.add_argument("--no-pin", action="store_true", help="Don't pin the loop/DSP/YOLO threads to cores")
+    parser.add_argument("--report", type=float, default=REPORT_SECONDS, help="Seconds between CPU reports")
+    parser.add_argument("--log", help="Append every event to this JSON-lines file (replayable by fusion.py)")
+    parser.add_argument("--store", help="Keep every event in this SQLite store (query with event_store.py)")
+    parser.add_argument("--roi-camera", help="Crop/mask camera frames with this entry of roi_masks.json")
+    parser.add_argument("--no-governor", action="store_true",
+                        help="Keep full quality regardless of temperature and load")
+    parser.add_argument("--aggregator", help="Stream events to a node_link.py --serve aggregator at HOST:PORT")
+    parser.add_argument("--node-id", help="Name of this node at the aggregator (default: hostname)")
+    parser.add_argument("--metrics-port", type=int, help="Serve metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file", help="Rewrite metrics to this .prom textfile periodically")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        metrics.REGISTRY.start_http(args.metrics_port)
+    if args.metrics_file:
+        metrics.REGISTRY.start_textfile(args.metrics_file)
+
+    plan = None if args.no_pin else core_plan()
+    if plan:
+        print("Core plan: " + ', '.join(f"{k} {sorted(v)}" for k, v in plan.items()))
+    orchestrator = Orchestrator(args, plan)
+    try:
+        asyncio.run(orchestrator.run(args.sensors))
+    except KeyboardInterrupt:
+        print("Stopped by User")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+from datetime import datetime
+
+# Column layout of the access-point section of airodump-ng's --output-format csv
+# (same columns attacks/deauth.py reads in scan_for_networks)
+BSSID_COL = 0
+FIRST_SEEN_COL = 1
+LAST_SEEN_COL = 2
+CHANNEL_COL = 3
+PRIVACY_COL = 5
+POWER_COL = 8
+ESSID_COL = 13
+MIN_NETWORK_COLS = 14
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _parse_time(text):
+    try:
+        return datetime.strptime(text.strip(), TIME_FORMAT).timestamp()
+    except ValueError:
+        return None
+
+
+def _parse_power(text):
+    try:
+        power = int(text.strip())
+    except ValueError:
+        return None
+    # airodump reports -1 when the driver gives no signal level
+    return power if power not in (-1, 0) else None
+
+
+def _clean_essid(essid):
+    essid = essid.strip()
+    if essid.startswith('"') and essid.endswith('"'):
+        essid = essid[1:-1]
+    return essid
+
+
+def parse_network_row(line):
+    """One AP line of an airodump-ng .csv file -> dict, or None for headers/stations/junk"""
+    parts = line.split(',')
+    if len(parts) < MIN_NETWORK_COLS:
+        return None
+    bssid = parts[BSSID_COL].strip()
+    if len(bssid) != 17 or bssid.count(':') != 5:
+        return None
+    return {
+        'bssid': bssid.upper(),
+        'essid': _clean_essid(','.join(parts[ESSID_COL:-1]) if len(parts) > MIN_NETWORK_COLS + 1
+                              else parts[ESSID_COL]),
+        'channel': parts[CHANNEL_COL].strip(),
+        'privacy': parts[PRIVACY_COL].strip(),
+        'power': _parse_power(parts[POWER_COL]),
+        'first_seen': _parse_time(parts[FIRST_SEEN_COL]),
+        'last_seen': _parse_time(parts[LAST_SEEN_COL]),
+    }
+
+
+def parse_logcsv_row(line):
+    """One line of an airodump-ng .log.csv file -> dict, or None.
+
+    Layout: LocalTime, GPSTime, ESSID, BSSID, Power, Security, Latitude,
+    Longitude, Latitude Error, Longitude Error, Type. The ESSID may itself
+    contain commas, so fields are taken from both ends of the line.
+    """
+    parts = line.rstrip('\r\n').split(',')
+    if len(parts) < 11 or parts[-1].strip() != 'AP':
+        return None
+    bssid = parts[-8].strip()
+    if len(bssid) != 17 or bssid.count(':') != 5:
+        return None
+    seen = _parse_time(parts[0])
+    return {
+        'bssid': bssid.upper(),
+        'essid': _clean_essid(','.join(parts[2:-8])),
+        'channel': None,
+        'privacy': parts[-6].strip(),
+        'power': _parse_power(parts[-7]),
+        'first_seen': seen,
+        'last_seen': seen,
+    }
+
+
+class CsvTail:
+    """Reads only the bytes appended to a growing capture file since the last call.
+
+    Partial trailing lines are kept until their newline arrives. If the file
+    is replaced or truncated (airodump-ng restarted), reading starts over from
+    the top. Cost per call is proportional to the new data, not the file size.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.inode = None
+        self.partial = b""
+
+    def read_lines(self):
+        """Complete new lines since the last call (decoded, without line endings)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.inode = st.st_ino
+            self.offset = 0
+            self.partial = b""
+        if st.st_size == self.offset:
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+        self.offset += len(data)
+
+        data = self.partial + data
+        lines = data.split(b'\n')
+        self.partial = lines.pop()
+        return [line.rstrip(b'\r').decode('utf-8', errors='ignore') for line in lines]
@@ -0,0 +1,163 @@
+import argparse
+import csv
+import os
+import random
+import re
+import time
+
+VENDOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "drone_vendors.csv")
+# Hex digits in an MA-S, MA-M and MA-L prefix -> characters of 'AA:BB:CC:DD:EE:FF' they cover
+PREFIX_CHARS = {9: 13, 7: 10, 6: 8}
+
+
+def normalize_mac(mac):
+    """'90-03-b7-11-22-33' -> '90:03:B7:11:22:33'; None if it isn't a MAC"""
+    mac = mac.strip().upper().replace('-', ':')
+    return mac if len(mac) == 17 and mac.count(':') == 5 else None
+
+
+def is_locally_administered(mac):
+    """Randomised/locally administered MACs carry no vendor OUI"""
+    try:
+        return bool(int(mac[1], 16) & 0x02)
+    except ValueError:
+        return False
+
+
+class DroneMatcher:
+    """Precompiled drone identification by MAC prefix and ESSID.
+
+    OUIs live in one hash table per prefix length (24/28/36 bits) keyed by the
+    normalised MAC text, so a BSSID lookup is a slice and a dict probe per
+    prefix length in use. All ESSID patterns are compiled into
+    a single alternation regex with one named group per pattern, so an ESSID
+    is tested once no matter how many patterns there are.
+    """
+
+    def __init__(self, vendor_file=VENDOR_FILE, extra_prefixes=()):
+        self.ouis = {chars: {} for chars in PREFIX_CHARS.values()}
+        self.essid_labels = {}
+        patterns = []
+        with open(vendor_file, newline='') as f:
+            rows = [r for r in csv.reader(f) if r and not r[0].startswith('#')]
+        for kind, pattern, vendor, model in (r + [''] * (4 - len(r)) for r in rows):
+            kind, pattern = kind.strip(), pattern.strip()
+            if kind == 'oui':
+                digits = pattern.upper().replace(':', '').replace('-', '')
+                if len(digits) not in PREFIX_CHARS:
+                    raise ValueError(f"{vendor_file}: OUI '{pattern}' must be 24, 28 or 36 bits")
+                key = ':'.join(digits[i:i + 2] for i in range(0, len(digits), 2))
+                self.ouis[PREFIX_CHARS[len(digits)]][key] = (vendor.strip(), model.strip())
+            elif kind == 'essid':
+                patterns.append((pattern, vendor.strip(), model.strip()))
+        for prefix in extra_prefixes:
+            patterns.append((re.escape(prefix), '', prefix))
+
+        groups = []
+        for i, (pattern, vendor, model) in enumerate(patterns):
+            groups.append(f"(?P<p{i}>{pattern})")
+            self.essid_labels[f"p{i}"] = (vendor, model)
+        self.essid_regex = re.compile('|'.join(groups), re.IGNORECASE) if groups else None
+        # Longest prefix first, skipping lengths with no entries
+        self.oui_tables = [(chars, self.ouis[chars]) for chars in sorted(self.ouis, reverse=True)
+                           if self.ouis[chars]]
+
+    def lookup_oui(self, mac):
+        """(vendor, model) for a normalised MAC, or None"""
+        for chars, table in self.oui_tables:
+            hit = table.get(mac[:chars])
+            if hit:
+                return hit
+        return None
+
+    def lookup_essid(self, essid):
+        if not essid or self.essid_regex is None:
+            return None
+        m = self.essid_regex.match(essid)
+        return self.essid_labels[m.lastgroup] if m else None
+
+    def match(self, bssid, essid=''):
+        """Match dict {'vendor', 'model', 'via', 'randomized'} or None"""
+        mac = normalize_mac(bssid)
+        by_oui = None
+        randomized = False
+        if mac is not None:
+            randomized = is_locally_administered(mac)
+            if not randomized:
+                by_oui = self.lookup_oui(mac)
+        by_essid = self.lookup_essid(essid)
+        if not by_oui and not by_essid:
+            return None
+
+        via = 'oui+essid' if by_oui and by_essid else ('oui' if by_oui else 'essid')
+        vendor = (by_oui or by_essid)[0] or (by_essid or by_oui)[0]
+        model = (by_essid and by_essid[1]) or (by_oui and by_oui[1]) or ''
+        return {'vendor': vendor, 'model': model, 'via': via, 'randomized': randomized}
+
+    def classify(self, networks):
+        """One pass over network dicts (with 'bssid'/'essid'); returns the drone ones, annotated"""
+        found = []
+        for network in networks:
+            hit = self.match(network['bssid'], network.get('essid', ''))
+            if hit:
+                annotated = dict(network)
+                annotated['match'] = hit
+                found.append(annotated)
+        return found
+
+
+def nested_prefix_filter(networks, prefixes):
+    """The per-network, per-prefix loop from deauth.filter_target_networks (benchmark baseline)"""
+    found = []
+    for network in networks:
+        for prefix in prefixes:
+            if network['essid'].lower().startswith(prefix.lower()):
+                found.append(network)
+                break
+    return found
+
+
+def synthetic_scan(n, drone_fraction=0.02, seed=0):
+    """Random networks with a sprinkling of drone OUIs/ESSIDs"""
+    rng = random.Random(seed)
+    names = ["HomeNet", "NETGEAR", "xfinitywifi", "eduroam", "TP-Link_", "Bebop2-", "Mavic-", "TELLO-"]
+    networks = []
+    for _ in range(n):
+        if rng.random() < drone_fraction:
+            oui = rng.choice(["60:60:1F", "90:03:B7", "A0:14:3D"])
+            essid = rng.choice(names[5:]) + f"{rng.randrange(10000):04d}"
+        else:
+            oui = ':'.join(f"{rng.randrange(256) & 0xFC:02X}" for _ in range(3))
+            essid = rng.choice(names[:5]) + f"{rng.randrange(1000)}"
+        tail = ':'.join(f"{rng.randrange(256):02X}" for _ in range(3))
+        networks.append({'bssid': f"{oui}:{tail}", 'essid': essid})
+    return networks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the drone OUI/ESSID matcher")
+    parser.add_argument("-n", "--networks", type=int, default=5000, help="Synthetic BSSIDs per scan")
+    parser.add_argument("--vendors", default=VENDOR_FILE, help="Vendor table (default: bundled)")
+    args = parser.parse_args()
+
+    matcher = DroneMatcher(args.vendors)
+    networks = synthetic_scan(args.networks)
+    # Same ESSID list as plain prefixes for the baseline
+    with open(args.vendors, newline='') as f:
+        prefixes = [re.sub(r'\[.*?\]', '', r[1]) for r in csv.reader(f) if r and r[0] == 'essid']
+
+    start = time.perf_counter()
+    found = matcher.classify(networks)
+    matcher_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    baseline = nested_prefix_filter(networks, prefixes)
+    baseline_s = time.perf_counter() - start
+
+    print(f"{len(networks)} networks: matcher {matcher_s * 1000:.2f} ms ({len(found)} drones, "
+          f"{sum(1 for f in found if 'oui' in f['match']['via'])} by OUI) | "
+          f"nested prefix loop {baseline_s * 1000:.2f} ms ({len(baseline)} by ESSID only)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# Passive drone Wi-Fi presence monitor (receive-only)
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+from airodump_csv import CsvTail, parse_logcsv_row
+from drone_match import VENDOR_FILE, DroneMatcher
+from wifi_iface import find_monitor_interface
+
+# Color definitions
+RED = '\033[91m'
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+BLUE = '\033[94m'
+NC = '\033[0m'  # No Color
+
+# Monitor settings
+POLL_INTERVAL = 0.2       # Seconds between reads of the capture file
+WRITE_INTERVAL = 1        # airodump-ng --write-interval (its minimum)
+LOST_SECONDS = 30         # Drone considered gone after this long without a beacon
+TREND_SAMPLES = 10        # Power readings used for the signal trend
+TREND_DB = 3.0            # Change over the trend window counted as approaching/leaving
+capture_dir = "/tmp/drone_monitor"
+
+
+class DroneTable:
+    """In-memory table of drone-like networks with presence events.
+
+    `update` is O(1) per parsed row; `expire` only walks the drones currently
+    present. Events are delivered to `listeners` as dicts:
+    {'event': 'new' | 'trend' | 'lost', 'bssid', 'essid', 'power', 'trend', ...}.
+    """
+
+    def __init__(self, matcher=None, lost_seconds=LOST_SECONDS):
+        self.matcher = matcher or DroneMatcher()
+        self.lost_seconds = lost_seconds
+        self.drones = {}
+        self.listeners = []
+
+    def _emit(self, event, entry, **extra):
+        payload = {'event': event, 'bssid': entry['bssid'], 'essid': entry['essid'],
+                   'power': entry['power'][-1][1] if entry['power'] else None,
+                   'trend': entry['trend'], 'first_seen': entry['first_seen'],
+                   'last_seen': entry['last_seen'], 'match': entry['match'], 'time': time.monotonic()}
+        payload.update(extra)
+        for listener in self.listeners:
+            listener(payload)
+
+    def update(self, row, now=None):
+        """Feed one parsed capture row"""
+        now = time.time() if now is None else now
+        seen = row['last_seen'] or now
+        entry = self.drones.get(row['bssid'])
+        if entry is None:
+            # Only unseen BSSIDs go through the matcher
+            match = self.matcher.match(row['bssid'], row['essid'])
+            if match is None:
+                return
+            entry = {'bssid': row['bssid'], 'essid': row['essid'], 'first_seen': seen,
+                     'last_seen': seen, 'seen_at': now, 'power': deque(maxlen=TREND_SAMPLES),
+                     'trend': 'steady', 'match': match}
+            self.drones[row['bssid']] = entry
+            if row['power'] is not None:
+                entry['power'].append((seen, row['power']))
+            self._emit('new', entry)
+            return
+
+        entry['last_seen'] = max(entry['last_seen'], seen)
+        entry['seen_at'] = now
+        if row['essid']:
+            entry['essid'] = row['essid']
+        if row['power'] is not None:
+            entry['power'].append((seen, row['power']))
+            trend = self._trend(entry['power'])
+            if trend != entry['trend']:
+                entry['trend'] = trend
+                self._emit('trend', entry)
+
+    @staticmethod
+    def _trend(power):
+        if len(power) < power.maxlen:
+            return 'steady'
+        half = len(power) // 2
+        readings = [p for _, p in power]
+        change = sum(readings[half:]) / (len(readings) - half) - sum(readings[:half]) / half
+        if change > TREND_DB:
+            return 'approaching'
+        if change < -TREND_DB:
+            return 'leaving'
+        return 'steady'
+
+    def expire(self, now=None):
+        """Emit 'lost' for drones not heard from for lost_seconds"""
+        now = time.time() if now is None else now
+        for bssid in [b for b, e in self.drones.items() if now - e['seen_at'] > self.lost_seconds]:
+            self._emit('lost', self.drones.pop(bssid))
+
+
+def print_event(event):
+    """Default listener: one colored console line per event"""
+    stamp = time.strftime("%H:%M:%S")
+    power = f"{event['power']} dBm" if event['power'] is not None else "n/a"
+    if event['event'] == 'new':
+        match = event['match']
+        kind = ' '.join(filter(None, (match['vendor'], match['model']))) or 'unknown vendor'
+        print(f"{GREEN}[{stamp}] DRONE PRESENT: {event['essid']} ({event['bssid']}) | {kind} "
+              f"[{match['via']}] | Signal: {power}{NC}")
+    elif event['event'] == 'trend':
+        print(f"{YELLOW}[{stamp}] {event['essid']} ({event['bssid']}) is {event['trend']} | Signal: {power}{NC}")
+    else:
+        print(f"{BLUE}[{stamp}] Drone gone: {event['essid']} ({event['bssid']}){NC}")
+
+
+def start_capture(interface, prefix):
+    """Run airodump-ng in listen-only mode, writing an append-only log CSV"""
+    cmd = ["airodump-ng", "--output-format", "logcsv", "--write-interval", str(WRITE_INTERVAL),
+           "--write", prefix, interface]
+    return subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def capture_files(prefix):
+    """Log CSVs airodump-ng has written for this prefix so far"""
+    return set(glob.glob(f"{prefix}-*.log.csv"))
+
+
+def wait_for_capture_file(prefix, existing=(), timeout=10):
+    """airodump-ng appends -NN.log.csv to the prefix; return the newest file not in `existing`
+
+    Take `existing` with capture_files() before start_capture, so a CSV left
+    by an earlier run isn't mistaken for the new capture.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        files = capture_files(prefix) - set(existing)
+        if files:
+            return max(files, key=os.path.getmtime)
+        time.sleep(POLL_INTERVAL)
+    return None
+
+
+def monitor(csv_path, table, follow=True):
+    """Tail the log CSV and feed new rows into the table until interrupted"""
+    tail = CsvTail(csv_path)
+    while True:
+        for line in tail.read_lines():
+            row = parse_logcsv_row(line)
+            if row:
+                table.update(row)
+        table.expire()
+        if not follow:
+            return
+        time.sleep(POLL_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Passive drone Wi-Fi presence monitor (never transmits)")
+    parser.add_argument("-i", "--interface",
+                        help="Wireless interface already in monitor mode (default: first one found)")
+    parser.add_argument("--csv", help="Follow an existing airodump-ng .log.csv instead of starting a capture")
+    parser.add_argument("-t", "--targets", nargs='+', default=[],
+                        help="Extra ESSID prefixes to treat as drones (on top of the vendor table)")
+    parser.add_argument("--vendors", default=VENDOR_FILE,
+                        help="Drone vendor OUI/ESSID table (default: drone_vendors.csv)")
+    parser.add_argument("--once", action="store_true", help="Process the current file contents and exit")
+    args = parser.parse_args()
+
+    if not args.interface and not args.csv:
+        args.interface = find_monitor_interface()
+        if not args.interface:
+            print(f"{RED}No interface in monitor mode found. Put one in monitor mode "
+                  f"(e.g. airmon-ng start wlan0) or give --csv{NC}")
+            sys.exit(1)
+        print(f"{BLUE}Using monitor interface {args.interface}{NC}")
+
+    table = DroneTable(DroneMatcher(args.vendors, args.targets))
+    table.listeners.append(print_event)
+
+    airodump_process = None
+    csv_path = args.csv
+    if not csv_path:
+        if os.geteuid() != 0:
+            print(f"{RED}Error: capturing requires root{NC}")
+            sys.exit(1)
+        os.makedirs(capture_dir, exist_ok=True)
+        prefix = os.path.join(capture_dir, "monitor")
+        existing = capture_files(prefix)
+        airodump_process = start_capture(args.interface, prefix)
+        csv_path = wait_for_capture_file(prefix, existing)
+        if not csv_path:
+            print(f"{RED}airodump-ng did not create a capture file. Is {args.interface} in monitor mode?{NC}")
+            airodump_process.terminate()
+            sys.exit(1)
+
+    print(f"{BLUE}Watching {csv_path} for drones ({args.vendors}){NC}")
+    try:
+        monitor(csv_path, table, follow=not args.once)
+    except KeyboardInterrupt:
+        print("Monitoring stopped by User")
+    finally:
+        if airodump_process and airodump_process.poll() is None:
+            airodump_process.terminate()
+            try:
+                airodump_process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                airodump_process.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+# Offline decoder for Wi-Fi Remote ID (ASTM F3411 / ASD-STAN prEN 4709-002) in pcap/pcapng captures
+
+import argparse
+import hashlib
+import os
+import random
+import struct
+import sys
+import time
+
+# Capture file formats
+PCAP_MAGIC = {b'\xd4\xc3\xb2\xa1': ('<', 1e-6), b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+              b'\x4d\x3c\xb2\xa1': ('<', 1e-9), b'\xa1\xb2\x3c\x4d': ('>', 1e-9)}
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+LINKTYPE_IEEE802_11 = 105
+LINKTYPE_RADIOTAP = 127
+RADIOTAP_FLAG_FCS = 0x10  # Frame includes the 4-byte FCS at the end
+# (alignment, size) of the radiotap fields up to antenna signal, in present-bit order
+RADIOTAP_FIELDS = ((8, 8), (1, 1), (1, 1), (2, 4), (2, 2), (1, 1))
+
+# 802.11 framing
+FC_BEACON = 0x80          # First frame-control byte of a beacon
+FC_ACTION = 0xD0          # ... of an action frame (NAN service discovery frames)
+MGMT_HEADER = 24
+BEACON_FIXED = 12         # Timestamp, beacon interval, capabilities
+VENDOR_IE = 221
+RID_BEACON_OUI = b'\xfa\x0b\xbc\x0d'  # ASD-STAN OUI + Remote ID vendor type
+NAN_ACTION = b'\x04\x09\x50\x6f\x9a\x13'  # Public action, vendor specific, Wi-Fi Alliance OUI, NAN
+NAN_SDA = 0x03            # Service descriptor attribute
+NAN_SERVICE_ID = hashlib.sha256(b"org.opendroneid.remoteid").digest()[:6]
+
+# Open Drone ID messages
+MESSAGE_SIZE = 25
+MSG_BASIC_ID = 0
+MSG_LOCATION = 1
+MSG_AUTH = 2
+MSG_SELF_ID = 3
+MSG_SYSTEM = 4
+MSG_OPERATOR_ID = 5
+MSG_PACK = 0xF
+MESSAGE_NAMES = {MSG_BASIC_ID: 'basic_id', MSG_LOCATION: 'location', MSG_AUTH: 'auth',
+                 MSG_SELF_ID: 'self_id', MSG_SYSTEM: 'system', MSG_OPERATOR_ID: 'operator_id'}
+ID_TYPES = {0: 'none', 1: 'serial', 2: 'caa', 3: 'utm', 4: 'session'}
+UA_TYPES = {0: 'none', 1: 'aeroplane', 2: 'multirotor', 3: 'gyroplane', 4: 'vtol', 5: 'ornithopter',
+            6: 'glider', 7: 'kite', 8: 'balloon', 9: 'airship', 10: 'parachute', 11: 'rocket',
+            12: 'tethered', 13: 'ground obstacle', 14: 'other'}
+STATUS = {0: 'undeclared', 1: 'ground', 2: 'airborne', 3: 'emergency', 4: 'system failure'}
+SYSTEM_EPOCH = 1546300800  # 2019-01-01 00:00 UTC, zero of the System message timestamp
+
+LOCATION = struct.Struct('<BBBBbiiHHHBBHBB')
+SYSTEM = struct.Struct('<BBiiHBHHBHIB')
+
+# Fixture/benchmark settings
+FIXTURE_FRAMES = 200000
+RID_FRACTION = 0.05       # Share of fixture frames carrying Remote ID
+
+
+def _read_exact(f, n):
+    data = f.read(n)
+    return data if len(data) == n else None
+
+
+def _pcap_packets(f, magic):
+    endian, resolution = PCAP_MAGIC[magic]
+    header = _read_exact(f, 20)
+    if header is None:
+        return
+    linktype = struct.unpack(endian + 'I', header[16:20])[0] & 0xFFFF
+    record = struct.Struct(endian + 'IIII')
+    while True:
+        head = _read_exact(f, 16)
+        if head is None:
+            return
+        sec, frac, caplen, _ = record.unpack(head)
+        data = _read_exact(f, caplen)
+        if data is None:
+            return
+        yield sec + frac * resolution, linktype, data
+
+
+def _tsresol(options, endian):
+    """Interface timestamp resolution from IDB options (default microseconds)"""
+    i = 0
+    while i + 4 <= len(options):
+        code, length = struct.unpack_from(endian + 'HH', options, i)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = options[i + 4]
+            return 2.0 ** -(value & 0x7F) if value & 0x80 else 10.0 ** -value
+        i += 4 + ((length + 3) & ~3)
+    return 1e-6
+
+
+def _pcapng_packets(f, first):
+    endian = '<'
+    interfaces = []           # (linktype, snaplen, resolution) per interface id
+    block_type, block_len = struct.unpack('<II', first)
+    while True:
+        if block_type == PCAPNG_SHB:
+            # Byte-order magic decides how this section (including its length) is read
+            body = _read_exact(f, 4)
+            if body is None:
+                return
+            endian = '<' if body == b'\x4d\x3c\x2b\x1a' else '>'
+            block_len = struct.unpack(endian + 'I', first[4:])[0]
+            if _read_exact(f, block_len - 12) is None:
+                return
+            interfaces = []
+        else:
+            body = _read_exact(f, block_len - 8)
+            if body is None:
+                return
+            if block_type == PCAPNG_EPB:
+                iface, high, low, caplen, _ = struct.unpack_from(endian + 'IIIII', body)
+                if iface < len(interfaces):
+                    linktype, _, resolution = interfaces[iface]
+                    yield ((high << 32) | low) * resolution, linktype, body[20:20 + caplen]
+            elif block_type == PCAPNG_SPB and interfaces:
+                linktype, snaplen, _ = interfaces[0]
+                orig = struct.unpack_from(endian + 'I', body)[0]
+                yield None, linktype, body[4:4 + min(orig, snaplen or orig, len(body) - 8)]
+            elif block_type == PCAPNG_IDB:
+                linktype, _, snaplen = struct.unpack_from(endian + 'HHI', body)
+                interfaces.append((linktype, snaplen, _tsresol(body[8:-4], endian)))
+
+        first = _read_exact(f, 8)
+        if first is None:
+            return
+        block_type, block_len = struct.unpack(endian + 'II', first)
+
+
+def read_packets(path):
+    """Stream (timestamp, linktype, data) from a pcap or pcapng file, one record at a time"""
+    with open(path, 'rb', buffering=1 << 20) as f:
+        first = f.read(8)
+        if first[:4] in PCAP_MAGIC:
+            f.seek(4)
+            yield from _pcap_packets(f, first[:4])
+        elif len(first) == 8 and struct.unpack('<I', first[:4])[0] == PCAPNG_SHB:
+            yield from _pcapng_packets(f, first)
+        else:
+            raise ValueError(f"{path}: not a pcap or pcapng file")
+
+
+def strip_radiotap(data):
+    """Radiotap-wrapped frame -> (802.11 frame without FCS, signal dBm or None)"""
+    if len(data) < 8:
+        return None, None
+    length = data[2] | (data[3] << 8)
+    present = struct.unpack_from('<I', data, 4)[0]
+    # Skip any extended present words
+    offset = 8
+    word = present
+    while word & 0x80000000 and offset + 4 <= length:
+        word = struct.unpack_from('<I', data, offset)[0]
+        offset += 4
+
+    flags = 0
+    signal = None
+    for bit, (align, size) in enumerate(RADIOTAP_FIELDS):
+        if not present & (1 << bit):
+            continue
+        offset = (offset + align - 1) & ~(align - 1)
+        if offset + size > length:
+            break
+        if bit == 1:
+            flags = data[offset]
+        elif bit == 5:
+            signal = data[offset] - 256 if data[offset] > 127 else data[offset]
+        offset += size
+
+    frame = data[length:-4] if flags & RADIOTAP_FLAG_FCS else data[length:]
+    return frame, signal
+
+
+def _text(raw):
+    return raw.split(b'\0', 1)[0].decode('ascii', errors='replace').strip()
+
+
+def _speed(value, multiplier):
+    speed = value * 0.75 + 255 * 0.25 if multiplier else value * 0.25
+    return None if speed >= 254.25 else speed
+
+
+def _altitude(value):
+    return None if value == 0 else value * 0.5 - 1000
+
+
+def decode_message(msg):
+    """One 25-byte Open Drone ID message -> dict (always has 'type')"""
+    kind = msg[0] >> 4
+    out = {'type': MESSAGE_NAMES.get(kind, f'type{kind}')}
+    if kind == MSG_BASIC_ID:
+        out['id_type'] = ID_TYPES.get(msg[1] >> 4, msg[1] >> 4)
+        out['ua_type'] = UA_TYPES.get(msg[1] & 0x0F, msg[1] & 0x0F)
+        out['uas_id'] = _text(msg[2:22])
+    elif kind == MSG_LOCATION:
+        (_, bits, direction, speed, vspeed, lat, lon, pressure_alt, geo_alt, height,
+         _, _, stamp, _, _) = LOCATION.unpack(msg)
+        direction += 180 if bits & 0x02 else 0
+        out['status'] = STATUS.get(bits >> 4, bits >> 4)
+        out['direction'] = direction if direction <= 360 else None
+        out['speed'] = _speed(speed, bits & 0x01)
+        out['vertical_speed'] = vspeed * 0.5 if abs(vspeed) < 126 else None
+        out['latitude'] = lat * 1e-7 if lat or lon else None
+        out['longitude'] = lon * 1e-7 if lat or lon else None
+        out['pressure_altitude'] = _altitude(pressure_alt)
+        out['altitude'] = _altitude(geo_alt)
+        out['height'] = _altitude(height)
+        out['height_type'] = 'ground' if bits & 0x04 else 'takeoff'
+        out['timestamp'] = stamp / 10 if stamp != 0xFFFF else None  # Seconds after the hour
+    elif kind == MSG_SELF_ID:
+        out['description_type'] = msg[1]
+        out['description'] = _text(msg[2:25])
+    elif kind == MSG_SYSTEM:
+        (_, flags, lat, lon, area_count, area_radius, ceiling, floor, _, op_alt,
+         stamp, _) = SYSTEM.unpack(msg)
+        out['operator_latitude'] = lat * 1e-7 if lat or lon else None
+        out['operator_longitude'] = lon * 1e-7 if lat or lon else None
+        out['operator_altitude'] = _altitude(op_alt)
+        out['area_count'] = area_count
+        out['area_radius'] = area_radius * 10
+        out['area_ceiling'] = _altitude(ceiling)
+        out['area_floor'] = _altitude(floor)
+        out['time'] = stamp + SYSTEM_EPOCH if stamp else None
+    elif kind == MSG_OPERATOR_ID:
+        out['operator_id_type'] = msg[1]
+        out['operator_id'] = _text(msg[2:22])
+    return out
+
+
+def decode_messages(data):
+    """A single message or a message pack -> list of decoded messages"""
+    if len(data) < MESSAGE_SIZE:
+        return []
+    if data[0] >> 4 != MSG_PACK:
+        return [decode_message(data[:MESSAGE_SIZE])]
+    if len(data) < 3 or data[1] != MESSAGE_SIZE:
+        return []
+    count = min(data[2], (len(data) - 3) // MESSAGE_SIZE)
+    return [decode_message(data[3 + i * MESSAGE_SIZE:3 + (i + 1) * MESSAGE_SIZE]) for i in range(count)]
+
+
+def _beacon_payload(frame):
+    """Remote ID vendor element of a beacon (counter + messages), or None"""
+    i = MGMT_HEADER + BEACON_FIXED
+    end = len(frame)
+    while i + 2 <= end:
+        element, length = frame[i], frame[i + 1]
+        if element == VENDOR_IE and frame[i + 2:i + 6] == RID_BEACON_OUI:
+            return frame[i + 6:i + 2 + length]
+        i += 2 + length
+    return None
+
+
+def _nan_payload(frame):
+    """Remote ID service info of a NAN service discovery frame, or None"""
+    i = MGMT_HEADER + len(NAN_ACTION)
+    end = len(frame)
+    while i + 3 <= end:
+        attribute = frame[i]
+        length = frame[i + 1] | (frame[i + 2] << 8)
+        body = frame[i + 3:i + 3 + length]
+        i += 3 + length
+        if attribute != NAN_SDA or body[:6] != NAN_SERVICE_ID or len(body) < 9:
+            continue
+        control = body[8]
+        j = 9
+        if control & 0x40:    # Binding bitmap
+            j += 2
+        if control & 0x04:    # Matching filter
+            j += 1 + body[j]
+        if control & 0x08:    # Service response filter
+            j += 1 + body[j]
+        if control & 0x10 and j < len(body):
+            return body[j + 1:j + 1 + body[j]]
+    return None
+
+
+def decode_frame(frame):
+    """802.11 frame -> (transport, counter, messages) for Remote ID frames, else None"""
+    if len(frame) < MGMT_HEADER:
+        return None
+    fc = frame[0]
+    # Cheap substring checks reject ordinary traffic before any element walking
+    if fc == FC_BEACON and RID_BEACON_OUI in frame:
+        payload, transport = _beacon_payload(frame), 'beacon'
+    elif fc == FC_ACTION and frame[MGMT_HEADER:MGMT_HEADER + len(NAN_ACTION)] == NAN_ACTION:
+        payload, transport = _nan_payload(frame), 'nan'
+    else:
+        return None
+    if not payload:
+        return None
+    messages = decode_messages(payload[1:])
+    return (transport, payload[0], messages) if messages else None
+
+
+def decode_capture(path):
+    """Stream Remote ID broadcasts from a capture file as dicts"""
+    for timestamp, linktype, data in read_packets(path):
+        signal = None
+        if linktype == LINKTYPE_RADIOTAP:
+            data, signal = strip_radiotap(data)
+            if data is None:
+                continue
+        elif linktype != LINKTYPE_IEEE802_11:
+            continue
+        try:
+            decoded = decode_frame(data)
+        except (IndexError, struct.error):
+            continue
+        if decoded is None:
+            continue
+        transport, counter, messages = decoded
+        source = ':'.join(f"{b:02X}" for b in data[10:16])
+        yield {'time': timestamp, 'source': source, 'signal': signal, 'transport': transport,
+               'counter': counter, 'messages': messages}
+
+
+# Encoders for synthetic fixtures
+
+def _message(kind, body):
+    return bytes([(kind << 4) | 2]) + body.ljust(MESSAGE_SIZE - 1, b'\0')[:MESSAGE_SIZE - 1]
+
+
+def encode_basic_id(uas_id, id_type=1, ua_type=2):
+    return _message(MSG_BASIC_ID, bytes([(id_type << 4) | ua_type]) + uas_id.encode('ascii')[:20].ljust(20, b'\0'))
+
+
+def encode_location(lat, lon, altitude, height, speed=0.0, vertical_speed=0.0, direction=0, status=2, stamp=0):
+    ew = direction >= 180
+    if speed <= 63.75:
+        multiplier, speed_code = 0, int(round(speed / 0.25))
+    else:
+        multiplier, speed_code = 1, min(254, int(round((speed - 63.75) / 0.75)))
+    bits = (status << 4) | (0x02 if ew else 0) | multiplier
+    alt = int(round((altitude + 1000) * 2))
+    body = LOCATION.pack(0, bits, int(direction - 180 if ew else direction), speed_code,
+                         int(round(vertical_speed * 2)), int(round(lat * 1e7)), int(round(lon * 1e7)),
+                         alt, alt, int(round((height + 1000) * 2)), 0, 0, stamp, 0, 0)
+    return _message(MSG_LOCATION, body[1:])
+
+
+def encode_self_id(text):
+    return _message(MSG_SELF_ID, b'\0' + text.encode('ascii')[:23])
+
+
+def encode_system(lat, lon, altitude=0.0, stamp=0):
+    body = SYSTEM.pack(0, 0x01, int(round(lat * 1e7)), int(round(lon * 1e7)), 1, 0,
+                       0, 0, 0, int(round((altitude + 1000) * 2)), stamp, 0)
+    return _message(MSG_SYSTEM, body[1:])
+
+
+def encode_operator_id(operator_id):
+    return _message(MSG_OPERATOR_ID, b'\0' + operator_id.encode('ascii')[:20].ljust(20, b'\0'))
+
+
+def encode_message_pack(messages):
+    return bytes([(MSG_PACK << 4) | 2, MESSAGE_SIZE, len(messages)]) + b''.join(messages)
+
+
+def _mac(text):
+    return bytes(int(x, 16) for x in text.split(':'))
+
+
+def build_beacon(source, essid, elements=b''):
+    header = bytes([FC_BEACON, 0]) + b'\0\0' + b'\xff' * 6 + _mac(source) * 2 + b'\0\0'
+    ssid = essid.encode()
+    return header + b'\0' * 8 + b'\x64\x00\x01\x04' + bytes([0, len(ssid)]) + ssid + elements
+
+
+def remote_id_element(counter, pack):
+    payload = RID_BEACON_OUI + bytes([counter]) + pack
+    return bytes([VENDOR_IE, len(payload)]) + payload
+
+
+def build_nan_frame(source, counter, pack):
+    info = bytes([counter]) + pack
+    sda = NAN_SERVICE_ID + b'\x01\x00\x10' + bytes([len(info)]) + info
+    header = bytes([FC_ACTION, 0]) + b'\0\0' + b'\x51\x6f\x9a\x01\x00\x00' + _mac(source) + b'\x51\x6f\x9a\x01\x00\x00' + b'\0\0'
+    return header + NAN_ACTION + bytes([NAN_SDA]) + struct.pack('<H', len(sda)) + sda
+
+
+def radiotap(frame, signal=-60):
+    """Minimal radiotap header (flags + antenna signal) with a dummy FCS appended"""
+    header = struct.pack('<BBHIBb', 0, 0, 10, 0x22, RADIOTAP_FLAG_FCS, signal)
+    return header + frame + b'\0\0\0\0'
+
+
+def write_fixture(path, frames=FIXTURE_FRAMES, rid_fraction=RID_FRACTION, pcapng=False, seed=0):
+    """Synthetic radiotap capture: ordinary beacons plus beacon and NAN Remote ID frames.
+
+    Returns the number of Remote ID frames written.
+    """
+    rng = random.Random(seed)
+    filler = b''.join(bytes([e, len(p)]) + p for e, p in
+                      ((1, b'\x82\x84\x8b\x96\x0c\x12\x18\x24'), (3, b'\x06'), (5, b'\x00\x01\x00\x00'),
+                       (48, b'\x01\x00' + b'\x00\x0f\xac\x04' * 3 + b'\x00\x00'), (45, bytes(26)),
+                       (61, bytes(22)), (221, b'\x00\x50\xf2\x02' + bytes(20))))
+    drones = [(f"1581F{n:04d}DRONE{n:06d}", f"60:60:1F:00:{n:02X}:01") for n in range(4)]
+    written = 0
+    with open(path, 'wb') as f:
+        if pcapng:
+            shb = struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1)
+            f.write(struct.pack('<II', PCAPNG_SHB, 28) + shb + struct.pack('<I', 28))
+            idb = struct.pack('<HHI', LINKTYPE_RADIOTAP, 0, 65535)
+            f.write(struct.pack('<II', PCAPNG_IDB, 20) + idb + struct.pack('<I', 20))
+        else:
+            f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_RADIOTAP))
+
+        t0 = 1700000000.0
+        for i in range(frames):
+            t = t0 + i * 0.001
+            if rng.random() < rid_fraction:
+                n = rng.randrange(len(drones))
+                uas_id, source = drones[n]
+                pack = encode_message_pack([
+                    encode_basic_id(uas_id),
+                    encode_location(47.3977 + n * 1e-3, 8.5456 + i * 1e-7, 120.5, 40.0,
+                                    speed=rng.uniform(0, 20), direction=rng.randrange(360)),
+                    encode_system(47.3970, 8.5450, 80.0),
+                    encode_operator_id(f"FIN87astrdge12k{n}"),
+                ])
+                if rng.random() < 0.5:
+                    frame = build_beacon(source, "", remote_id_element(i & 0xFF, pack))
+                else:
+                    frame = build_nan_frame(source, i & 0xFF, pack)
+                written += 1
+            else:
+                source = ':'.join(f"{rng.randrange(256) & 0xFC:02X}" for _ in range(6))
+                frame = build_beacon(source, f"HomeNet{rng.randrange(1000)}", filler)
+            packet = radiotap(frame, -40 - rng.randrange(50))
+            if pcapng:
+                pad = b'\0' * (-len(packet) % 4)
+                ts = int(t * 1e6)
+                length = 32 + len(packet) + len(pad)
+                f.write(struct.pack('<IIIIIII', PCAPNG_EPB, length, 0, ts >> 32, ts & 0xFFFFFFFF,
+                                    len(packet), len(packet)) + packet + pad + struct.pack('<I', length))
+            else:
+                f.write(struct.pack('<IIII', int(t), int((t % 1) * 1e6), len(packet), len(packet)) + packet)
+    return written
+
+
+def summarize(broadcast):
+    """One console line for a decoded broadcast"""
+    parts = [f"{broadcast['source']} [{broadcast['transport']}]"]
+    if broadcast['signal'] is not None:
+        parts.append(f"{broadcast['signal']} dBm")
+    for msg in broadcast['messages']:
+        if msg['type'] == 'basic_id':
+            parts.append(f"ID {msg['uas_id']} ({msg['ua_type']})")
+        elif msg['type'] == 'location' and msg['latitude'] is not None:
+            alt = f"{msg['altitude']:.1f} m" if msg['altitude'] is not None else "alt n/a"
+            speed = f"{msg['speed']:.1f} m/s" if msg['speed'] is not None else "speed n/a"
+            parts.append(f"at {msg['latitude']:.6f},{msg['longitude']:.6f} {alt} {speed} {msg['status']}")
+        elif msg['type'] == 'system' and msg['operator_latitude'] is not None:
+            parts.append(f"operator at {msg['operator_latitude']:.6f},{msg['operator_longitude']:.6f}")
+        elif msg['type'] == 'operator_id':
+            parts.append(f"operator {msg['operator_id']}")
+    return ' | '.join(parts)
+
+
+def benchmark(path, expected=None):
+    size = os.path.getsize(path)
+    start = time.perf_counter()
+    packets = sum(1 for _ in read_packets(path))
+    read_s = time.perf_counter() - start
+    start = time.perf_counter()
+    found = sum(1 for _ in decode_capture(path))
+    decode_s = time.perf_counter() - start
+    print(f"{path}: {size / 1e6:.1f} MB, {packets} frames, {found} Remote ID"
+          + (f" (expected {expected})" if expected is not None else ""))
+    print(f"Read only: {size / 1e6 / read_s:.0f} MB/s | Read + decode: {size / 1e6 / decode_s:.0f} MB/s, "
+          f"{packets / decode_s / 1000:.0f}k frames/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode Wi-Fi Remote ID broadcasts from pcap/pcapng captures")
+    parser.add_argument("capture", nargs='?', help="Capture file (radiotap or raw 802.11)")
+    parser.add_argument("--fixture", help="Write a synthetic capture to this path and benchmark it")
+    parser.add_argument("--frames", type=int, default=FIXTURE_FRAMES, help="Frames in the synthetic capture")
+    parser.add_argument("--pcapng", action="store_true", help="Write the fixture as pcapng instead of pcap")
+    parser.add_argument("--bench", action="store_true", help="Benchmark decoding the capture instead of printing")
+    args = parser.parse_args()
+
+    if args.fixture:
+        written = write_fixture(args.fixture, args.frames, pcapng=args.pcapng)
+        benchmark(args.fixture, written)
+        return
+    if not args.capture:
+        parser.error("give a capture file or --fixture")
+    if args.bench:
+        benchmark(args.capture)
+        return
+
+    drones = {}
+    for broadcast in decode_capture(args.capture):
+        if broadcast['source'] not in drones:
+            print(summarize(broadcast))
+        drones[broadcast['source']] = broadcast
+    print(f"{len(drones)} Remote ID transmitters")
+    for broadcast in drones.values():
+        print(f"  last: {summarize(broadcast)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except (ValueError, FileNotFoundError) as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# Wireless interface discovery from sysfs and nl80211 (no subprocesses)
+
+import argparse
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import time
+
+SYS_NET = "/sys/class/net"
+
+# ARPHRD_* link types reported in /sys/class/net/<iface>/type
+ARPHRD_ETHER = 1          # Managed/AP/ad-hoc 802.11 interfaces look like Ethernet
+ARPHRD_IEEE80211 = 801
+ARPHRD_PRISM = 802
+ARPHRD_RADIOTAP = 803     # Monitor mode with radiotap headers
+MONITOR_TYPES = (ARPHRD_IEEE80211, ARPHRD_PRISM, ARPHRD_RADIOTAP)
+
+# Generic netlink / nl80211
+NETLINK_GENERIC = 16
+GENL_ID_CTRL = 0x10
+CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1
+CTRL_ATTR_FAMILY_NAME = 2
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NL80211_CMD_GET_INTERFACE = 5
+NL80211_ATTR_WIPHY = 1
+NL80211_ATTR_IFINDEX = 3
+NL80211_ATTR_IFNAME = 4
+NL80211_ATTR_IFTYPE = 5
+NL80211_ATTR_MAC = 6
+NL80211_IFTYPES = {1: 'adhoc', 2: 'managed', 3: 'ap', 4: 'ap_vlan', 5: 'wds', 6: 'monitor',
+                   7: 'mesh', 8: 'p2p-client', 9: 'p2p-go', 10: 'p2p-device', 11: 'ocb', 12: 'nan'}
+NETLINK_TIMEOUT = 0.5     # Seconds to wait for a netlink reply
+
+NLMSG_HEADER = struct.Struct('=IHHII')
+GENL_HEADER = struct.Struct('=BBH')
+NLA_HEADER = struct.Struct('=HH')
+
+
+def _read(path, default=None):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def sysfs_interfaces(sys_net=SYS_NET):
+    """Wireless interfaces from one directory scan of /sys/class/net.
+
+    An interface is wireless if it has a `wireless` directory or a
+    `phy80211` link. Mode comes from the link type: radiotap/prism/802.11
+    link types mean monitor mode; anything else is reported as 'managed'
+    until nl80211 says otherwise.
+    """
+    found = []
+    try:
+        names = sorted(os.listdir(sys_net))
+    except OSError:
+        return found
+    for name in names:
+        base = os.path.join(sys_net, name)
+        phy_link = os.path.join(base, "phy80211")
+        if not (os.path.isdir(os.path.join(base, "wireless")) or os.path.exists(phy_link)):
+            continue
+        link_type = int(_read(os.path.join(base, "type"), "0") or 0)
+        phy = os.path.basename(os.readlink(phy_link)) if os.path.islink(phy_link) else None
+        found.append({
+            'name': name,
+            'phy': phy,
+            'mode': 'monitor' if link_type in MONITOR_TYPES else 'managed',
+            'link_type': link_type,
+            'state': _read(os.path.join(base, "operstate"), "unknown"),
+            'address': _read(os.path.join(base, "address")),
+            'source': 'sysfs',
+        })
+    return found
+
+
+def _attrs(data, offset=0):
+    """Netlink attributes -> {type: payload bytes}"""
+    attrs = {}
+    while offset + NLA_HEADER.size <= len(data):
+        length, kind = NLA_HEADER.unpack_from(data, offset)
+        if length < NLA_HEADER.size:
+            break
+        attrs[kind & 0x3FFF] = data[offset + NLA_HEADER.size:offset + length]
+        offset += (length + 3) & ~3
+    return attrs
+
+
+def _attr(kind, payload):
+    length = NLA_HEADER.size + len(payload)
+    return NLA_HEADER.pack(length, kind) + payload + b'\0' * (-length % 4)
+
+
+def _genl_request(sock, family, cmd, flags, payload=b'', seq=1):
+    """Send one generic netlink request and collect the reply messages' attributes"""
+    body = GENL_HEADER.pack(cmd, 1, 0) + payload
+    sock.send(NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), family, NLM_F_REQUEST | flags, seq, 0) + body)
+    replies = []
+    while True:
+        data = sock.recv(65536)
+        offset = 0
+        while offset + NLMSG_HEADER.size <= len(data):
+            length, kind, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+            if length < NLMSG_HEADER.size:
+                return replies
+            if kind == NLMSG_DONE:
+                return replies
+            if kind == NLMSG_ERROR:
+                error = struct.unpack_from('=i', data, offset + NLMSG_HEADER.size)[0]
+                if error:
+                    raise OSError(-error, os.strerror(-error))
+                return replies
+            replies.append(_attrs(data[offset + NLMSG_HEADER.size + GENL_HEADER.size:offset + length]))
+            offset += (length + 3) & ~3
+        if not flags & NLM_F_DUMP:
+            return replies
+
+
+def nl80211_interfaces():
+    """Interface dump from nl80211 (exact iftype); empty if netlink isn't available"""
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+    except (OSError, AttributeError):
+        return []
+    found = []
+    try:
+        sock.settimeout(NETLINK_TIMEOUT)
+        sock.bind((0, 0))
+        replies = _genl_request(sock, GENL_ID_CTRL, CTRL_CMD_GETFAMILY, 0,
+                                _attr(CTRL_ATTR_FAMILY_NAME, b'nl80211\0'))
+        if not replies or CTRL_ATTR_FAMILY_ID not in replies[0]:
+            return []
+        family = struct.unpack('=H', replies[0][CTRL_ATTR_FAMILY_ID][:2])[0]
+        for attrs in _genl_request(sock, family, NL80211_CMD_GET_INTERFACE, NLM_F_DUMP, seq=2):
+            if NL80211_ATTR_IFNAME not in attrs:
+                continue
+            iftype = struct.unpack('=I', attrs[NL80211_ATTR_IFTYPE][:4])[0] if NL80211_ATTR_IFTYPE in attrs else 0
+            mac = attrs.get(NL80211_ATTR_MAC)
+            found.append({
+                'name': attrs[NL80211_ATTR_IFNAME].rstrip(b'\0').decode(),
+                'phy': f"phy{struct.unpack('=I', attrs[NL80211_ATTR_WIPHY][:4])[0]}" if NL80211_ATTR_WIPHY in attrs else None,
+                'mode': NL80211_IFTYPES.get(iftype, f'type{iftype}'),
+                'address': ':'.join(f"{b:02x}" for b in mac) if mac else None,
+            })
+    except (OSError, socket.timeout, struct.error):
+        return []
+    finally:
+        sock.close()
+    return found
+
+
+def discover_interfaces(sys_net=SYS_NET, use_netlink=True):
+    """Wireless interfaces with name, phy, mode, state and address.
+
+    sysfs gives the list, state and a link-type based mode; when nl80211 is
+    reachable its exact interface type overrides the mode (e.g. 'ap' vs
+    'managed') and adds interfaces sysfs missed.
+    """
+    interfaces = {i['name']: i for i in sysfs_interfaces(sys_net)}
+    if use_netlink:
+        for nl in nl80211_interfaces():
+            entry = interfaces.setdefault(nl['name'], {'name': nl['name'], 'link_type': None,
+                                                       'state': 'unknown', 'address': None})
+            entry.update({k: v for k, v in nl.items() if v is not None})
+            entry['source'] = 'nl80211'
+    return list(interfaces.values())
+
+
+def find_monitor_interface(interfaces=None):
+    """Name of the first interface in monitor mode (up ones first), or None"""
+    if interfaces is None:
+        interfaces = discover_interfaces()
+    monitors = [i for i in interfaces if i['mode'] == 'monitor']
+    monitors.sort(key=lambda i: i['state'] not in ('up', 'unknown'))
+    return monitors[0]['name'] if monitors else None
+
+
+def iwconfig_interfaces():
+    """The iwconfig scrape attacks/deauth.py does (benchmark baseline); None without wireless-tools"""
+    if not shutil.which("iwconfig"):
+        return None
+    output = subprocess.run(["iwconfig"], capture_output=True, text=True).stdout
+    found = []
+    for line in output.split('\n'):
+        if line and not line[0].isspace() and ("IEEE 802.11" in line or "Mode:Monitor" in line):
+            found.append({'name': line.split()[0], 'mode': 'monitor' if "Mode:Monitor" in line else 'managed'})
+    return found
+
+
+def benchmark(repeats=20):
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            result = fn()
+        return (time.perf_counter() - start) / repeats * 1000, result
+
+    sysfs_ms, _ = timed(sysfs_interfaces)
+    netlink_ms, nl = timed(nl80211_interfaces)
+    full_ms, _ = timed(discover_interfaces)
+    print(f"sysfs scan:       {sysfs_ms:.3f} ms")
+    print(f"nl80211 dump:     {netlink_ms:.3f} ms" + ("" if nl else " (nl80211 not available)"))
+    print(f"sysfs + nl80211:  {full_ms:.3f} ms")
+    if shutil.which("iwconfig"):
+        iw_ms, _ = timed(iwconfig_interfaces)
+        # deauth.find_monitor_interface runs iwconfig between 2 and 7 times
+        print(f"iwconfig:         {iw_ms:.3f} ms per call, {iw_ms * 2:.1f}-{iw_ms * 7:.1f} ms for the "
+              f"deauth.py lookup ({iw_ms * 2 / max(full_ms, 1e-6):.0f}x+ slower)")
+    else:
+        print("iwconfig:         not installed (the deauth.py lookup would find nothing)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List wireless interfaces and their modes")
+    parser.add_argument("--sys", default=SYS_NET, help=f"sysfs net directory (default: {SYS_NET})")
+    parser.add_argument("--bench", action="store_true", help="Compare against the iwconfig subprocess approach")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark()
+        return
+    interfaces = discover_interfaces(args.sys)
+    if not interfaces:
+        print("No wireless interfaces found")
+    for i in interfaces:
+        print(f"{i['name']:<12} {i.get('phy') or '-':<6} {i['mode']:<10} {i['state']:<8} "
+              f"{i['address'] or '-'} ({i['source']})")
+    monitor = find_monitor_interface(interfaces)
+    print(f"Monitor interface: {monitor or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+import argparse
+import os
+import platform
+import resource
+import time
+import numpy as np
+from decimate import PolyphaseResampler
+from features import (CACHE_DIR, FEATURE_RATE, HOP, N_FFT, FeatureCache, find_wavs,
+                      label_from_path, log_mel, mel_filterbank)
+
+# Classifier settings
+WINDOW_FRAMES = 32        # Log-mel frames per classification window (~0.5 s)
+WINDOW_STRIDE = 8         # Frames between windows (~128 ms)
+HIDDEN = 32               # Hidden units in the MLP
+SEGMENT_FRAMES = 128      # Recordings are cut into ~2 s segments for the train/test split
+TEST_EVERY = 3            # Every 3rd segment is held out for testing
+EPOCHS = 400
+LEARNING_RATE = 0.01
+MODEL_FILE = "drone_classifier.npz"
+ONNX_FILE = "drone_classifier.onnx"
+MEMORY_BUDGET_MB = 32     # Extra RSS the runtime may add on top of the capture process
+NOISE_LABEL = "noise"     # Negative class: background without a drone (as synth_dataset.py labels it)
+NOISE_SECONDS = 60        # Generated background per colour when no noise recordings are given
+NOISE_LEVELS_DB = (-70.0, -50.0, -30.0, -15.0)   # Generated background levels relative to full scale
+MIN_PROBABILITY = 0.6     # Below this the window is reported as noise rather than the argmax drone
+
+
+def pool_window(window):
+    """Per-band mean and std over time: (WINDOW_FRAMES, n_mels) -> (2 * n_mels,)"""
+    return np.concatenate((window.mean(axis=-2), window.std(axis=-2)), axis=-1)
+
+
+def make_windows(frames):
+    """Pooled features for every WINDOW_FRAMES window of one recording"""
+    if len(frames) < WINDOW_FRAMES:
+        return np.zeros((0, 2 * frames.shape[1]), dtype=np.float32)
+    windows = np.lib.stride_tricks.sliding_window_view(frames, WINDOW_FRAMES, axis=0)[::WINDOW_STRIDE]
+    # sliding_window_view puts the window axis last: (n, n_mels, WINDOW_FRAMES)
+    return pool_window(np.swapaxes(windows, -1, -2)).astype(np.float32)
+
+
+def generated_background(seconds=NOISE_SECONDS, seed=0):
+    """(label, log-mel frames) of white/pink/brown noise and near-silence at several levels"""
+    from synth_dataset import NOISE_TYPES, generated_noise
+    rng = np.random.default_rng(seed)
+    n = int(seconds * FEATURE_RATE) // len(NOISE_LEVELS_DB)
+    for kind in NOISE_TYPES:
+        for level_db in NOISE_LEVELS_DB:
+            noise = generated_noise(kind, n, rng) * 32768 * 10 ** (level_db / 20)
+            yield NOISE_LABEL, log_mel(noise, FEATURE_RATE)
+
+
+def dataset_items(cache, paths):
+    """(label, log-mel frames) for exactly these recordings, labelled by their path"""
+    data = cache.data()
+    return [(label_from_path(p), cache.features(p, data)) for p in paths]
+
+
+def split_dataset(items):
+    """Interleaved train/test split on ~2 s segments of every (label, frames) item.
+
+    Windows are cut inside a segment, so no test window shares audio with a
+    training window, while each clip still contributes test data from its
+    start, middle and end.
+    """
+    labels = sorted({label for label, _ in items})
+    x_train, y_train, x_test, y_test = [], [], [], []
+    for label, frames in items:
+        frames = np.asarray(frames)
+        for k, start in enumerate(range(0, len(frames) - SEGMENT_FRAMES + 1, SEGMENT_FRAMES)):
+            windows = make_windows(frames[start:start + SEGMENT_FRAMES])
+            if k % TEST_EVERY == TEST_EVERY - 1:
+                x_test.append(windows)
+                y_test += [labels.index(label)] * len(windows)
+            else:
+                x_train.append(windows)
+                y_train += [labels.index(label)] * len(windows)
+    return (np.concatenate(x_train), np.array(y_train), np.concatenate(x_test), np.array(y_test), labels)
+
+
+def train(x, y, n_classes, hidden=HIDDEN, epochs=EPOCHS, lr=LEARNING_RATE, seed=0):
+    """Full-batch Adam on a one-hidden-layer MLP; normalisation is folded into layer 1"""
+    rng = np.random.default_rng(seed)
+    mu, sigma = x.mean(axis=0), x.std(axis=0) + 1e-6
+    xn = (x - mu) / sigma
+    params = [rng.standard_normal((x.shape[1], hidden)) * np.sqrt(2 / x.shape[1]), np.zeros(hidden),
+              rng.standard_normal((hidden, n_classes)) * np.sqrt(1 / hidden), np.zeros(n_classes)]
+    moments = [(np.zeros_like(p), np.zeros_like(p)) for p in params]
+    onehot = np.eye(n_classes)[y]
+
+    for step in range(1, epochs + 1):
+        w1, b1, w2, b2 = params
+        h = np.maximum(0, xn @ w1 + b1)
+        logits = h @ w2 + b2
+        p = np.exp(logits - logits.max(axis=1, keepdims=True))
+        p /= p.sum(axis=1, keepdims=True)
+
+        d_logits = (p - onehot) / len(x)
+        d_h = (d_logits @ w2.T) * (h > 0)
+        grads = [xn.T @ d_h, d_h.sum(0), h.T @ d_logits, d_logits.sum(0)]
+        for i, (g, (m, v)) in enumerate(zip(grads, moments)):
+            m[:] = 0.9 * m + 0.1 * g
+            v[:] = 0.999 * v + 0.001 * g ** 2
+            params[i] -= lr * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-8)
+
+    w1, b1, w2, b2 = params
+    return {'w1': (w1 / sigma[:, None]).astype(np.float32),
+            'b1': (b1 - (mu / sigma) @ w1).astype(np.float32),
+            'w2': w2.astype(np.float32), 'b2': b2.astype(np.float32)}
+
+
+def save_model(weights, labels, path=MODEL_FILE):
+    np.savez(path, labels=np.array(labels), **weights)
+
+
+def export_onnx(weights, path=ONNX_FILE):
+    """Write the MLP as an ONNX graph (needs the optional `onnx` package)"""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    n_in, n_classes = weights['w1'].shape[0], weights['w2'].shape[1]
+    graph = helper.make_graph(
+        [helper.make_node("Gemm", ["x", "w1", "b1"], ["h"]),
+         helper.make_node("Relu", ["h"], ["hr"]),
+         helper.make_node("Gemm", ["hr", "w2", "b2"], ["logits"]),
+         helper.make_node("Softmax", ["logits"], ["probs"], axis=1)],
+        "drone_classifier",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [1, n_in])],
+        [helper.make_tensor_value_info("probs", TensorProto.FLOAT, [1, n_classes])],
+        [numpy_helper.from_array(weights[k], k) for k in ("w1", "b1", "w2", "b2")])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 7  # IR matching opset 13, loadable by older onnxruntime builds
+    onnx.checker.check_model(model)
+    onnx.save(model, path)
+
+
+class NumpyRuntime:
+    """Fallback runtime: same MLP with preallocated buffers, no per-call allocation"""
+
+    name = "numpy"
+
+    def __init__(self, weights):
+        self.w1, self.b1 = weights['w1'], weights['b1']
+        self.w2, self.b2 = weights['w2'], weights['b2']
+        self.h = np.empty((1, self.w1.shape[1]), dtype=np.float32)
+        self.out = np.empty((1, self.w2.shape[1]), dtype=np.float32)
+
+    def __call__(self, x):
+        np.matmul(x, self.w1, out=self.h)
+        self.h += self.b1
+        np.maximum(self.h, 0, out=self.h)
+        np.matmul(self.h, self.w2, out=self.out)
+        self.out += self.b2
+        self.out -= self.out.max()
+        np.exp(self.out, out=self.out)
+        self.out /= self.out.sum()
+        return self.out[0]
+
+
+class OnnxRuntime:
+    """ONNX Runtime session pinned to one thread without the growing CPU arena"""
+
+    name = "onnxruntime"
+
+    def __init__(self, path=ONNX_FILE):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        options.enable_cpu_mem_arena = False
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, x):
+        return self.session.run(None, {"x": x})[0][0]
+
+
+def load_runtime(model_path=MODEL_FILE, onnx_path=ONNX_FILE, prefer_onnx=True):
+    """(runtime, labels) using ONNX Runtime when it and the .onnx file are available"""
+    stored = np.load(model_path)
+    labels = [str(label) for label in stored['labels']]
+    if prefer_onnx and os.path.exists(onnx_path):
+        try:
+            return OnnxRuntime(onnx_path), labels
+        except ImportError:
+            print("onnxruntime not installed, using the NumPy runtime")
+    return NumpyRuntime({k: stored[k] for k in ("w1", "b1", "w2", "b2")}), labels
+
+
+class StreamClassifier:
+    """Classifies the live stream from sound.py one CHUNK at a time.
+
+    Audio is resampled to FEATURE_RATE, framed into log-mel rows as soon as a
+    full N_FFT frame is available, and every WINDOW_STRIDE new rows the last
+    WINDOW_FRAMES rows are pooled and classified. Samples and rows live in
+    preallocated buffers; the rows are a ring, since pooling (mean and std
+    over time) does not depend on their order. Windows whose best drone
+    class is below `min_probability` are reported as NOISE_LABEL.
+    """
+
+    def __init__(self, runtime, labels, rate, min_probability=MIN_PROBABILITY):
+        self.runtime = runtime
+        self.labels = labels
+        self.min_probability = min_probability
+        self.resampler = PolyphaseResampler(rate, FEATURE_RATE) if rate != FEATURE_RATE else None
+        self.filterbank = mel_filterbank()
+        self.pending = np.zeros(2 * N_FFT, dtype=np.float32)
+        self.n_pending = 0
+        self.rows = np.zeros((WINDOW_FRAMES, self.filterbank.shape[0]), dtype=np.float32)
+        self.row_pos = 0
+        self.filled = 0
+        self.since_last = 0
+
+    def process(self, block):
+        """Feed raw samples; returns (label, probability) when a window completes, else None"""
+        block = np.asarray(block, dtype=np.float32)
+        if self.resampler:
+            block = self.resampler.process(block)
+        end = self.n_pending + len(block)
+        if end > len(self.pending):
+            # Only when blocks grow (first block of a bigger size); steady state never reallocates
+            grown = np.zeros(end + N_FFT, dtype=np.float32)
+            grown[:self.n_pending] = self.pending[:self.n_pending]
+            self.pending = grown
+        self.pending[self.n_pending:end] = block
+        self.n_pending = end
+        if end < N_FFT:
+            return None
+
+        n_frames = (end - N_FFT) // HOP + 1
+        new_rows = log_mel(self.pending[:(n_frames - 1) * HOP + N_FFT], FEATURE_RATE, self.filterbank)
+        consumed = n_frames * HOP
+        self.pending[:end - consumed] = self.pending[consumed:end]
+        self.n_pending = end - consumed
+
+        for row in new_rows[-WINDOW_FRAMES:]:
+            self.rows[self.row_pos] = row
+            self.row_pos = (self.row_pos + 1) % WINDOW_FRAMES
+        self.filled = min(WINDOW_FRAMES, self.filled + len(new_rows))
+        self.since_last += len(new_rows)
+        if self.filled < WINDOW_FRAMES or self.since_last < WINDOW_STRIDE:
+            return None
+
+        self.since_last = 0
+        probs = self.runtime(pool_window(self.rows)[None, :].astype(np.float32))
+        best = int(np.argmax(probs))
+        if self.labels[best] != NOISE_LABEL and probs[best] < self.min_probability:
+            noise = self.labels.index(NOISE_LABEL) if NOISE_LABEL in self.labels else None
+            return NOISE_LABEL, float(probs[noise]) if noise is not None else 1.0 - float(probs[best])
+        return self.labels[best], float(probs[best])
+
+
+def rss_mb():
+    """Peak resident set size of this process in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark(runtime, x_test, y_test, labels, repeats=5):
+    """Per-window latency, CPU share at real-time rate, and accuracy on held-out windows"""
+    rss_before = rss_mb()
+    latencies = []
+    cpu_start = time.process_time()
+    for _ in range(repeats):
+        for x in x_test:
+            start = time.perf_counter()
+            runtime(x[None, :])
+            latencies.append(time.perf_counter() - start)
+    cpu_per_window = (time.process_time() - cpu_start) / (repeats * len(x_test))
+
+    predictions = np.array([np.argmax(runtime(x[None, :])) for x in x_test])
+    # Mean of per-class accuracies, so the large noise class can't hide weak drone classes
+    per_class = {label: float(np.mean(predictions[y_test == i] == i))
+                 for i, label in enumerate(labels) if np.any(y_test == i)}
+    accuracy = float(np.mean(list(per_class.values())))
+    window_period = WINDOW_STRIDE * HOP / FEATURE_RATE
+
+    latencies = np.array(latencies) * 1e6
+    print(f"Runtime: {runtime.name} on {platform.machine()} ({platform.processor() or 'unknown CPU'})")
+    print(f"Latency per window: p50 {np.percentile(latencies, 50):.1f} us | "
+          f"p95 {np.percentile(latencies, 95):.1f} us | max {latencies.max():.1f} us")
+    print(f"CPU at real time (one window every {window_period * 1000:.0f} ms): "
+          f"{cpu_per_window / window_period * 100:.3f}% of a core")
+    rss_growth = rss_mb() - rss_before
+    print(f"Peak RSS {rss_mb():.1f} MB (+{rss_growth:.1f} MB during benchmark, budget {MEMORY_BUDGET_MB} MB)"
+          + (" OVER BUDGET" if rss_growth > MEMORY_BUDGET_MB else ""))
+    print(f"Held-out accuracy (mean over {len(per_class)} classes): {accuracy * 100:.1f}% "
+          f"over {len(y_test)} windows")
+    for i, label in enumerate(labels):
+        if label in per_class:
+            print(f"  {label:>8}: {per_class[label] * 100:5.1f}% of {np.sum(y_test == i)}")
+    return accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train, benchmark or run the on-device drone classifier")
+    parser.add_argument("mode", choices=["train", "bench", "listen"])
+    parser.add_argument("paths", nargs="*", default=["sounds_and_pics"],
+                        help="WAV files or folders for train/bench (default: sounds_and_pics)")
+    parser.add_argument("--noise", nargs="+", default=[],
+                        help="Background WAVs or folders for the noise class (default: generated noise)")
+    parser.add_argument("--cache", default=CACHE_DIR, help=f"Feature cache folder (default: {CACHE_DIR})")
+    parser.add_argument("--numpy", action="store_true", help="Benchmark the NumPy runtime even if ONNX is available")
+    args = parser.parse_args()
+
+    if args.mode == "listen":
+        listen()
+        return
+
+    cache = FeatureCache(args.cache)
+    paths = find_wavs(args.paths)
+    noise_paths = find_wavs(args.noise)
+    cache.update(paths + noise_paths)
+    # Only the recordings asked for: other runs' files may still be in the cache
+    items = dataset_items(cache, paths)
+    if noise_paths:
+        data = cache.data()
+        items += [(NOISE_LABEL, cache.features(p, data)) for p in noise_paths]
+    elif not any(label == NOISE_LABEL for label, _ in items):
+        # synth_dataset.py --format wav output already has a noise/ folder as the class
+        items += generated_background()
+    x_train, y_train, x_test, y_test, labels = split_dataset(items)
+
+    if args.mode == "train":
+        weights = train(x_train, y_train, len(labels))
+        save_model(weights, labels)
+        print(f"Trained on {len(y_train)} windows, saved {MODEL_FILE}")
+        try:
+            export_onnx(weights)
+            print(f"Exported {ONNX_FILE}")
+        except ImportError:
+            print("onnx not installed, skipping ONNX export (NumPy runtime will be used)")
+
+    runtime, model_labels = load_runtime(prefer_onnx=not args.numpy)
+    if model_labels != labels:
+        # The model may have been trained on other data; score by name, not by index
+        missing = sorted(set(labels) - set(model_labels))
+        if missing:
+            print(f"{MODEL_FILE} has no class for {', '.join(missing)} (it knows {', '.join(model_labels)}); "
+                  f"retrain with: python classifier.py train")
+            return
+        y_test = np.array([model_labels.index(labels[i]) for i in y_test])
+    benchmark(runtime, x_test, y_test, model_labels)
+
+
+def listen():
+    """Classify the USB microphone stream in real time"""
+    import pyaudio
+    from mic_array import find_usb_microphone
+
+    rate, chunk = 44100, 1024
+    runtime, labels = load_runtime()
+    classifier = StreamClassifier(runtime, labels, rate)
+
+    audio = pyaudio.PyAudio()
+    stream = audio.open(format=pyaudio.paInt16, channels=1, rate=rate, input=True,
+                        frames_per_buffer=chunk,
+                        input_device_index=find_usb_microphone(audio))
+    print("Listening... Press Ctrl+C to stop.")
+    try:
+        while True:
+            data = stream.read(chunk, exception_on_overflow=False)
+            result = classifier.process(np.frombuffer(data, dtype=np.int16))
+            if result and result[0] != NOISE_LABEL:
+                print(f"[{time.strftime('%H:%M:%S')}] {result[0]} ({result[1]:.2f})")
+    except KeyboardInterrupt:
+        print("Listening stopped by User")
+    finally:
+        stream.stop_stream()
+        stream.close()
+        audio.terminate()
+
+
+if __name__ == "__main__":
+    main()
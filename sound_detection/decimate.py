@@ -0,0 +1,118 @@
+import sys
+import time
+from fractions import Fraction
+import numpy as np
+from wavmap import WavMap
+
+# Resampler settings
+ANALYSIS_RATE = 11025     # Default detector rate (Hz); rotor harmonics sit well below 5 kHz
+TAPS_PER_PHASE = 24       # FIR length per polyphase branch (quality vs. cost)
+CUTOFF = 0.9              # Passband edge as a fraction of the output Nyquist
+
+
+class PolyphaseResampler:
+    """Streaming anti-aliased rational resampler (rate -> target).
+
+    Each block goes through scipy's polyphase upfirdn, which only computes
+    the output samples that are kept, so the cost scales with the *output*
+    rate. A little more input history than the filter needs is carried
+    between calls, just enough that upfirdn's output grid lines up with the
+    next output sample; block-by-block output is therefore identical to
+    resampling the whole signal at once.
+    Accepts 1-D blocks or (channels, frames) blocks.
+    """
+
+    def __init__(self, rate, target=ANALYSIS_RATE, taps_per_phase=TAPS_PER_PHASE, cutoff=CUTOFF):
+        from scipy.signal import firwin, upfirdn  # Keeps headless startup light
+        self._upfirdn = upfirdn
+
+        ratio = Fraction(int(target), int(rate)).limit_denominator(1000)
+        self.rate = rate
+        self.up = ratio.numerator
+        self.down = ratio.denominator
+        self.target = rate * self.up / self.down
+
+        # Prototype runs at rate * up; cut at the narrower of the two Nyquists
+        n_taps = taps_per_phase * self.up
+        cutoff_norm = cutoff / max(self.up, self.down)
+        self.proto = (firwin(n_taps, cutoff_norm) * self.up).astype(np.float32)
+        self.taps = taps_per_phase
+        self._up_inverse = pow(self.up, -1, self.down)
+        self._keep = self.taps - 1 + self.down - 1   # Longest history a block can need
+
+        self.history = None       # Last `_keep` input samples
+        self.position = 0         # Next output position on the upsampled grid, relative to block start
+
+    def reset(self):
+        self.history = None
+        self.position = 0
+
+    def process(self, block):
+        """Resample one block; returns float32 with the same leading shape"""
+        block = np.asarray(block, dtype=np.float32)
+        if self.history is None:
+            self.history = np.zeros(block.shape[:-1] + (self._keep,), dtype=np.float32)
+        n_in = block.shape[-1]
+
+        # Output samples whose newest input lies inside this block
+        n_out = max(0, -(-(n_in * self.up - self.position) // self.down))
+        # History length whose upsampled grid puts the first wanted output on a multiple of `down`
+        n_history = self.taps - 1 + (-(self.taps - 1) * self.up - self.position) * self._up_inverse % self.down
+        padded = np.concatenate((self.history[..., self._keep - n_history:], block), axis=-1)
+        first = (self.position + n_history * self.up) // self.down
+        out = self._upfirdn(self.proto, padded, self.up, self.down, axis=-1)[..., first:first + n_out]
+
+        self.position = self.position + n_out * self.down - n_in * self.up
+        if n_in >= self._keep:
+            self.history = block[..., n_in - self._keep:].copy()
+        else:
+            self.history = np.concatenate((self.history[..., n_in:], block), axis=-1)
+        return out
+
+
+def read_wav_mono(filename):
+    """Load a WAV as float32 mono (16-bit units) and its frame rate"""
+    wav = WavMap(filename)
+    return wav.samples(), wav.rate
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python decimate.py <audio_file> [analysis_rate] [chunk]")
+        return
+
+    signal, rate = read_wav_mono(sys.argv[1])
+    target = int(float(sys.argv[2])) if len(sys.argv) > 2 else ANALYSIS_RATE
+    chunk = int(sys.argv[3]) if len(sys.argv) > 3 else 1024
+
+    resampler = PolyphaseResampler(rate, target)
+    print(f"Resampling {rate} Hz -> {resampler.target:.1f} Hz (up {resampler.up}, down {resampler.down})")
+
+    start = time.perf_counter()
+    out = [resampler.process(signal[i:i + chunk]) for i in range(0, len(signal), chunk)]
+    resample_s = time.perf_counter() - start
+    out = np.concatenate(out)
+
+    # Per-chunk FFT cost at both rates, i.e. what the detector pays per second of audio
+    def fft_cost(x, n):
+        frames = x[:len(x) // n * n].reshape(-1, n)
+        t0 = time.perf_counter()
+        np.abs(np.fft.rfft(frames * np.hanning(n), axis=-1))
+        return time.perf_counter() - t0
+
+    analysis_chunk = max(1, int(round(chunk * resampler.target / rate)))
+    full = fft_cost(signal, chunk)
+    reduced = fft_cost(out, analysis_chunk)
+    seconds = len(signal) / rate
+    print(f"Resampler: {resample_s / seconds * 1000:.2f} ms per second of audio")
+    print(f"FFT at {rate} Hz: {full / seconds * 1000:.2f} ms/s | "
+          f"at {resampler.target:.0f} Hz: {reduced / seconds * 1000:.2f} ms/s "
+          f"({full / max(reduced, 1e-9):.1f}x less)")
+    # End to end: decimating only pays off when the analysis saves more than the resampler costs
+    net = (full - reduced - resample_s) / seconds * 1000
+    print(f"Net per second of audio: {'saves' if net > 0 else 'costs'} {abs(net):.2f} ms with one FFT per chunk; "
+          f"break-even at {resample_s / max(full - reduced, 1e-9):.1f} FFT-sized analyses per chunk")
+
+
+if __name__ == "__main__":
+    main()
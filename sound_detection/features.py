@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from decimate import PolyphaseResampler, read_wav_mono
+
+# Feature settings
+FEATURE_RATE = 16000      # Audio is resampled to this rate before framing (Hz)
+N_FFT = 512               # 32 ms frames at 16 kHz
+HOP = 256                 # 16 ms hop
+N_MELS = 64               # Log-mel bands stored in the cache
+N_MFCC = 20               # Cepstral coefficients derived on demand
+FMIN = 50.0               # Lowest mel edge (Hz)
+FMAX = 8000.0             # Highest mel edge (Hz)
+CACHE_DIR = "feature_cache"
+DATA_FILE = "logmel.f32"  # Concatenated (frames, N_MELS) float32 rows for every file
+INDEX_FILE = "index.json"
+COMPACT_RATIO = 0.5       # Rewrite the data file once this fraction of rows is stale
+LABEL_PREFIX = "test_drone"
+
+
+def hz_to_mel(f):
+    return 2595.0 * np.log10(1.0 + np.asarray(f) / 700.0)
+
+
+def mel_to_hz(m):
+    return 700.0 * (10 ** (np.asarray(m) / 2595.0) - 1.0)
+
+
+def mel_filterbank(rate=FEATURE_RATE, n_fft=N_FFT, n_mels=N_MELS, fmin=FMIN, fmax=FMAX):
+    """(n_mels, n_fft // 2 + 1) triangular filters, area-normalised"""
+    freqs = np.fft.rfftfreq(n_fft, 1 / rate)
+    edges = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(min(fmax, rate / 2)), n_mels + 2))
+    lower, centre, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (centre - lower)
+    falling = (upper - freqs) / (upper - centre)
+    bank = np.maximum(0.0, np.minimum(rising, falling))
+    bank *= (2.0 / (upper - lower))
+    return bank.astype(np.float32)
+
+
+def log_mel(signal, rate, filterbank=None):
+    """(frames, N_MELS) float32 log-mel energies of a mono signal"""
+    if rate != FEATURE_RATE:
+        signal = PolyphaseResampler(rate, FEATURE_RATE).process(signal)
+    if filterbank is None:
+        filterbank = mel_filterbank()
+    if len(signal) < N_FFT:
+        return np.zeros((0, filterbank.shape[0]), dtype=np.float32)
+
+    frames = np.lib.stride_tricks.sliding_window_view(signal, N_FFT)[::HOP]
+    power = np.abs(np.fft.rfft(frames * np.hanning(N_FFT).astype(np.float32), axis=-1)) ** 2
+    return np.log(power @ filterbank.T + 1e-6).astype(np.float32)
+
+
+def mfcc(log_mel_frames, n_mfcc=N_MFCC):
+    """MFCCs from cached log-mel rows (DCT-II over the mel axis)"""
+    from scipy.fft import dct
+    return dct(log_mel_frames, type=2, axis=-1, norm="ortho")[..., :n_mfcc]
+
+
+def label_from_path(path):
+    """'test_drone_spark.wav' -> 'spark'; otherwise the parent folder name"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if stem.startswith(LABEL_PREFIX):
+        return stem[len(LABEL_PREFIX) + 1:] or "drone"
+    return os.path.basename(os.path.dirname(os.path.abspath(path)))
+
+
+def extract_file(path):
+    """Worker entry point: log-mel frames for one WAV"""
+    signal, rate = read_wav_mono(path)
+    return log_mel(signal, rate)
+
+
+class FeatureCache:
+    """Log-mel frames for many WAVs in one memory-mapped float32 file.
+
+    Each file's frames are appended as a contiguous chunk of rows, and
+    index.json maps path -> offset, frame count, label and the (mtime, size)
+    they were computed from. `update` only re-extracts files whose stamp
+    changed and forgets files that no longer exist; their old rows become
+    dead space until `compact` rewrites the data file.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        self.data_path = os.path.join(directory, DATA_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.index = {'n_mels': N_MELS, 'rate': FEATURE_RATE, 'n_fft': N_FFT, 'hop': HOP,
+                      'rows': 0, 'entries': {}}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                stored = json.load(f)
+            # Settings changed -> cached rows are meaningless, start over
+            if all(stored.get(k) == self.index[k] for k in ('n_mels', 'rate', 'n_fft', 'hop')):
+                self.index = stored
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        if not self.index['entries'] or size < self.index['rows'] * self.row_bytes:
+            # Fresh index (or a data file shorter than it claims): old rows can't be trusted, drop them
+            self.index['rows'] = 0
+            self.index['entries'] = {}
+            if size:
+                open(self.data_path, "wb").close()
+
+    @property
+    def row_bytes(self):
+        return self.index['n_mels'] * np.dtype(np.float32).itemsize
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def stale(self, paths):
+        """Paths whose features are missing or older than the file"""
+        out = []
+        for path in paths:
+            entry = self.index['entries'].get(os.path.abspath(path))
+            if entry is None or tuple(entry['stamp']) != self._stamp(path):
+                out.append(path)
+        return out
+
+    def update(self, paths, workers=None):
+        """Extract features for new/changed files in parallel; returns the recomputed paths"""
+        os.makedirs(self.directory, exist_ok=True)
+        gone = [p for p in self.index['entries'] if not os.path.exists(p)]
+        for path in gone:
+            del self.index['entries'][path]
+        todo = self.stale(paths)
+        if todo:
+            # A write cut short mid-row would shift every row appended after it
+            if os.path.exists(self.data_path):
+                size = os.path.getsize(self.data_path)
+                if size % self.row_bytes:
+                    os.truncate(self.data_path, size - size % self.row_bytes)
+            with ProcessPoolExecutor(max_workers=workers) as pool, open(self.data_path, "ab") as out:
+                for path, feats in zip(todo, pool.map(extract_file, todo)):
+                    # Offsets come from the file itself, so rows left by an interrupted run are skipped over
+                    offset = out.tell() // self.row_bytes
+                    feats.astype(np.float32, copy=False).tofile(out)
+                    self.index['entries'][os.path.abspath(path)] = {
+                        'offset': offset,
+                        'frames': len(feats),
+                        'label': label_from_path(path),
+                        'stamp': list(self._stamp(path)),
+                    }
+                    self.index['rows'] = offset + len(feats)
+        if todo or gone:
+            self._save_index()
+
+        live = sum(e['frames'] for e in self.index['entries'].values())
+        if self.index['rows'] and 1 - live / self.index['rows'] > COMPACT_RATIO:
+            self.compact()
+        return todo
+
+    def compact(self):
+        """Rewrite the data file without rows from superseded extractions"""
+        data = self.data()
+        tmp_path = self.data_path + ".tmp"
+        offset = 0
+        with open(tmp_path, "wb") as out:
+            for entry in self.index['entries'].values():
+                data[entry['offset']:entry['offset'] + entry['frames']].tofile(out)
+                entry['offset'] = offset
+                offset += entry['frames']
+        del data
+        os.replace(tmp_path, self.data_path)
+        self.index['rows'] = offset
+        self._save_index()
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def data(self):
+        """Read-only (rows, n_mels) memmap over the whole cache"""
+        if not self.index['rows']:
+            return np.zeros((0, self.index['n_mels']), dtype=np.float32)
+        return np.memmap(self.data_path, dtype=np.float32, mode="r",
+                         shape=(self.index['rows'], self.index['n_mels']))
+
+    def features(self, path, data=None):
+        """Zero-copy view of one file's log-mel frames"""
+        entry = self.index['entries'][os.path.abspath(path)]
+        data = self.data() if data is None else data
+        return data[entry['offset']:entry['offset'] + entry['frames']]
+
+    def items(self):
+        """(path, label, frames view) for every cached file"""
+        data = self.data()
+        for path, entry in self.index['entries'].items():
+            yield path, entry['label'], data[entry['offset']:entry['offset'] + entry['frames']]
+
+
+def find_wavs(paths):
+    """Expand directories into the .wav files they contain"""
+    out = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                out.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(".wav"))
+        else:
+            out.append(path)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the log-mel feature cache")
+    parser.add_argument("paths", nargs="+", help="WAV files or folders (e.g. sounds_and_pics)")
+    parser.add_argument("--cache", default=CACHE_DIR, help=f"Cache folder (default: {CACHE_DIR})")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    wavs = find_wavs(args.paths)
+    cache = FeatureCache(args.cache)
+
+    start = time.perf_counter()
+    updated = cache.update(wavs, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"{len(updated)}/{len(wavs)} files extracted in {elapsed:.2f} s "
+          f"({cache.index['rows']} rows in {cache.data_path})")
+
+    for path, label, feats in cache.items():
+        print(f"  {label:>8}: {len(feats):6d} frames  {os.path.basename(path)}")
+
+
+if __name__ == "__main__":
+    main()
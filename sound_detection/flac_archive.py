@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+# Archive settings
+ARCHIVE_DIR = "recordings"
+SEGMENT_SECONDS = 60      # One FLAC file per minute of audio
+INDEX_FILE = "index.jsonl"
+QUEUE_BLOCKS = 1024       # Chunks buffered for the encoder (~24 s at CHUNK=1024, 44.1 kHz)
+
+
+def _soundfile():
+    try:
+        import soundfile
+    except ImportError:
+        raise ImportError("FLAC archiving needs the soundfile package: pip install soundfile")
+    return soundfile
+
+
+class ArchiveWriter:
+    """Streams int16 audio into segmented FLAC files on a background thread.
+
+    The capture loop only hands blocks to a bounded queue, so encoding and SD
+    card writes never stall `stream.read`. If the encoder falls behind, whole
+    blocks are dropped and counted instead of blocking capture; the frame
+    counter still advances over them, and the next block starts a new
+    segment, so segment start times stay on the same timeline as markers.
+    Encoder or disk errors are counted and reported, and archiving carries
+    on with the next block. Each finished segment and every detection
+    marker is appended to index.jsonl with wall clock time and absolute
+    frame position, so readers can find and decode only the segments they
+    need.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR, rate=44100, channels=1,
+                 segment_seconds=SEGMENT_SECONDS, queue_blocks=QUEUE_BLOCKS):
+        self.sf = _soundfile()
+        self.directory = directory
+        self.rate = rate
+        self.channels = channels
+        self.segment_frames = int(segment_seconds * rate)
+        os.makedirs(directory, exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=queue_blocks)
+        self.dropped = 0          # Audio blocks
+        self.markers_dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.start_time = None    # Wall clock time of frame 0
+        self.frames_queued = 0    # Capture-side frame counter, dropped blocks included (markers use it)
+
+        self.segment = None
+        self.segment_name = None
+        self.segment_start = 0
+        self.segment_written = 0
+        self.frames_written = 0
+        self.thread = threading.Thread(target=self._run, name="flac-archive", daemon=True)
+        self.thread.start()
+
+    def write(self, data):
+        """Queue one block (raw int16 bytes or an array); never blocks"""
+        block = np.frombuffer(data, dtype=np.int16) if isinstance(data, (bytes, bytearray)) else np.asarray(data)
+        block = block.reshape(-1, self.channels)
+        if self.start_time is None:
+            self.start_time = time.time() - len(block) / self.rate
+        try:
+            self.queue.put_nowait((self.frames_queued, block))
+        except queue.Full:
+            self.dropped += 1
+        self.frames_queued += len(block)
+
+    def mark(self, label, **info):
+        """Record a detection marker at the current capture position"""
+        now = time.time()
+        frame = self.frames_queued
+        if self.start_time is not None:
+            frame = int(round((now - self.start_time) * self.rate))
+        entry = {'type': 'marker', 'time': now, 'frame': frame, 'label': label}
+        entry.update(info)
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.markers_dropped += 1
+
+    def close(self):
+        """Flush everything queued so far and finish the current segment"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _open_segment(self):
+        self.segment_start = self.frames_written
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._time_of(self.segment_start)))
+        self.segment_name = f"{stamp}_{self.segment_start:012d}.flac"
+        self.segment = self.sf.SoundFile(os.path.join(self.directory, self.segment_name), "w",
+                                         samplerate=self.rate, channels=self.channels,
+                                         format="FLAC", subtype="PCM_16")
+        self.segment_written = 0
+
+    def _close_segment(self):
+        if self.segment is None:
+            return
+        self.segment.close()
+        self._append_index({'type': 'segment', 'file': self.segment_name,
+                            'start_frame': self.segment_start, 'frames': self.segment_written,
+                            'start_time': self._time_of(self.segment_start),
+                            'rate': self.rate, 'channels': self.channels})
+        self.segment = None
+
+    def _time_of(self, frame):
+        return (self.start_time or time.time()) + frame / self.rate
+
+    def _append_index(self, entry):
+        with open(os.path.join(self.directory, INDEX_FILE), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                if isinstance(item, dict):
+                    self._append_index(item)
+                else:
+                    self._write_block(*item)
+            except Exception as e:   # soundfile raises its own error types as well as OSError
+                self._failed(e)
+        try:
+            self._close_segment()
+        except Exception as e:
+            self._failed(e)
+
+    def _write_block(self, frame, block):
+        if frame != self.frames_written:
+            # Blocks were dropped: end the segment so the next one starts at the right time
+            self._close_segment()
+            self.frames_written = frame
+        # Split blocks that straddle a segment boundary
+        while len(block):
+            if self.segment is None:
+                self._open_segment()
+            room = self.segment_frames - self.segment_written
+            part, block = block[:room], block[room:]
+            self.segment.write(part)
+            self.segment_written += len(part)
+            self.frames_written += len(part)
+            if self.segment_written >= self.segment_frames:
+                self._close_segment()
+
+    def _failed(self, error):
+        self.errors += 1
+        if str(error) != str(self.last_error):
+            print(f"FLAC archive error: {error}")
+        self.last_error = error
+        # Abandon the current segment; the next block opens a fresh one
+        segment, self.segment = self.segment, None
+        if segment is not None:
+            try:
+                segment.close()
+            except Exception:
+                pass
+        self.frames_written = -1   # Forces a new segment at the next block's own frame position
+
+
+class ArchiveReader:
+    """Time-indexed access to an archive written by ArchiveWriter"""
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.sf = _soundfile()
+        self.directory = directory
+        self.segments = []
+        self.markers = []
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            for line in f:
+                entry = json.loads(line)
+                (self.segments if entry['type'] == 'segment' else self.markers).append(entry)
+        self.segments.sort(key=lambda s: s['start_time'])
+
+    def segments_between(self, start_time, end_time):
+        """Index entries of segments overlapping [start_time, end_time)"""
+        return [s for s in self.segments
+                if s['start_time'] < end_time and s['start_time'] + s['frames'] / s['rate'] > start_time]
+
+    def markers_between(self, start_time, end_time):
+        return [m for m in self.markers if start_time <= m['time'] < end_time]
+
+    def read(self, start_time, end_time):
+        """Decode only the overlapping segments; returns (int16 frames x channels, start_time).
+
+        Each segment is placed at its own frame position, so audio lost to
+        dropped blocks comes back as silence rather than shifting later audio.
+        """
+        parts = []
+        for seg in sorted(self.segments_between(start_time, end_time), key=lambda s: s['start_frame']):
+            begin = max(0, int((start_time - seg['start_time']) * seg['rate']))
+            stop = min(seg['frames'], int(np.ceil((end_time - seg['start_time']) * seg['rate'])))
+            data, _ = self.sf.read(os.path.join(self.directory, seg['file']), start=begin, stop=stop,
+                                   dtype="int16", always_2d=True)
+            parts.append((seg, seg['start_frame'] + begin, data))
+        if not parts:
+            return np.zeros((0, 1), dtype=np.int16), start_time
+
+        first_seg, first_frame, _ = parts[0]
+        length = max(frame + len(data) for _, frame, data in parts) - first_frame
+        out = np.zeros((length, parts[0][2].shape[1]), dtype=np.int16)
+        for _, frame, data in parts:
+            out[frame - first_frame:frame - first_frame + len(data)] = data
+        first_time = first_seg['start_time'] + (first_frame - first_seg['start_frame']) / first_seg['rate']
+        return out, first_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or extract audio from a FLAC recording archive")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help=f"Archive folder (default: {ARCHIVE_DIR})")
+    parser.add_argument("--around", help="Extract audio around the marker with this label")
+    parser.add_argument("--seconds", type=float, default=5.0,
+                        help="Seconds either side of the marker to extract (default: 5)")
+    parser.add_argument("-o", "--output", default="extract.wav", help="WAV file for the extracted audio")
+    args = parser.parse_args()
+
+    reader = ArchiveReader(args.dir)
+    total = sum(s['frames'] / s['rate'] for s in reader.segments)
+    size = sum(os.path.getsize(os.path.join(args.dir, s['file'])) for s in reader.segments)
+    print(f"{len(reader.segments)} segments, {total:.0f} s of audio, {size / 1e6:.1f} MB, "
+          f"{len(reader.markers)} markers")
+    for m in reader.markers:
+        print(f"  [{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(m['time']))}] {m['label']}")
+
+    if args.around:
+        marker = next((m for m in reader.markers if m['label'] == args.around), None)
+        if marker is None:
+            print(f"No marker labelled '{args.around}'")
+            return
+        data, _ = reader.read(marker['time'] - args.seconds, marker['time'] + args.seconds)
+        reader.sf.write(args.output, data, reader.segments[0]['rate'], subtype="PCM_16")
+        print(f"Saved {len(data)} frames around '{args.around}' as {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import time
+import numpy as np
+
+# Audio settings
+CHANNELS = 4              # Capsules on the USB mic array
+RATE = 44100              # Sampling rate (Hz)
+CHUNK = 2048              # Frames per block (per channel)
+SPEED_OF_SOUND = 343.0    # m/s at ~20 C
+
+# Capsule positions in metres (x, y), one row per channel.
+# Default is a 4-mic square with 6.5 cm sides (ReSpeaker-style array).
+MIC_POSITIONS = np.array([
+    [-0.0325, -0.0325],
+    [ 0.0325, -0.0325],
+    [ 0.0325,  0.0325],
+    [-0.0325,  0.0325],
+])
+
+DRONE_BAND = (100, 8000)  # Hz, band used for the detection energy and GCC-PHAT
+DETECTION_DB = 12.0       # Band energy above the running floor that counts as a detection
+
+
+def find_usb_microphone(audio, name="USB"):
+    """Return the index of the first input device whose name contains `name`"""
+    for i in range(audio.get_device_count()):
+        dev_info = audio.get_device_info_by_index(i)
+        print(f"Device {i}: {dev_info['name']}")
+
+        if name in dev_info['name'] and dev_info.get('maxInputChannels', 1) > 0:
+            print(f"Using USB microphone with index: {i}")
+            return i
+
+    print("No USB microphone found. Using default input.")
+    return None
+
+
+def split_channels(data, channels):
+    """View interleaved int16 bytes as a (channels, frames) array without copying"""
+    return np.frombuffer(data, dtype=np.int16).reshape(-1, channels).T
+
+
+def input_overflowing(stream, rate, chunk):
+    """True when the input buffer is already full before a read, i.e. audio is being overwritten.
+
+    Checked instead of reading with the overflow exception on: PyAudio throws
+    away the block it raised for, so counting that way loses a CHUNK more.
+    """
+    capacity = max(2 * chunk, int(stream.get_input_latency() * rate))
+    return stream.get_read_available() >= capacity
+
+
+def mic_pairs(channels):
+    """All (i, j) channel pairs with i < j, as two index arrays"""
+    i, j = np.triu_indices(channels, k=1)
+    return i, j
+
+
+def block_spectra(block, n_fft=None):
+    """Windowed real FFT of every channel in a single batched call.
+
+    `block` is (channels, frames). Zero-padding to 2x the block length keeps
+    the cross-correlation computed in `gcc_phat` linear instead of circular.
+    """
+    frames = block.shape[-1]
+    if n_fft is None:
+        n_fft = 2 * frames
+    window = np.hanning(frames).astype(np.float32)
+    return np.fft.rfft(block.astype(np.float32) * window, n=n_fft, axis=-1)
+
+
+def band_mask(n_fft, rate, band=DRONE_BAND):
+    """Boolean mask over rfft bins that fall inside `band`"""
+    freqs = np.fft.rfftfreq(n_fft, 1 / rate)
+    return (freqs >= band[0]) & (freqs <= band[1])
+
+
+def gcc_phat(spectra, pairs, rate, max_delay, mask=None, interp=4):
+    """Time difference of arrival for every channel pair using GCC-PHAT.
+
+    All pairs are whitened and inverse-transformed together, so the cost is one
+    batched irfft regardless of how many microphones are in the array.
+    Returns delays in seconds, positive when channel j hears the sound first.
+    """
+    i, j = pairs
+    cross = spectra[i] * np.conj(spectra[j])
+    cross /= np.abs(cross) + 1e-12
+    if mask is not None:
+        cross *= mask
+
+    n_fft = 2 * (spectra.shape[-1] - 1)
+    n_interp = n_fft * interp
+    cc = np.fft.irfft(cross, n=n_interp, axis=-1)
+
+    max_shift = min(int(np.ceil(max_delay * rate * interp)), n_interp // 2)
+    # Reorder so that lag 0 sits in the middle of the search window
+    cc = np.concatenate((cc[:, -max_shift:], cc[:, :max_shift + 1]), axis=-1)
+    shift = np.argmax(np.abs(cc), axis=-1) - max_shift
+    return shift / float(rate * interp)
+
+
+def estimate_bearing(delays, pairs, positions=MIC_POSITIONS, c=SPEED_OF_SOUND):
+    """Far-field bearing in degrees (0 = +x axis, counter-clockwise) from pair delays.
+
+    Solves (p_j - p_i) . u = c * tau for the unit direction u in the least
+    squares sense, which works for any array geometry with 2+ pairs.
+    """
+    i, j = pairs
+    baselines = positions[j] - positions[i]
+    u, *_ = np.linalg.lstsq(baselines, c * delays, rcond=None)
+    return float(np.degrees(np.arctan2(u[1], u[0])) % 360)
+
+
+def max_array_delay(positions=MIC_POSITIONS, c=SPEED_OF_SOUND):
+    """Largest physically possible delay between any two capsules (s)"""
+    diffs = positions[:, None, :] - positions[None, :, :]
+    return float(np.sqrt((diffs ** 2).sum(-1)).max() / c)
+
+
+class ArrayProcessor:
+    """Per-block detection energy and bearing for a mic array.
+
+    Every stage runs on the whole (channels, frames) block at once, so adding
+    channels grows the work inside NumPy rather than the number of Python calls.
+    """
+
+    def __init__(self, channels=CHANNELS, rate=RATE, chunk=CHUNK, positions=MIC_POSITIONS,
+                 band=DRONE_BAND, detection_db=DETECTION_DB):
+        if len(positions) != channels:
+            raise ValueError(f"Expected {channels} mic positions, got {len(positions)}")
+        self.channels = channels
+        self.rate = rate
+        self.positions = np.asarray(positions, dtype=float)
+        self.pairs = mic_pairs(channels)
+        self.mask = band_mask(2 * chunk, rate, band)
+        self.max_delay = max_array_delay(self.positions)
+        self.detection_db = detection_db
+        self.floor_db = None
+
+    def process(self, block):
+        """Return (band_db, detected, bearing) for one (channels, frames) block"""
+        spectra = block_spectra(block)
+        power = np.abs(spectra[:, self.mask]) ** 2
+        band_db = 10 * np.log10(power.mean() + 1e-12)
+
+        # Slow-rising, fast-falling floor so a hovering drone doesn't become background
+        if self.floor_db is None:
+            self.floor_db = band_db
+        elif band_db < self.floor_db:
+            self.floor_db = band_db
+        else:
+            self.floor_db += 0.01 * (band_db - self.floor_db)
+
+        detected = band_db - self.floor_db > self.detection_db
+        bearing = None
+        if detected and self.channels > 1:
+            delays = gcc_phat(spectra, self.pairs, self.rate, self.max_delay, self.mask)
+            bearing = estimate_bearing(delays, self.pairs, self.positions)
+        return band_db, detected, bearing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Real-time drone bearing from a USB mic array")
+    parser.add_argument("-c", "--channels", type=int, default=CHANNELS,
+                        help=f"Number of array channels (default: {CHANNELS})")
+    parser.add_argument("-r", "--rate", type=int, default=RATE,
+                        help=f"Sampling rate in Hz (default: {RATE})")
+    parser.add_argument("--chunk", type=int, default=CHUNK,
+                        help=f"Frames per block (default: {CHUNK})")
+    parser.add_argument("--device", default="USB",
+                        help="Substring of the input device name (default: USB)")
+    args = parser.parse_args()
+
+    import pyaudio
+
+    positions = MIC_POSITIONS
+    if args.channels != len(MIC_POSITIONS):
+        # Fall back to a linear array with 4 cm spacing along x
+        positions = np.column_stack((np.arange(args.channels) * 0.04, np.zeros(args.channels)))
+        print(f"Using a linear {args.channels}-mic layout; edit MIC_POSITIONS for your array.")
+
+    processor = ArrayProcessor(args.channels, args.rate, args.chunk, positions)
+
+    audio = pyaudio.PyAudio()
+    device_index = find_usb_microphone(audio, args.device)
+    stream = audio.open(format=pyaudio.paInt16, channels=args.channels,
+                        rate=args.rate, input=True,
+                        frames_per_buffer=args.chunk,
+                        input_device_index=device_index)
+
+    print("Listening... Press Ctrl+C to stop.")
+    try:
+        while True:
+            data = stream.read(args.chunk, exception_on_overflow=False)
+            start = time.perf_counter()
+            band_db, detected, bearing = processor.process(split_channels(data, args.channels))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            if detected:
+                direction = f"{bearing:6.1f} deg" if bearing is not None else "n/a"
+                print(f"[{time.strftime('%H:%M:%S')}] Drone band {band_db:5.1f} dB | "
+                      f"Bearing: {direction} | {elapsed_ms:.2f} ms/block")
+    except KeyboardInterrupt:
+        print("Listening stopped by User")
+    finally:
+        stream.stop_stream()
+        stream.close()
+        audio.terminate()
+
+
+if __name__ == "__main__":
+    main()
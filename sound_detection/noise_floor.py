@@ -0,0 +1,118 @@
+import argparse
+import numpy as np
+from decimate import read_wav_mono
+from rpm_tracker import N_FFT, HOP, stft_magnitudes
+
+# Noise floor settings
+SMOOTHING = 0.85          # Recursive power smoothing per frame (alpha)
+SUBWINDOWS = 8            # U: sub-windows in the minimum search
+SUBWINDOW_FRAMES = 12     # V: frames per sub-window; U * V frames ~ 2.2 s at HOP=1024
+BIAS = 1.5                # Minimum-of-smoothed-power underestimates the mean noise power
+OVERSUBTRACT = 2.0        # Spectral subtraction factor
+SPECTRAL_FLOOR = 0.05     # Keep at least this fraction of the original power per bin
+DETECTION_SNR_DB = 10.0   # Band SNR needed to call a frame a detection
+DRONE_BAND = (100, 8000)  # Hz
+
+
+class MinimumStatistics:
+    """Online per-bin noise floor by minimum statistics (after Martin, 2001).
+
+    The noise PSD is the minimum of the smoothed power over the last U * V
+    frames. The minimum is tracked per sub-window, so each frame costs O(bins)
+    and the U sub-window minima are combined only once every V frames.
+    Speech, or here a drone, raises the smoothed power but rarely holds the
+    minimum up for the whole window, so the floor follows wind, traffic and
+    mic hiss instead of the target.
+    """
+
+    def __init__(self, bins, smoothing=SMOOTHING, subwindows=SUBWINDOWS,
+                 subwindow_frames=SUBWINDOW_FRAMES, bias=BIAS):
+        self.smoothing = smoothing
+        self.subwindow_frames = subwindow_frames
+        self.bias = bias
+        self.smoothed = None
+        self.current_min = np.full(bins, np.inf)
+        self.minima = np.full((subwindows, bins), np.inf)
+        self.window_min = np.full(bins, np.inf)
+        self.slot = 0
+        self.count = 0
+
+    def update(self, power):
+        """Feed one power spectrum (|X|^2); returns the current noise PSD estimate"""
+        if self.smoothed is None:
+            self.smoothed = np.array(power, dtype=float)
+        else:
+            self.smoothed *= self.smoothing
+            self.smoothed += (1 - self.smoothing) * power
+        np.minimum(self.current_min, self.smoothed, out=self.current_min)
+
+        self.count += 1
+        if self.count == self.subwindow_frames:
+            self.minima[self.slot] = self.current_min
+            self.slot = (self.slot + 1) % len(self.minima)
+            self.window_min = self.minima.min(axis=0)
+            self.current_min = self.smoothed.copy()
+            self.count = 0
+        return self.noise()
+
+    def noise(self):
+        return self.bias * np.minimum(self.window_min, self.current_min)
+
+
+def spectral_subtract(power, noise, oversubtract=OVERSUBTRACT, floor=SPECTRAL_FLOOR):
+    """Power spectral subtraction with a spectral floor against musical noise"""
+    return np.maximum(power - oversubtract * noise, floor * power)
+
+
+def band_snr_db(power, noise, mask):
+    """SNR (dB) of the in-band power over the in-band noise estimate"""
+    return 10 * np.log10(power[mask].sum() / (noise[mask].sum() + 1e-12) + 1e-12)
+
+
+class NoiseReducer:
+    """Noise floor + optional subtraction as one stage ahead of detection"""
+
+    def __init__(self, rate, n_fft=N_FFT, band=DRONE_BAND, subtract=True):
+        freqs = np.fft.rfftfreq(n_fft, 1 / rate)
+        self.mask = (freqs >= band[0]) & (freqs <= band[1])
+        self.floor = MinimumStatistics(len(freqs))
+        self.subtract = subtract
+
+    def process(self, mag):
+        """Return (cleaned magnitude, band SNR in dB) for one magnitude spectrum"""
+        power = np.asarray(mag, dtype=float) ** 2
+        noise = self.floor.update(power)
+        snr = band_snr_db(power, noise, self.mask)
+        if self.subtract:
+            power = spectral_subtract(power, noise)
+        return np.sqrt(power), snr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background-noise floor and SNR detection for a recording")
+    parser.add_argument("audio_file", help="WAV file to analyse")
+    parser.add_argument("--snr", type=float, default=DETECTION_SNR_DB,
+                        help=f"Detection threshold in dB over the floor (default: {DETECTION_SNR_DB})")
+    parser.add_argument("--raw-db", type=float, default=None,
+                        help="Fixed in-band level (dB) for the raw-magnitude comparison "
+                             "(default: median level of the file + the SNR threshold)")
+    args = parser.parse_args()
+
+    signal, rate = read_wav_mono(args.audio_file)
+    reducer = NoiseReducer(rate)
+
+    levels, snrs = [], []
+    for mag in stft_magnitudes(signal):
+        _, snr = reducer.process(mag)
+        levels.append(10 * np.log10((mag[reducer.mask] ** 2).sum() + 1e-12))
+        snrs.append(snr)
+    levels, snrs = np.array(levels), np.array(snrs)
+
+    raw_threshold = args.raw_db if args.raw_db is not None else np.median(levels) + args.snr
+    print(f"Frames: {len(levels)} ({HOP / rate * 1000:.1f} ms hop)")
+    print(f"Raw level > {raw_threshold:.1f} dB:       {np.mean(levels > raw_threshold) * 100:5.1f}% of frames")
+    print(f"SNR over noise floor > {args.snr:.1f} dB: {np.mean(snrs > args.snr) * 100:5.1f}% of frames")
+
+
+if __name__ == "__main__":
+    main()
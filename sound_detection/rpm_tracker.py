@@ -0,0 +1,205 @@
+import argparse
+from collections import deque
+import numpy as np
+from decimate import read_wav_mono
+
+# Tracker settings
+N_FFT = 4096              # Analysis window (~10.8 Hz bins at 44.1 kHz)
+HOP = 1024                # Frame step, one CHUNK of sound.py
+F0_RANGE = (80.0, 800.0)  # Blade-pass fundamentals we search for (Hz)
+HARMONICS = 6             # Comb teeth used to score a fundamental
+SEARCH_HZ = 20.0          # How far the fundamental may move between frames while tracking
+ACQUIRE_CONTRAST_DB = 10.0  # Comb peaks vs. in-between valleys needed to start a track
+MIN_CONTRAST_DB = 6.0     # ...and to keep following one (hysteresis)
+LOST_FRAMES = 4           # Weak frames in a row before falling back to a full search
+OCTAVE_TOLERANCE_DB = 3.0 # Prefer 2x/3x the winner on acquisition if it scores within this margin
+BLADES = 2                # Propeller blades; RPM = 60 * f0 / BLADES. Use 1 when the comb
+                          # locks onto the shaft rate (odd harmonics present, as on the Spark)
+TREND_SECONDS = 2.0       # History used for the flight-state trend
+
+# Trend thresholds for flight_state()
+F0_SLOPE = 0.02           # Relative f0 change per second counted as climbing/descending
+LEVEL_SLOPE = 1.5         # dB per second counted as approaching/receding
+
+
+class HarmonicTracker:
+    """Follows the blade-pass fundamental and its harmonic comb across frames.
+
+    A candidate fundamental is scored by comb contrast: the mean log magnitude
+    at its harmonics minus the mean at the midpoints between them. This is high
+    for the true f0 and drops for its octave errors. The full F0_RANGE is
+    searched only to acquire a track; afterwards each frame scores just the
+    candidates within SEARCH_HZ of the previous estimate, i.e. O(harmonics *
+    candidates) work that does not grow with the FFT size.
+    """
+
+    def __init__(self, rate, n_fft=N_FFT, hop=HOP, f0_range=F0_RANGE, harmonics=HARMONICS,
+                 search_hz=SEARCH_HZ, min_contrast_db=MIN_CONTRAST_DB, blades=BLADES):
+        self.rate = rate
+        self.n_fft = n_fft
+        self.hop = hop
+        self.bin_hz = rate / n_fft
+        self.harmonics = np.arange(1, harmonics + 1)
+        self.min_contrast_db = min_contrast_db
+        self.blades = blades
+
+        # Candidate fundamentals on a quarter-bin grid (in bins)
+        step = 0.25
+        self.grid = np.arange(f0_range[0] / self.bin_hz, f0_range[1] / self.bin_hz, step)
+        self.search = int(np.ceil(search_hz / self.bin_hz / step))
+
+        self.f0 = None            # Current estimate (Hz), None when not tracking
+        self.index = None         # Position of the estimate on self.grid
+        self.misses = 0
+        self.frames = 0
+        self.history = deque(maxlen=max(2, int(TREND_SECONDS * rate / hop)))
+
+    def _contrast(self, log_mag, candidates):
+        """Comb contrast (dB) for each candidate fundamental (in bins)"""
+        peaks = np.rint(candidates[:, None] * self.harmonics).astype(int)
+        valleys = np.rint(candidates[:, None] * (self.harmonics + 0.5)).astype(int)
+        limit = len(log_mag) - 1
+        peaks = np.minimum(peaks, limit)
+        valleys = np.minimum(valleys, limit)
+
+        # Allow each tooth to sit one bin off the exact multiple; valleys get the
+        # same treatment so noise alone scores ~0 dB
+        def local_max(idx):
+            return np.maximum(np.maximum(log_mag[idx - 1], log_mag[idx]), log_mag[np.minimum(idx + 1, limit)])
+        return local_max(peaks).mean(axis=1) - local_max(valleys).mean(axis=1)
+
+    def _correct_octave(self, log_mag, scores, best):
+        """Move an acquisition off a subharmonic: f0/2 and f0/3 share every tooth of f0"""
+        for multiple in (3, 2):
+            target = self.grid[best] * multiple
+            if target > self.grid[-1]:
+                continue
+            index = int(np.argmin(np.abs(self.grid - target)))
+            lo = max(0, index - 2)
+            window = scores[lo:index + 3]
+            candidate = lo + int(np.argmax(window))
+            if window.max() >= scores[best] - OCTAVE_TOLERANCE_DB:
+                return candidate, float(scores[candidate])
+        return best, float(scores[best])
+
+    def update(self, mag, t=None):
+        """Feed one magnitude spectrum (rfft of N_FFT samples); returns a result dict or None"""
+        if t is None:
+            t = self.frames * self.hop / self.rate
+        self.frames += 1
+        log_mag = 20 * np.log10(np.asarray(mag) + 1e-9)
+
+        if self.index is None:
+            lo, hi = 0, len(self.grid)                      # Acquire: whole range
+        else:
+            lo = max(0, self.index - self.search)           # Track: local neighbourhood only
+            hi = min(len(self.grid), self.index + self.search + 1)
+
+        scores = self._contrast(log_mag, self.grid[lo:hi])
+        best = int(np.argmax(scores))
+        contrast = float(scores[best])
+        if self.index is None:
+            best, contrast = self._correct_octave(log_mag, scores, best)
+
+        threshold = ACQUIRE_CONTRAST_DB if self.index is None else self.min_contrast_db
+        if contrast < threshold:
+            self.misses += 1
+            if self.misses >= LOST_FRAMES:
+                self.f0 = self.index = None
+                self.history.clear()
+            return None
+
+        self.misses = 0
+        self.index = lo + best
+        self.f0 = float(self.grid[self.index] * self.bin_hz)
+        peaks = np.rint(self.grid[self.index] * self.harmonics).astype(int)
+        levels = log_mag[np.minimum(peaks, len(log_mag) - 1)]
+        level_db = float(levels.max())
+        self.history.append((t, self.f0, level_db))
+
+        return {
+            'time': t,
+            'f0': self.f0,
+            'rpm': 60.0 * self.f0 / self.blades,
+            'contrast_db': contrast,
+            'level_db': level_db,
+            'harmonics_db': levels,
+            'state': self.flight_state(),
+        }
+
+    def trend(self):
+        """(relative f0 slope per second, level slope in dB/s) over the recent history"""
+        if len(self.history) < self.history.maxlen // 2:
+            return None
+        t, f0, level = np.array(self.history).T
+        t = t - t[0]
+        f0_slope = np.polyfit(t, f0, 1)[0] / f0.mean()
+        level_slope = np.polyfit(t, level, 1)[0]
+        return f0_slope, level_slope
+
+    def flight_state(self):
+        """Coarse manoeuvre label from the RPM and loudness trends.
+
+        Rising rotor speed means more thrust (climb); a steady rotor that gets
+        louder is closing in. Falls back to 'tracking' until enough history.
+        """
+        trend = self.trend()
+        if trend is None:
+            return 'tracking'
+        f0_slope, level_slope = trend
+        if f0_slope > F0_SLOPE:
+            return 'climb'
+        if f0_slope < -F0_SLOPE:
+            return 'descend'
+        if level_slope > LEVEL_SLOPE:
+            return 'approach'
+        if level_slope < -LEVEL_SLOPE:
+            return 'recede'
+        return 'hover'
+
+
+def stft_magnitudes(signal, n_fft=N_FFT, hop=HOP):
+    """Yield Hann-windowed magnitude spectra frame by frame"""
+    window = np.hanning(n_fft).astype(np.float32)
+    for start in range(0, len(signal) - n_fft + 1, hop):
+        yield np.abs(np.fft.rfft(signal[start:start + n_fft] * window))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track drone blade-pass frequency and RPM in a recording")
+    parser.add_argument("audio_file", help="WAV file to analyse (e.g. sounds_and_pics/test_drone_spark.wav)")
+    parser.add_argument("--blades", type=int, default=BLADES, help=f"Propeller blades (default: {BLADES})")
+    parser.add_argument("--every", type=float, default=1.0,
+                        help="Print a line every N seconds (default: 1.0)")
+    parser.add_argument("--denoise", action="store_true",
+                        help="Subtract the adaptive noise floor before tracking")
+    args = parser.parse_args()
+
+    signal, rate = read_wav_mono(args.audio_file)
+    tracker = HarmonicTracker(rate, blades=args.blades)
+    reducer = None
+    if args.denoise:
+        from noise_floor import NoiseReducer
+        reducer = NoiseReducer(rate)
+
+    next_print = 0.0
+    tracked = 0
+    for frame, mag in enumerate(stft_magnitudes(signal)):
+        if reducer:
+            mag, _ = reducer.process(mag)
+        result = tracker.update(mag)
+        if result:
+            tracked += 1
+        t = frame * HOP / rate
+        if t >= next_print:
+            next_print += args.every
+            if result:
+                print(f"[{t:6.2f}s] f0 {result['f0']:6.1f} Hz | {result['rpm']:6.0f} RPM | "
+                      f"contrast {result['contrast_db']:4.1f} dB | {result['state']}")
+            else:
+                print(f"[{t:6.2f}s] no harmonic comb")
+    print(f"Tracked in {tracked}/{tracker.frames} frames")
+
+
+if __name__ == "__main__":
+    main()
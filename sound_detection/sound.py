@@ -1,34 +1,31 @@
 import pyaudio
 import numpy as np
-import matplotlib.pyplot as plt
+import os
+import sys
 import wave
 import time
-from matplotlib.animation import FuncAnimation
+from mic_array import find_usb_microphone, input_overflowing, split_channels
+from decimate import PolyphaseResampler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fusion"))
+import metrics
 
 # Audio settings
 FORMAT = pyaudio.paInt16  # 16-bit format
-CHANNELS = 1              # Mono
+CHANNELS = 1              # Mono (set to the capsule count for a USB mic array)
 RATE = 44100              # Sampling rate (Hz)
 CHUNK = 1024              # Buffer size
 RECORD_SECONDS = 5        # Recording duration
 OUTPUT_FILENAME = "recorded_audio.wav"
+ANALYSIS_RATE = None      # e.g. 11025 or 16000 to analyse a decimated stream (None = full rate)
+METRICS_PORT = None       # e.g. 9101 to serve stage timings/drops on http://127.0.0.1:PORT/metrics
+HEADLESS = "--headless" in sys.argv  # Record RECORD_SECONDS without loading matplotlib
 
 # Initialize PyAudio
 audio = pyaudio.PyAudio()
 
 # Find USB microphone
-device_index = None
-for i in range(audio.get_device_count()):
-    dev_info = audio.get_device_info_by_index(i)
-    print(f"Device {i}: {dev_info['name']}")
-
-    if "USB" in dev_info['name']:  # Adjust for your mic
-        device_index = i
-        print(f"Using USB microphone with index: {device_index}")
-        break
-
-if device_index is None:
-    print("No USB microphone found. Using default input.")
+device_index = find_usb_microphone(audio, "USB")  # Adjust for your mic
 
 # Open audio stream
 stream = audio.open(format=FORMAT, channels=CHANNELS,
@@ -36,36 +33,71 @@ stream = audio.open(format=FORMAT, channels=CHANNELS,
                     frames_per_buffer=CHUNK,
                     input_device_index=device_index)
 
-# Set up the plot
-fig, ax = plt.subplots()
-x = np.linspace(0, CHUNK / RATE, CHUNK)  # Time axis
-line, = ax.plot(x, np.random.rand(CHUNK), '-', lw=1)
+# Instrumentation: capture backlog is sampled only when metrics are read
+metrics.gauge("audio_read_available", stream.get_read_available)
+if METRICS_PORT:
+    metrics.REGISTRY.start_http(METRICS_PORT)
 
-ax.set_ylim(-32000, 32000)  # 16-bit audio range
-ax.set_xlim(0, CHUNK / RATE)
-ax.set_xlabel("Time (s)")
-ax.set_ylabel("Amplitude")
-ax.set_title("Real-Time Audio Waveform")
+# Optional decimation between capture and analysis; the WAV is still written at RATE
+resampler = PolyphaseResampler(RATE, ANALYSIS_RATE) if ANALYSIS_RATE else None
+analysis_rate = resampler.target if resampler else RATE
 
 frames = []
 
-def update(frame):
-    """Update function for animation."""
-    global frames
-    data = stream.read(CHUNK, exception_on_overflow=False)
-    audio_data = np.frombuffer(data, dtype=np.int16)  # Convert to int16
-    line.set_ydata(audio_data)  # Update graph
-    frames.append(data)  # Save audio data for file
-    return line,
+def read_block():
+    """Read one CHUNK; returns the analysis samples (first channel, decimated if enabled)"""
+    with metrics.timer("audio_read"):
+        if input_overflowing(stream, RATE, CHUNK):
+            # The plot fell behind and audio was lost; count it instead of hiding it
+            metrics.count("audio_overflows")
+        data = stream.read(CHUNK, exception_on_overflow=False)
+    metrics.count("audio_blocks")
+    with metrics.timer("audio_process"):
+        audio_data = split_channels(data, CHANNELS)  # (channels, CHUNK) int16 view
+        analysis_data = audio_data[0]
+        if resampler:
+            analysis_data = resampler.process(analysis_data)
+    frames.append(data)  # Save full-rate audio data for file
+    return analysis_data
+
+if HEADLESS:
+    print(f"Recording {RECORD_SECONDS} s (headless)...")
+    for _ in range(int(RATE / CHUNK * RECORD_SECONDS)):
+        read_block()
+else:
+    # Plotting is imported only when there is a window to show
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
+    # Set up the plot
+    fig, ax = plt.subplots()
+    x = np.linspace(0, CHUNK / RATE, CHUNK)  # Time axis
+    line, = ax.plot(x, np.random.rand(CHUNK), '-', lw=1)
+
+    ax.set_ylim(-32000, 32000)  # 16-bit audio range
+    ax.set_xlim(0, CHUNK / RATE)
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Amplitude")
+    ax.set_title("Real-Time Audio Waveform")
+
+    def update(frame):
+        """Update function for animation."""
+        analysis_data = read_block()
+        # Block length varies by a sample at fractional ratios, so set x as well
+        line.set_data(np.arange(len(analysis_data)) / analysis_rate, analysis_data)  # Plot the first channel
+        return line,
 
-# Create animation
-ani = FuncAnimation(fig, update, interval=50, blit=True)
+    # Create animation
+    ani = FuncAnimation(fig, update, interval=50, blit=True)
 
-print("Recording... Close the plot window to stop.")
-plt.show()
+    print("Recording... Close the plot window to stop.")
+    plt.show()
 
 # Stop recording
 print("Recording finished.")
+overflows = metrics.REGISTRY.counters.get("audio_overflows", 0)
+if overflows:
+    print(f"Warning: {overflows} input overflows (audio was dropped while the plot caught up)")
 stream.stop_stream()
 stream.close()
 audio.terminate()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# Parallel synthetic training set: drone recordings mixed with noise at random SNR, pitch, Doppler and distance
+
+import argparse
+import csv
+import json
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from decimate import PolyphaseResampler
+from features import FEATURE_RATE, find_wavs, label_from_path
+from wavmap import WavMap
+
+# Dataset settings
+OUTPUT_DIR = "synth_dataset"
+DRONE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds_and_pics")
+RATE = FEATURE_RATE       # Output sample rate (Hz)
+CLIP_SECONDS = 2.0        # Length of every example
+SHARD_SIZE = 500          # Examples per shard (one worker writes one shard at a time)
+NEGATIVE_FRACTION = 0.2   # Share of noise-only examples, labelled 'noise'
+SNR_DB = (-10.0, 20.0)    # Drone-to-noise ratio at REFERENCE_DISTANCE, drawn uniformly
+GAIN_DB = (-12.0, 0.0)    # Overall level of the mixture
+PITCH = (0.92, 1.08)      # Constant pitch factor (rotor speed / different airframe)
+DOPPLER = (0.0, 0.04)     # Fly-by sweep: pitch goes from 1 + d to 1 - d across the clip
+DISTANCE_M = (5.0, 120.0) # Source distance; spherical spreading and air absorption relative to the reference
+REFERENCE_DISTANCE = 10.0
+NOISE_TYPES = ("white", "pink", "brown")   # Generated when no noise clips are given
+PEAK = 0.9 * 32767        # Mixtures louder than this are scaled down rather than clipped
+FIELDS = ['label', 'noise', 'gain_db', 'source', 'pitch', 'doppler', 'distance_m', 'snr_ref_db', 'snr_db']
+
+
+def _segment(wav, seconds, rng, resamplers):
+    """Random `seconds` of a source as float32 at RATE (16-bit units), anti-aliased"""
+    if wav.rate == RATE:
+        start = rng.uniform(0, max(0.0, wav.duration - seconds))
+        return wav.samples(start, start + seconds)
+    if wav.rate not in resamplers:
+        resamplers[wav.rate] = PolyphaseResampler(wav.rate, RATE)
+    resampler = resamplers[wav.rate]
+    resampler.reset()
+    # Read enough extra input to cover the filter's start-up transient (it begins from silence), then drop it
+    extra = (resampler.taps + 1) / RATE
+    start = rng.uniform(0, max(0.0, wav.duration - seconds - extra))
+    return resampler.process(wav.samples(start, start + seconds + extra))[resampler.taps:]
+
+
+def warp(signal, n_out, pitch, doppler):
+    """Resample `signal` to n_out samples while the playback rate sweeps pitch*(1+d) -> pitch*(1-d)"""
+    rate = pitch * np.linspace(1 + doppler, 1 - doppler, n_out)
+    position = np.concatenate(([0.0], np.cumsum(rate[:-1])))
+    return np.interp(position, np.arange(len(signal)), signal).astype(np.float32)
+
+
+def air_absorption(signal, distance):
+    """Spherical spreading plus a one-pole low-pass whose cutoff falls with distance"""
+    from scipy.signal import lfilter
+    cutoff = RATE / 2 / (1 + distance / 40)                # ~6.3 kHz at 10 m, ~2 kHz at 120 m
+    a = np.exp(-2 * np.pi * cutoff / RATE)
+    return lfilter([1 - a], [1, -a], signal).astype(np.float32) * (REFERENCE_DISTANCE / distance)
+
+
+def generated_noise(kind, n, rng):
+    """Unit-RMS white/pink/brown noise"""
+    white = rng.standard_normal(n)
+    if kind == "white":
+        out = white
+    else:
+        spectrum = np.fft.rfft(white)
+        f = np.arange(1, len(spectrum) + 1)
+        spectrum /= np.sqrt(f) if kind == "pink" else f       # 1/f or 1/f^2 power
+        out = np.fft.irfft(spectrum, n)
+    return (out / (np.sqrt(np.mean(out ** 2)) + 1e-12)).astype(np.float32)
+
+
+def rms(x):
+    return float(np.sqrt(np.mean(np.square(x, dtype=np.float64))) + 1e-9)
+
+
+def make_example(drones, noises, rng, resamplers, n_out=None):
+    """One mixture and its label row; drones/noises are lists of open WavMaps"""
+    n_out = n_out or int(CLIP_SECONDS * RATE)
+    row = {'label': 'noise'}
+
+    if noises:
+        noise_wav = noises[rng.integers(len(noises))]
+        noise = _segment(noise_wav, n_out / RATE, rng, resamplers)[:n_out]
+        noise = np.pad(noise, (0, n_out - len(noise)))
+        row['noise'] = os.path.basename(noise_wav.path)
+    else:
+        row['noise'] = NOISE_TYPES[rng.integers(len(NOISE_TYPES))]
+        noise = generated_noise(row['noise'], n_out, rng)
+    noise *= 1000 / rms(noise)
+
+    mix = noise
+    if rng.random() >= NEGATIVE_FRACTION:
+        wav = drones[rng.integers(len(drones))]
+        pitch = rng.uniform(*PITCH)
+        doppler = rng.uniform(*DOPPLER)
+        distance = rng.uniform(*DISTANCE_M)
+        snr_ref = rng.uniform(*SNR_DB)
+        # Enough source for the fastest part of the sweep, with a little margin
+        needed = n_out * pitch * (1 + doppler) / RATE + 0.05
+        drone = warp(_segment(wav, needed, rng, resamplers), n_out, pitch, doppler)
+        drone *= rms(noise) * 10 ** (snr_ref / 20) / rms(drone)   # Level at the reference distance
+        drone = air_absorption(drone, distance)
+        mix = noise + drone
+        row.update(label=label_from_path(wav.path), source=os.path.basename(wav.path), pitch=round(pitch, 4),
+                   doppler=round(doppler, 4), distance_m=round(distance, 1), snr_ref_db=round(snr_ref, 2),
+                   snr_db=round(20 * np.log10(rms(drone) / rms(noise)), 2))
+
+    gain = rng.uniform(*GAIN_DB)
+    mix = mix * 10 ** (gain / 20)
+    peak = float(np.abs(mix).max())
+    if peak > PEAK:
+        mix *= PEAK / peak
+        gain += 20 * np.log10(PEAK / peak)
+    row['gain_db'] = round(gain, 2)
+    return np.round(mix).astype(np.int16), row
+
+
+def write_wav(path, samples):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(samples.tobytes())
+
+
+def build_shard(shard, count, drone_paths, noise_paths, output, seed, fmt):
+    """Worker entry point: write one shard; returns (shard, examples, label counts)"""
+    # Seeded per shard, so the dataset is identical whatever the worker count
+    rng = np.random.default_rng([seed, shard])
+    drones = [WavMap(p) for p in drone_paths]
+    noises = [WavMap(p) for p in noise_paths]
+    resamplers = {}
+    n_out = int(CLIP_SECONDS * RATE)
+    name = f"shard_{shard:05d}"
+    labels = {}
+
+    if fmt == "npy":
+        # Written through a memmap: a shard never has to fit in RAM
+        data = np.lib.format.open_memmap(os.path.join(output, name + ".npy.tmp"), mode="w+",
+                                         dtype=np.int16, shape=(count, n_out))
+    with open(os.path.join(output, name + ".csv.tmp"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=['index' if fmt == "npy" else 'file'] + FIELDS)
+        writer.writeheader()
+        for i in range(count):
+            samples, row = make_example(drones, noises, rng, resamplers, n_out)
+            labels[row['label']] = labels.get(row['label'], 0) + 1
+            if fmt == "npy":
+                data[i] = samples
+                row = dict(index=i, **row)
+            else:
+                folder = os.path.join(output, row['label'])
+                os.makedirs(folder, exist_ok=True)
+                # The parent folder is the label, as features.label_from_path expects
+                row = dict(file=os.path.join(row['label'], f"{name}_{i:05d}.wav"), **row)
+                write_wav(os.path.join(output, row['file']), samples)
+            writer.writerow(row)
+    if fmt == "npy":
+        data.flush()
+        del data
+        os.replace(os.path.join(output, name + ".npy.tmp"), os.path.join(output, name + ".npy"))
+    # Renamed last: a shard with a .csv is complete, so an interrupted run can resume
+    os.replace(os.path.join(output, name + ".csv.tmp"), os.path.join(output, name + ".csv"))
+    return shard, count, labels
+
+
+def generate(examples, output=OUTPUT_DIR, drone_paths=None, noise_paths=(), shard_size=SHARD_SIZE,
+             workers=None, seed=0, fmt="npy"):
+    """Build the dataset shard by shard in parallel, skipping shards already on disk"""
+    drone_paths = drone_paths or find_wavs([DRONE_DIR])
+    os.makedirs(output, exist_ok=True)
+    shards = [(s, min(shard_size, examples - s * shard_size)) for s in range(-(-examples // shard_size))]
+    todo = [(s, n) for s, n in shards if not os.path.exists(os.path.join(output, f"shard_{s:05d}.csv"))]
+
+    manifest = {'rate': RATE, 'clip_seconds': CLIP_SECONDS, 'examples': examples, 'shard_size': shard_size,
+                'seed': seed, 'format': fmt, 'drones': [os.path.abspath(p) for p in drone_paths],
+                'noise': [os.path.abspath(p) for p in noise_paths] or list(NOISE_TYPES),
+                'ranges': {'snr_db': SNR_DB, 'gain_db': GAIN_DB, 'pitch': PITCH, 'doppler': DOPPLER,
+                           'distance_m': DISTANCE_M, 'negative_fraction': NEGATIVE_FRACTION}}
+    with open(os.path.join(output, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    totals = {}
+    done = len(shards) - len(todo)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(build_shard, s, n, drone_paths, list(noise_paths), output, seed, fmt)
+                   for s, n in todo]
+        for future in as_completed(futures):
+            shard, count, labels = future.result()
+            done += 1
+            for label, n in labels.items():
+                totals[label] = totals.get(label, 0) + n
+            print(f"  shard {shard:5d}: {count} examples ({done}/{len(shards)})")
+    return len(todo), totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate labelled drone/noise mixtures in parallel shards")
+    parser.add_argument("-n", "--examples", type=int, default=2000, help="Total examples (default: 2000)")
+    parser.add_argument("-o", "--output", default=OUTPUT_DIR, help=f"Output folder (default: {OUTPUT_DIR})")
+    parser.add_argument("--drones", nargs="+", default=[DRONE_DIR], help="Drone WAVs or folders")
+    parser.add_argument("--noise", nargs="+", default=[], help="Background WAVs or folders (default: generated)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help=f"Examples per shard (default: {SHARD_SIZE})")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed -> same dataset)")
+    parser.add_argument("--format", choices=("npy", "wav"), default="npy",
+                        help="npy: one int16 array + CSV per shard; wav: <label>/ folders for features.py")
+    args = parser.parse_args()
+
+    drone_paths = find_wavs(args.drones)
+    noise_paths = find_wavs(args.noise)
+    print(f"{len(drone_paths)} drone recordings, "
+          f"{len(noise_paths) or 'no'} noise clips{'' if noise_paths else ' (using generated noise)'}")
+
+    start = time.perf_counter()
+    built, totals = generate(args.examples, args.output, drone_paths, noise_paths, args.shard_size,
+                             args.workers, args.seed, args.format)
+    elapsed = time.perf_counter() - start
+    made = sum(totals.values())
+    if not built:
+        print(f"All shards already in {args.output}")
+        return
+    print(f"{made} examples in {elapsed:.2f} s ({made / elapsed:.0f}/s, "
+          f"{made * CLIP_SECONDS / elapsed:.0f}x real time) -> {args.output}")
+    print("Labels: " + ', '.join(f"{label} {n}" for label, n in sorted(totals.items())))
+
+
+if __name__ == "__main__":
+    main()
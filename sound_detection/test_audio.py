@@ -3,11 +3,12 @@ import wave
 
 # Audio settings
 FORMAT = pyaudio.paInt16  # 16-bit format
-CHANNELS = 1              # Mono
+CHANNELS = 1              # Mono (set to the capsule count for a USB mic array)
 RATE = 44100              # Sampling rate
 CHUNK = 1024              # Buffer size
 RECORD_SECONDS = 20        # Short test recording
 OUTPUT_FILENAME = "test_drone.wav"
+ARCHIVE = False           # Stream to segmented FLAC in recordings/ instead of one WAV
 
 # Initialize PyAudio
 audio = pyaudio.PyAudio()
@@ -17,12 +18,21 @@ stream = audio.open(format=FORMAT, channels=CHANNELS,
                     rate=RATE, input=True,
                     frames_per_buffer=CHUNK)
 
+# Optional compressed archive, encoded on a background thread
+archive = None
+if ARCHIVE:
+    from flac_archive import ArchiveWriter
+    archive = ArchiveWriter(rate=RATE, channels=CHANNELS)
+
 print("Recording...")
 
 frames = []
 for _ in range(0, int(RATE / CHUNK * RECORD_SECONDS)):
     data = stream.read(CHUNK)
-    frames.append(data)
+    if archive:
+        archive.write(data)
+    else:
+        frames.append(data)
 
 print("Recording finished.")
 
@@ -31,17 +41,21 @@ stream.stop_stream()
 stream.close()
 audio.terminate()
 
-# Save recorded audio
-wf = wave.open(OUTPUT_FILENAME, 'wb')
-wf.setnchannels(CHANNELS)
-wf.setsampwidth(audio.get_sample_size(FORMAT))
-wf.setframerate(RATE)
-wf.writeframes(b''.join(frames))
-wf.close()
-
-print(f"Audio saved as {OUTPUT_FILENAME}")
-
-# Playback the recorded audio
-import os
-print("Playing back the recorded audio...")
-os.system(f"aplay {OUTPUT_FILENAME}")  # Works on Raspberry Pi
+if archive:
+    archive.close()
+    print(f"Audio archived in {archive.directory}/ ({archive.dropped} blocks dropped, {archive.errors} write errors)")
+else:
+    # Save recorded audio
+    wf = wave.open(OUTPUT_FILENAME, 'wb')
+    wf.setnchannels(CHANNELS)
+    wf.setsampwidth(audio.get_sample_size(FORMAT))
+    wf.setframerate(RATE)
+    wf.writeframes(b''.join(frames))
+    wf.close()
+
+    print(f"Audio saved as {OUTPUT_FILENAME}")
+
+    # Playback the recorded audio
+    import os
+    print("Playing back the recorded audio...")
+    os.system(f"aplay {OUTPUT_FILENAME}")  # Works on Raspberry Pi
@@ -1,8 +1,8 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import wave
 import sys
 from scipy.fftpack import fft
+from wavmap import WavMap
 
 def main():
     if len(sys.argv) < 4:
@@ -14,23 +14,19 @@ def main():
     waveform_output = sys.argv[2]
     spectrum_output = sys.argv[3]
     
-    # Open the WAV file
-    wf = wave.open(wav_filename, "rb")
+    # Memory-map the WAV file (nothing is read until samples are touched)
+    wav = WavMap(wav_filename)
     
     # Extract Audio Parameters
-    n_channels = wf.getnchannels()
-    sample_width = wf.getsampwidth()
-    frame_rate = wf.getframerate()
-    n_frames = wf.getnframes()
+    n_channels = wav.channels
+    sample_width = wav.sample_width
+    frame_rate = wav.rate
+    n_frames = wav.frames
     
     print(f"Channels: {n_channels}, Sample Width: {sample_width}, Frame Rate: {frame_rate}, Frames: {n_frames}")
     
-    # Read and convert the audio data to numpy array
-    signal = wf.readframes(n_frames)
-    signal = np.frombuffer(signal, dtype=np.int16)
-    
-    # Close the WAV file
-    wf.close()
+    # Zero-copy view of the first channel in the file's own sample type
+    signal = wav.channel(0)
     
     # Generate time axis
     time = np.linspace(0, len(signal) / frame_rate, num=len(signal))
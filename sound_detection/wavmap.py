@@ -0,0 +1,146 @@
+import os
+import struct
+import sys
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (format, bits per sample) -> little-endian NumPy dtype that can view the data chunk directly
+DTYPES = {
+    (WAVE_FORMAT_PCM, 8): np.dtype("u1"),
+    (WAVE_FORMAT_PCM, 16): np.dtype("<i2"),
+    (WAVE_FORMAT_PCM, 32): np.dtype("<i4"),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): np.dtype("<f4"),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): np.dtype("<f8"),
+}
+
+
+def parse_header(f):
+    """Walk the RIFF chunks; returns (format tag, channels, rate, bits, data offset, data size)"""
+    riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or wave_id != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("No data chunk found")
+        chunk_id, size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            body = f.read(size)
+            tag, channels, rate, _, block_align, _ = struct.unpack("<HHIIHH", body[:16])
+            if tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                tag = struct.unpack("<H", body[24:26])[0]  # first two bytes of the sub-format GUID
+            # The container width (not the valid bits) is what gets mapped
+            fmt = (tag, channels, rate, 8 * block_align // channels)
+            if size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("data chunk before fmt chunk")
+            return fmt + (f.tell(), size)
+        else:
+            f.seek(size + (size % 2), os.SEEK_CUR)
+
+
+class WavMap:
+    """Memory-mapped, channel-aware view of a WAV file's sample data.
+
+    Nothing is read up front except the header: `data` is an np.memmap of
+    shape (frames, channels) in the file's own sample type, so slicing a time
+    range or a channel returns a view into the page cache in O(1) and only the
+    pages actually touched are read from disk. 24-bit PCM has no NumPy dtype
+    and is rejected rather than silently copied.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            tag, self.channels, self.rate, bits, offset, size = parse_header(f)
+        self.dtype = DTYPES.get((tag, bits))
+        if self.dtype is None:
+            raise ValueError(f"{path}: unsupported sample format (tag {tag:#06x}, {bits}-bit); "
+                             f"24-bit and compressed WAVs cannot be memory-mapped")
+        self.sample_width = self.dtype.itemsize
+
+        # Writers that were interrupted (or stream to disk) leave a bogus data size
+        available = os.path.getsize(path) - offset
+        if size == 0xFFFFFFFF or size > available:
+            size = available
+        self.frames = size // (self.sample_width * self.channels)
+        if self.frames:
+            self.data = np.memmap(path, dtype=self.dtype, mode="r", offset=offset,
+                                  shape=(self.frames, self.channels))
+        else:
+            self.data = np.zeros((0, self.channels), dtype=self.dtype)
+
+    @property
+    def duration(self):
+        return self.frames / self.rate
+
+    def channel(self, index):
+        """Strided view of one channel"""
+        return self.data[:, index]
+
+    def frame_range(self, start_s, end_s=None):
+        """Clamp a time range in seconds to (start frame, end frame)"""
+        start = min(self.frames, max(0, int(round(start_s * self.rate))))
+        end = self.frames if end_s is None else min(self.frames, max(start, int(round(end_s * self.rate))))
+        return start, end
+
+    def segment(self, start_s, end_s=None):
+        """(frames, channels) view of [start_s, end_s) without copying"""
+        start, end = self.frame_range(start_s, end_s)
+        return self.data[start:end]
+
+    def scale(self):
+        """Factor that brings samples to 16-bit full scale (so thresholds carry over)"""
+        if self.dtype.kind == "f":
+            return 32768.0
+        return 32768.0 / 2 ** (8 * self.sample_width - 1)
+
+    def samples(self, start_s=0.0, end_s=None, channel=None):
+        """float32 copy in 16-bit units; channel=None averages all channels to mono"""
+        view = self.segment(start_s, end_s)
+        if channel is None:
+            out = view.mean(axis=1, dtype=np.float32)
+        else:
+            out = view[:, channel].astype(np.float32)
+        if self.dtype.kind == "u":
+            out -= 2 ** (8 * self.sample_width - 1)
+        if self.scale() != 1.0:
+            out *= self.scale()
+        return out
+
+    def close(self):
+        """Drop the mapping (views taken earlier keep it alive until they go away)"""
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python wavmap.py <audio_file> [start_s] [end_s]")
+        return
+
+    wav = WavMap(sys.argv[1])
+    print(f"Channels: {wav.channels}, Sample Width: {wav.sample_width}, Frame Rate: {wav.rate}, "
+          f"Frames: {wav.frames} ({wav.duration:.2f} s, {wav.dtype})")
+    if len(sys.argv) > 2:
+        start_s = float(sys.argv[2])
+        end_s = float(sys.argv[3]) if len(sys.argv) > 3 else None
+        segment = wav.segment(start_s, end_s)
+        peak = np.abs(segment.astype(np.float32)).max(axis=0) if len(segment) else []
+        print(f"{len(segment)} frames from {start_s:.2f} s, peak per channel: {peak}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 import lgpio as GPIO
+import os
+import sys
 import time
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from collections import deque
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fusion"))
+import metrics
+from ultrasonic_timing import wait_for_pulse
+
 # Set pins
 #TRIG = 23  # Associate pin 23 to TRIG
 ECHO = 24  # Associate pin 24 to ECHO
@@ -21,17 +27,7 @@ def detect_ultrasonic_signal():
     """Detects an ultrasonic signal and logs the timestamp & duration."""
     print("Listening for ultrasonic signals...")
 
-    # Wait for ECHO to go high (signal detected)
-    while GPIO.gpio_read(h, ECHO) == 0:
-        pass  # Keep waiting until a signal is received
-    
-    pulse_start = time.time()  # Timestamp when signal starts
-
-    # Wait for ECHO to go low (signal ends)
-    while GPIO.gpio_read(h, ECHO) == 1:
-        pass  # Keep waiting until the signal stops
-    
-    pulse_end = time.time()  # Timestamp when signal ends
+    pulse_start, pulse_end = wait_for_pulse(lambda: GPIO.gpio_read(h, ECHO))
     
     pulse_duration = pulse_end - pulse_start  # Calculate duration
     timestamp = time.strftime("%H:%M:%S", time.localtime(pulse_start))  # Only time format
@@ -39,6 +35,8 @@ def detect_ultrasonic_signal():
     # Store the latest data for live plotting
     timestamps.append(timestamp)
     durations.append(pulse_duration)
+    metrics.count("ultrasonic_pulses")
+    metrics.observe("ultrasonic_pulse", pulse_duration)
 
     print(f"[{timestamp}] Received ultrasonic signal | Duration: {pulse_duration:.6f} seconds")
 
@@ -1,5 +1,6 @@
 import lgpio as GPIO
 import time
+from ultrasonic_timing import echo_duration
 
 # Set pin
 TRIG = 17  # Associate pin 17 to TRIG (signal sender)
@@ -22,16 +23,8 @@ def send_ultrasonic_signal():
     GPIO.gpio_write(h, TRIG, 0)
     print("Pulse sent.")
 
-    # Start recording the time when the wave is sent
-    while GPIO.gpio_read(h, ECHO) == 0:
-        pulse_start = time.time()
-
-    # Record time of arrival
-    while GPIO.gpio_read(h, ECHO) == 1:
-        pulse_end = time.time()
-
-    # Calculate the difference in times
-    pulse_duration = pulse_end - pulse_start
+    # Time from the wave being sent to its arrival
+    pulse_duration = echo_duration(lambda: GPIO.gpio_read(h, ECHO))
 
     print(pulse_duration)
 
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# Ultrasonic band monitor: 96/192 kHz capture through an audio ADC, 20-80 kHz band energy and tonal peaks
+#
+# The HC-SR04 scripts in this folder only see echo pulse widths; this one
+# records the band itself (ultrasonic MEMS mic or ADC on USB/I2S), so motor
+# whine, ESC switching tones and rotor harmonics above 20 kHz become visible.
+
+import argparse
+import os
+import sys
+import time
+import wave
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "sound_detection"))
+sys.path.insert(0, os.path.join(REPO_DIR, "fusion"))
+from mic_array import find_usb_microphone, input_overflowing, split_channels
+import metrics
+
+# Capture settings
+RATES = (192000, 96000)   # Tried in order; the first the device accepts is used
+CHANNELS = 1
+CHUNK = 8192              # Samples per block (~43 ms at 192 kHz, ~85 ms at 96 kHz)
+DEVICE_NAME = "USB"       # Substring of the capture device name
+OUTPUT_FILENAME = None    # e.g. "ultrasonic.wav" to keep the raw full-rate capture
+
+# Analysis settings
+BAND = (20000.0, 80000.0) # Hz; the top edge is capped below Nyquist at 96 kHz
+FILTER_ORDER = 6          # Butterworth bandpass order (sections = order)
+NYQUIST_MARGIN = 0.95     # Highest usable edge as a fraction of Nyquist
+PEAK_COUNT = 5            # Tonal peaks reported per block
+PEAK_DB = 15.0            # A peak must stand this far above the median band level
+REPORT_SECONDS = 0.5      # Print interval
+FULL_SCALE = 32768.0
+
+
+class BandMonitor:
+    """Streaming bandpass plus per-block energy and tonal-peak analysis.
+
+    The bandpass is a Butterworth design run as second-order sections with
+    state carried between blocks, so there is no edge transient at block
+    boundaries and cost is a few multiply-adds per sample per section. Band
+    energy is the RMS of the filtered block; peaks come from a Hann-windowed
+    FFT of the same block, restricted to the band bins, interpolated between
+    bins and ranked by how far they stand above the median band level.
+    """
+
+    def __init__(self, rate, band=BAND, order=FILTER_ORDER, chunk=CHUNK):
+        # scipy.signal is only needed once a monitor is built
+        from scipy.signal import butter, sosfilt
+        self._sosfilt = sosfilt
+        low, high = band[0], min(band[1], rate / 2 * NYQUIST_MARGIN)
+        if low >= high:
+            raise ValueError(f"band {band} does not fit below Nyquist at {rate} Hz")
+        self.rate = rate
+        self.band = (low, high)
+        self.sos = butter(order, self.band, btype="bandpass", fs=rate, output="sos").astype(np.float32)
+        self.zi = np.zeros((self.sos.shape[0], 2), dtype=np.float32)
+
+        self.chunk = chunk
+        self.window = np.hanning(chunk).astype(np.float32)
+        freqs = np.fft.rfftfreq(chunk, 1 / rate)
+        self.bins = np.flatnonzero((freqs >= low) & (freqs <= high))
+        self.bin_hz = rate / chunk
+        # Full-scale sine -> 0 dB in the spectrum (Hann coherent gain is 0.5)
+        self.spectrum_ref = (chunk * 0.5 / 2) ** 2
+
+    def reset(self):
+        self.zi[:] = 0
+
+    def filter(self, samples):
+        """Band-limited float32 copy of an int16 (or float) block, continuing from the previous block"""
+        x = np.asarray(samples, dtype=np.float32) / FULL_SCALE
+        y, self.zi = self._sosfilt(self.sos, x, zi=self.zi)
+        return y.astype(np.float32, copy=False)
+
+    def analyse(self, filtered):
+        """(band RMS in dBFS, [(freq_hz, level_dbfs, prominence_db), ...]) for one filtered block"""
+        energy_db = 10 * np.log10(np.mean(np.square(filtered, dtype=np.float64)) + 1e-20)
+        if len(filtered) != self.chunk:
+            return energy_db, []
+        power = np.abs(np.fft.rfft(filtered * self.window)) ** 2
+        band = 10 * np.log10(power[self.bins] / self.spectrum_ref + 1e-20)
+        floor = float(np.median(band))
+
+        # Local maxima above the floor, strongest first
+        inner = band[1:-1]
+        candidates = np.flatnonzero((inner > band[:-2]) & (inner >= band[2:]) & (inner > floor + PEAK_DB)) + 1
+        candidates = candidates[np.argsort(band[candidates])[::-1][:PEAK_COUNT]]
+        peaks = []
+        for i in candidates:
+            # Parabolic interpolation on the dB values around the maximum
+            a, b, c = band[i - 1], band[i], band[i + 1]
+            offset = 0.5 * (a - c) / (a - 2 * b + c) if a - 2 * b + c else 0.0
+            level = b - 0.25 * (a - c) * offset
+            peaks.append(((self.bins[i] + offset) * self.bin_hz, float(level), float(level - floor)))
+        return energy_db, peaks
+
+    def process(self, samples):
+        with metrics.timer("ultrasonic_process"):
+            return self.analyse(self.filter(samples))
+
+
+def describe(energy_db, peaks):
+    tones = ', '.join(f"{f / 1000:.2f} kHz {level:.0f} dBFS (+{prom:.0f})" for f, level, prom in peaks)
+    return f"band {energy_db:6.1f} dBFS | " + (tones or "no tones")
+
+
+def synthetic(seconds, rate, tones=((24000.0, -30.0), (41500.0, -40.0)), out_of_band=((3000.0, -6.0),),
+              noise_db=-60.0, seed=0):
+    """int16 test signal: in-band tones, loud audible-band tones that must be rejected, and white noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    x = rng.standard_normal(len(t)) * 10 ** (noise_db / 20)
+    for freq, level_db in tuple(tones) + tuple(out_of_band):
+        x += 10 ** (level_db / 20) * np.sin(2 * np.pi * freq * t + rng.uniform(0, 2 * np.pi))
+    return np.clip(np.round(x * FULL_SCALE), -32768, 32767).astype(np.int16)
+
+
+def benchmark(rate, seconds=10.0, chunk=CHUNK):
+    """Process synthetic blocks as fast as possible; reports the real-time factor and what was found"""
+    tones = ((24000.0, -30.0), (min(41500.0, rate * 0.4), -40.0))
+    signal = synthetic(seconds, rate, tones)
+    monitor = BandMonitor(rate, chunk=chunk)
+    blocks = [signal[i:i + chunk] for i in range(0, len(signal) - chunk + 1, chunk)]
+
+    start = time.perf_counter()
+    results = [monitor.process(block) for block in blocks]
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = len(blocks) * chunk / rate
+    print(f"{rate / 1000:.0f} kHz, band {monitor.band[0] / 1000:.0f}-{monitor.band[1] / 1000:.1f} kHz, "
+          f"{monitor.sos.shape[0]} sections, {chunk}-sample blocks")
+    print(f"  {audio_seconds:.1f} s of audio in {elapsed * 1000:.0f} ms: "
+          f"{elapsed / len(blocks) * 1000:.2f} ms/block, {audio_seconds / elapsed:.0f}x real time, "
+          f"{elapsed / audio_seconds * 100:.1f}% of one core")
+    # The last block, well after the filter has settled
+    energy_db, peaks = results[-1]
+    print(f"  last block: {describe(energy_db, peaks)}")
+    found = [min(abs(f - freq) for f, _, _ in peaks) if peaks else np.inf for freq, _ in tones]
+    print(f"  injected {', '.join(f'{f / 1000:.2f} kHz' for f, _ in tones)}: "
+          f"frequency error {', '.join(f'{e:.1f} Hz' for e in found)} (bin {monitor.bin_hz:.1f} Hz)")
+    # Stopband: what is left of the loud audible tone on its own
+    audible = synthetic(1.0, rate, tones=(), noise_db=-120.0)
+    monitor.reset()
+    leak_db = [monitor.process(audible[i:i + chunk])[0] for i in range(0, len(audible) - chunk + 1, chunk)][-1]
+    print(f"  3 kHz tone at -6 dBFS -> {leak_db:.0f} dBFS after the bandpass")
+
+
+def open_stream(audio, device_index, rates=RATES):
+    """Open the first of `rates` the device supports; returns (stream, rate)"""
+    import pyaudio
+    for rate in rates:
+        try:
+            audio.is_format_supported(rate, input_device=device_index, input_channels=CHANNELS,
+                                      input_format=pyaudio.paInt16)
+        except ValueError:
+            print(f"{rate} Hz not supported by the device")
+            continue
+        stream = audio.open(format=pyaudio.paInt16, channels=CHANNELS, rate=rate, input=True,
+                            frames_per_buffer=CHUNK, input_device_index=device_index)
+        return stream, rate
+    raise RuntimeError(f"no ultrasonic sample rate ({', '.join(map(str, rates))}) supported; "
+                       "a USB mic limited to 48 kHz cannot see above 24 kHz")
+
+
+def capture(seconds=None, output=OUTPUT_FILENAME, rates=RATES):
+    """Live monitor in the same chunked read loop as sound.py"""
+    import pyaudio
+    audio = pyaudio.PyAudio()
+    device_index = find_usb_microphone(audio, DEVICE_NAME)
+    stream, rate = open_stream(audio, device_index, rates)
+    monitor = BandMonitor(rate)
+    metrics.gauge("ultrasonic_read_available", stream.get_read_available)
+    print(f"Monitoring {monitor.band[0] / 1000:.0f}-{monitor.band[1] / 1000:.1f} kHz at {rate} Hz. "
+          "Press Ctrl+C to stop.")
+
+    frames = []
+    blocks = int(seconds * rate / CHUNK) if seconds else None
+    report_every = max(1, int(REPORT_SECONDS * rate / CHUNK))
+    count = 0
+    try:
+        while blocks is None or count < blocks:
+            if input_overflowing(stream, rate, CHUNK):
+                # Analysis fell behind and audio was lost; count it instead of hiding it
+                metrics.count("ultrasonic_overflows")
+            data = stream.read(CHUNK, exception_on_overflow=False)
+            metrics.count("ultrasonic_blocks")
+            if output:
+                frames.append(data)
+            energy_db, peaks = monitor.process(split_channels(data, CHANNELS)[0])
+            count += 1
+            if count % report_every == 0:
+                print(f"[{time.strftime('%H:%M:%S')}] {describe(energy_db, peaks)}")
+    except KeyboardInterrupt:
+        print("Stopped by User")
+    finally:
+        stream.stop_stream()
+        stream.close()
+        audio.terminate()
+
+    overflows = metrics.REGISTRY.counters.get("ultrasonic_overflows", 0)
+    if overflows:
+        print(f"Warning: {overflows} input overflows (analysis could not keep up)")
+    if output and frames:
+        with wave.open(output, "wb") as wf:
+            wf.setnchannels(CHANNELS)
+            wf.setsampwidth(2)
+            wf.setframerate(rate)
+            wf.writeframes(b''.join(frames))
+        print(f"Audio saved as {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ultrasonic (20-80 kHz) band energy and tone monitor")
+    parser.add_argument("--seconds", type=float, default=None, help="Stop after this long (default: until Ctrl+C)")
+    parser.add_argument("--rate", type=int, choices=RATES, default=None,
+                        help="Force one sample rate (default: the highest the device supports)")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILENAME, help="Also save the raw capture to this WAV")
+    parser.add_argument("--bench", action="store_true", help="Measure throughput on a synthetic signal instead")
+    args = parser.parse_args()
+
+    rates = (args.rate,) if args.rate else RATES
+    if args.bench:
+        for rate in rates:
+            benchmark(rate)
+        return
+    capture(args.seconds, args.output, rates)
+
+
+if __name__ == "__main__":
+    main()
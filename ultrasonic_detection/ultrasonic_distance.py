@@ -1,5 +1,6 @@
 import lgpio as GPIO
 import time
+from ultrasonic_timing import distance_cm, echo_duration
 
 # Set pins
 TRIG = 17  # Associate pin 23 to TRIG
@@ -20,21 +21,9 @@ def get_distance():
     time.sleep(0.00001)
     GPIO.gpio_write(h, TRIG, 0)
 
-    # Start recording the time when the wave is sent
-    while GPIO.gpio_read(h, ECHO) == 0:
-        pulse_start = time.time()
-
-    # Record time of arrival
-    while GPIO.gpio_read(h, ECHO) == 1:
-        pulse_end = time.time()
-
-    # Calculate the difference in times
-    pulse_duration = pulse_end - pulse_start
-
-    # Multiply with the sonic speed (34300 cm/s)
-    # and divide by 2, because there and back
-    distance = pulse_duration * 17150
-    distance = round(distance, 2)
+    # Time the echo and convert it (34300 cm/s, halved because there and back)
+    pulse_duration = echo_duration(lambda: GPIO.gpio_read(h, ECHO))
+    distance = distance_cm(pulse_duration)
 
     return distance
 
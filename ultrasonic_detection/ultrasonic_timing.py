@@ -0,0 +1,39 @@
+import time
+
+# Half the speed of sound in cm/s (34300 cm/s, there and back)
+HALF_SPEED_CM = 17150
+
+
+def wait_for_pulse(read, clock=time.time):
+    """Block until one HIGH pulse has been seen on `read()`; returns (start, end) clock times.
+
+    `read` is any zero-argument callable returning the pin level, e.g.
+    lambda: GPIO.gpio_read(h, ECHO), so the timing can run without a Pi.
+    """
+    # Wait for ECHO to go high (signal detected)
+    while read() == 0:
+        pass
+    start = clock()
+
+    # Wait for ECHO to go low (signal ends)
+    while read() == 1:
+        pass
+    return start, clock()
+
+
+def echo_duration(read, clock=time.time):
+    """Duration of the echo pulse after a trigger, timed like the original polling loops"""
+    pulse_start = pulse_end = clock()
+    # Start recording the time when the wave is sent
+    while read() == 0:
+        pulse_start = clock()
+
+    # Record time of arrival
+    while read() == 1:
+        pulse_end = clock()
+    return pulse_end - pulse_start
+
+
+def distance_cm(duration):
+    """Echo duration in seconds -> distance in cm"""
+    return round(duration * HALF_SPEED_CM, 2)